@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.password_validation import validate_password
 from apps.accounts.models import User, Address
 
@@ -44,4 +45,18 @@ class RegisterSerializer(serializers.ModelSerializer):
             username=validated_data["username"],
             email=validated_data["email"],
             password=validated_data["password"],
-        )
\ No newline at end of file
+        )
+
+
+# -------------------------------------------------------------------
+# Login Serializer
+# -------------------------------------------------------------------
+
+class LoginSerializer(TokenObtainPairSerializer):
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Lets stateless endpoints authorize staff without loading the user
+        token["is_staff"] = user.is_staff
+        return token
@@ -1,11 +1,19 @@
+import logging
+
 from rest_framework import viewsets, generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 from apps.accounts.models import Address
-from .serializers import AddressSerializer, RegisterSerializer
+from apps.orders.cart_store import is_valid_token, merge_anonymous_cart
+from .serializers import AddressSerializer, LoginSerializer, RegisterSerializer
+
+
+logger = logging.getLogger(__name__)
 
 
 # -------------------------------------------------------------------
@@ -43,6 +51,34 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [AllowAny]
 
 
+# -------------------------------------------------------------------
+# Login View
+# -------------------------------------------------------------------
+
+class LoginView(TokenObtainPairView):
+    """Obtain a JWT pair and merge the anonymous cart sent in X-Cart-Token."""
+
+    serializer_class = LoginSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        token = request.headers.get("X-Cart-Token")
+        if is_valid_token(token):
+            try:
+                merge_anonymous_cart(token, serializer.user)
+            except Exception:
+                # Losing the anonymous cart beats refusing the login
+                logger.exception("Failed to merge anonymous cart on login")
+
+        return Response(serializer.validated_data)
+
+
 # -------------------------------------------------------------------
 # Logout View
 # -------------------------------------------------------------------
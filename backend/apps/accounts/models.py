@@ -65,6 +65,7 @@ class Profile(TimeStampedModel):
         null=True,
         blank=True,
     )
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     bio = models.TextField(blank=True)
 
@@ -1,10 +1,16 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
+from apps.core.images import schedule_variants
 from .models import Profile
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Profile)
+def generate_avatar_variants(sender, instance, **kwargs):
+    schedule_variants(instance, "avatar", "avatar_variants")
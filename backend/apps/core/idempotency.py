@@ -0,0 +1,128 @@
+"""
+`Idempotency-Key` support for unsafe API actions.
+
+Wrap a view method with `@idempotent`. A request carrying the header
+is answered as usual the first time and its response is stored in the
+cache (`settings.IDEMPOTENCY_CACHE_ALIAS`) for `IDEMPOTENCY_TTL`
+seconds. A retry with the same key is answered from that entry in one
+cache lookup, with an `Idempotent-Replayed: true` header.
+
+Keys are scoped to the user and the endpoint. While the first request
+runs it holds a lock taken with `cache.add()`. Concurrent duplicates
+poll for the stored response instead of executing; if the lock is still
+held after `IDEMPOTENCY_WAIT` seconds they get 409. The lock is only as
+wide as the cache: with a per-process `LocMemCache` (the development
+default) duplicates landing on different workers both run, so
+production settings refuse to start without a shared cache.
+
+Only responses the view returns with a status below 500 are stored.
+Server errors, and any exception raised by the view (including DRF's
+`ValidationError`, `NotFound` or `Http404`, which become 4xx responses
+outside the wrapper), are not stored: a retry runs the view again.
+Reusing a key with a different body gets 422.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+def _cache():
+    return caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+
+
+def _storage_key(request, key):
+    scope = f"{request.user.pk}:{request.method}:{request.path}:{key}"
+    return "idempotency:" + hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+
+def _fingerprint(request):
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored["fingerprint"] != fingerprint:
+        return Response(
+            {"detail": f"{HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(stored["data"], status=stored["status"], headers={REPLAYED_HEADER: "true"})
+
+
+def _wait_for(storage_key, lock_key):
+    """Poll until the first request stores its response or drops its lock."""
+    cache = _cache()
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        stored = cache.get(storage_key)
+        if stored is not None or cache.get(lock_key) is None:
+            return stored
+    return None
+
+
+def idempotent(view_method):
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache = _cache()
+        storage_key = _storage_key(request, key)
+        lock_key = f"{storage_key}:lock"
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(storage_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        # Twice at most: once more if the first holder failed without storing
+        for _ in range(2):
+            if cache.add(lock_key, fingerprint, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                break
+            stored = _wait_for(storage_key, lock_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+        else:
+            return Response(
+                {"detail": f"A request with this {HEADER} is still in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(
+                    storage_key,
+                    {
+                        "status": response.status_code,
+                        "data": response.data,
+                        "fingerprint": fingerprint,
+                    },
+                    settings.IDEMPOTENCY_TTL,
+                )
+        finally:
+            cache.delete(lock_key)
+
+        return response
+
+    return wrapper
@@ -0,0 +1,158 @@
+"""
+Responsive image variants.
+
+Uploaded images get resized copies at a few fixed widths, in WebP and
+JPEG, stored next to the original under `variants/`. File names embed a
+hash of the source content, so they can be served with a long cache
+lifetime: a new upload always produces new names.
+
+The variant map saved on the model holds storage names:
+
+    {
+        "source": "pizzas/margherita.jpg",
+        "hash": "3f2a9c0d11be",
+        "width": 1600,
+        "formats": {"webp": {"320": "pizzas/variants/...320w.webp", ...}, ...},
+    }
+"""
+
+import hashlib
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+_executor = None
+
+
+def build_variants(name, storage=None, widths=None, formats=None):
+    """Generate the variants of the stored image `name` and return its map."""
+    storage = storage or default_storage
+    widths = widths or settings.IMAGE_VARIANT_WIDTHS
+    formats = formats or settings.IMAGE_VARIANT_FORMATS
+
+    with storage.open(name, "rb") as source:
+        data = source.read()
+
+    digest = hashlib.sha256(data).hexdigest()[:12]
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    # Never upscale: keep the widths below the original, or the original itself
+    target_widths = [w for w in sorted(widths) if w < image.width] or [image.width]
+
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+
+    variants = {fmt: {} for fmt in formats}
+    for width in target_widths:
+        resized = image.copy()
+        resized.thumbnail((width, image.height), Image.LANCZOS)
+
+        for fmt in formats:
+            variant_name = posixpath.join(
+                directory,
+                "variants",
+                f"{stem}.{digest}.{width}w.{FORMAT_EXTENSIONS[fmt]}",
+            )
+
+            if not storage.exists(variant_name):
+                buffer = BytesIO()
+                resized.save(
+                    buffer,
+                    format=fmt.upper(),
+                    quality=settings.IMAGE_VARIANT_QUALITY,
+                    optimize=True,
+                )
+                variant_name = storage.save(variant_name, ContentFile(buffer.getvalue()))
+
+            variants[fmt][str(width)] = variant_name
+
+    return {
+        "source": name,
+        "hash": digest,
+        "width": image.width,
+        "formats": variants,
+    }
+
+
+def needs_variants(field_file, variants):
+    if not field_file:
+        return False
+    return (variants or {}).get("source") != field_file.name
+
+
+def generate_for_instance(model, pk, image_field, variants_field):
+    try:
+        instance = model._default_manager.filter(pk=pk).first()
+        if instance is None:
+            return
+
+        field_file = getattr(instance, image_field)
+        if not needs_variants(field_file, getattr(instance, variants_field)):
+            return
+
+        setattr(instance, variants_field, build_variants(field_file.name, field_file.storage))
+        instance.save(update_fields=[variants_field, "update_at"])
+    except Exception:
+        logger.exception(
+            "Image variant generation failed for %s %s", model.__name__, pk
+        )
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS,
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+def schedule_variants(instance, image_field, variants_field):
+    """Generate variants off the request thread once the upload is committed."""
+    field_file = getattr(instance, image_field)
+    if not needs_variants(field_file, getattr(instance, variants_field)):
+        return
+
+    args = (type(instance), instance.pk, image_field, variants_field)
+
+    if settings.IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(lambda: _get_executor().submit(generate_for_instance, *args))
+    else:
+        transaction.on_commit(lambda: generate_for_instance(*args))
+
+
+def variant_urls(variants, storage=None):
+    """Turn a stored variant map into URLs plus ready-made `srcset` strings."""
+    if not variants:
+        return None
+
+    storage = storage or default_storage
+    formats = {}
+    srcset = {}
+    for fmt, by_width in variants.get("formats", {}).items():
+        urls = {width: storage.url(name) for width, name in by_width.items()}
+        formats[fmt] = urls
+        srcset[fmt] = ", ".join(
+            f"{url} {width}w"
+            for width, url in sorted(urls.items(), key=lambda item: int(item[0]))
+        )
+
+    return {"formats": formats, "srcset": srcset}
@@ -0,0 +1,225 @@
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on the queryset ordering plus the primary key.
+
+    Each page is a `WHERE (a, b, pk) > (...)` seek instead of an OFFSET, and
+    no `COUNT(*)` is issued, so page 500 costs the same as page 1. The
+    ordering is taken from the queryset (e.g. `?ordering=`) or the model
+    Meta. Clients that need page numbers can opt in with `?page=`, which
+    is served by the regular `PageNumberPagination`.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_query_param = "page"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_numbers = None
+
+        ordering = self.get_ordering(queryset)
+        if self.page_query_param in request.query_params or ordering is None:
+            self.page_numbers = PageNumberPagination()
+            self.page_numbers.page_size = self.get_page_size(request)
+            return self.page_numbers.paginate_queryset(queryset, request, view)
+
+        self.ordering = ordering
+        self.model = queryset.model
+        page_size = self.get_page_size(request)
+        values, self.reverse = self.decode_cursor(request)
+
+        order_by = [
+            f"{'-' if descending != self.reverse else ''}{name}"
+            for name, descending in ordering
+        ]
+        queryset = queryset.order_by(*order_by)
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values))
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        self.first = results[0] if results else None
+        self.last = results[-1] if results else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """Return [(field, descending), ...] ending with the pk, or None."""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not all(isinstance(field, str) for field in ordering):
+            # Expression orderings (e.g. search rank) cannot be seeked
+            return None
+
+        parsed = []
+        for field in ordering:
+            name = field.lstrip("-")
+            parsed.append(("pk" if name in ("pk", queryset.model._meta.pk.name) else name,
+                           field.startswith("-")))
+
+        if not any(name == "pk" for name, _ in parsed):
+            parsed.append(("pk", parsed[-1][1] if parsed else False))
+        return parsed
+
+    def seek_filter(self, values):
+        """Rows strictly after `values` in the current ordering direction."""
+        conditions = []
+        for index, (name, descending) in enumerate(self.ordering):
+            lookup = "lt" if descending != self.reverse else "gt"
+            condition = Q(**{f"{name}__{lookup}": values[index]})
+            for position, (previous, _) in enumerate(self.ordering[:index]):
+                condition &= Q(**{previous: values[position]})
+            conditions.append(condition)
+        return reduce(or_, conditions)
+
+    # Cursor encoding
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            values, reverse = payload["v"], bool(payload.get("r"))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            # Cursors come from the client: coerce each value to its field
+            # type so a tampered cursor can't reach the query unchecked
+            values = [
+                self.to_python(name, value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (ValueError, TypeError, KeyError, AttributeError, ValidationError):
+            raise NotFound("Invalid cursor.")
+        return values, reverse
+
+    def to_python(self, name, value):
+        if value is None:
+            raise ValueError("Cursor values can't be null")
+        model = self.model
+        *relations, last = name.split("__")
+        try:
+            for part in relations:
+                model = model._meta.get_field(part).related_model
+            field = model._meta.pk if last == "pk" else model._meta.get_field(last)
+        except FieldDoesNotExist:
+            raise ValueError(f"Cannot seek on {name!r}")
+        return field.to_python(value)
+
+    def encode_cursor(self, instance, reverse):
+        values = [self.get_value(instance, name) for name, _ in self.ordering]
+        payload = json.dumps({"v": values, "r": reverse} if reverse else {"v": values},
+                             default=self.json_default, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def get_value(instance, name):
+        value = instance
+        for part in name.split("__"):
+            value = getattr(value, part)
+        return value
+
+    @staticmethod
+    def json_default(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, (decimal.Decimal, uuid.UUID)):
+            return str(value)
+        raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.page_numbers is not None:
+            return self.page_numbers.get_paginated_response(data)
+
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {
+                    "type": "integer",
+                    "description": "Only present when paginating with ?page=",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque cursor from the next/previous links.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opt in to numbered pages (issues a COUNT).",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Results per page (max {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
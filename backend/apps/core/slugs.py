@@ -0,0 +1,42 @@
+from django.utils.text import slugify
+
+
+class SlugAllocator:
+    """
+    Allocate unique slugs against an in-memory set of taken values.
+
+    Collisions get a numeric suffix (`name`, `name-1`, `name-2`, ...)
+    without any further database round trip.
+    """
+
+    def __init__(self, taken=()):
+        self.taken = set(taken)
+
+    @classmethod
+    def for_model(cls, model, field="slug"):
+        return cls(model.objects.values_list(field, flat=True))
+
+    def allocate(self, value):
+        base_slug = slugify(value)
+        slug = base_slug
+        counter = 1
+        while slug in self.taken:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        self.taken.add(slug)
+        return slug
+
+    def release(self, slug):
+        self.taken.discard(slug)
+
+
+def unique_slug(instance, value, field="slug"):
+    """Return a free slug for `instance`, checking collisions in one query."""
+    model = type(instance)
+    taken = (
+        model.objects
+        .filter(**{f"{field}__startswith": slugify(value)})
+        .exclude(pk=instance.pk)
+        .values_list(field, flat=True)
+    )
+    return SlugAllocator(taken).allocate(value)
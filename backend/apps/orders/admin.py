@@ -1,3 +1,27 @@
 from django.contrib import admin
+from .models import Cart, CartItem
 
-# Register your models here.
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    extra = 0
+    raw_id_fields = ("pizza", "size")
+    filter_horizontal = ("extra_ingredients", "removed_ingredients")
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "items_count", "items_total", "update_at")
+    inlines = [CartItemInline]
+
+    def get_queryset(self, request):
+        # Totals for the whole changelist page come from one annotated query
+        return super().get_queryset(request).select_related("user").with_totals()
+
+    @admin.display(description="Items", ordering="items_count")
+    def items_count(self, obj):
+        return obj.items_count
+
+    @admin.display(description="Total", ordering="items_total")
+    def items_total(self, obj):
+        return obj.items_total
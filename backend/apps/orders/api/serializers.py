@@ -1,21 +1,168 @@
+from decimal import Decimal
+
+from django.conf import settings
 from rest_framework import serializers
-from apps.orders.models import Order
+from apps.accounts.models import Address
+from apps.orders.cart_store import MAX_LINE_QUANTITY
+from apps.orders.delivery import DeliveryUnavailable, quote_address
+from apps.orders.models import Order, OrderEvent, OrderItem, Payment
+from apps.orders.payments import GATEWAY_METHODS
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = [
+            "id",
+            "pizza",
+            "size",
+            "quantity",
+            "unit_price",
+            "extra_cost",
+            "extra_ingredients_snapshot",
+            "removed_ingredients_snapshot",
+            "preparation_status",
+        ]
+        read_only_fields = fields
 
 
 class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
+
     class Meta:
         model = Order
-        fields = "__all__"
+        exclude = ["reserved_stock"]
         read_only_fields = [
             "user",
             "order_number",
             "status",
+            "delivery_fee",
+            "total_amount",
             "confirmed_at",
             "delivered_at",
             "created_at",
             "updated_at",
         ]
 
+    def validate_delivery_address(self, address):
+        # The order's owner, who is the requesting user on create
+        owner = self.instance.user_id if self.instance else self.context["request"].user.pk
+        if address is not None and address.user_id != owner:
+            raise serializers.ValidationError("Unknown address.")
+        return address
+
+    def validate(self, attrs):
+        # Fee and total are priced here, never taken from the client
+        def value(name, default=None):
+            return attrs.get(name, getattr(self.instance, name, default))
+
+        delivery_fee = Decimal("0.00")
+        if value("order_type", "delivery") == "delivery":
+            try:
+                delivery_fee = quote_address(value("delivery_address")).fee
+            except DeliveryUnavailable as e:
+                raise serializers.ValidationError({"delivery_address": str(e)})
+
+        attrs["delivery_fee"] = delivery_fee
+        attrs["total_amount"] = (
+            value("subtotal")
+            + delivery_fee
+            + value("tax_amount", Decimal("0.00"))
+            - value("discount_amount", Decimal("0.00"))
+        )
+        return attrs
+
+
+class OrderEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderEvent
+        fields = ["kind", "from_status", "to_status", "data", "created_at"]
+        read_only_fields = fields
+
+
+class PaymentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = ["id", "order", "amount", "method", "status", "transaction_id", "created_at"]
+        read_only_fields = fields
+
+
+class PaymentRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=GATEWAY_METHODS)
+
 
 class OrderStatusSerializer(serializers.Serializer):
-    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
\ No newline at end of file
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+class BulkOrderStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=500
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+class DeliveryQuoteRequestSerializer(serializers.Serializer):
+    addresses = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.DELIVERY_QUOTE_MAX_BATCH,
+    )
+    # Candidate zones to price against instead of the configured ones
+    zones = serializers.ListField(
+        child=serializers.DictField(), required=False, allow_empty=False, max_length=50
+    )
+
+
+class CheckoutSerializer(serializers.Serializer):
+    order_type = serializers.ChoiceField(choices=Order.TYPE_CHOICES, default="delivery")
+    delivery_address = serializers.PrimaryKeyRelatedField(
+        queryset=Address.objects.all(), required=False, allow_null=True
+    )
+
+    def validate_delivery_address(self, address):
+        if address is not None and address.user_id != self.context["request"].user.pk:
+            raise serializers.ValidationError("Unknown address.")
+        return address
+
+    def validate(self, attrs):
+        if attrs["order_type"] == "delivery" and not attrs.get("delivery_address"):
+            raise serializers.ValidationError(
+                {"delivery_address": "Required for delivery orders."}
+            )
+        return attrs
+
+
+class CartLineSerializer(serializers.Serializer):
+    # Plain ids: anonymous cart writes are validated against the
+    # in-process price matrix, not the database
+    pizza = serializers.IntegerField(min_value=1)
+    size = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_LINE_QUANTITY, default=1)
+    extra_ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list, max_length=20
+    )
+    removed_ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list, max_length=20
+    )
+
+    def validate_extra_ingredients(self, ids):
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each extra ingredient can be added once.")
+        return ids
+
+    def validate_removed_ingredients(self, ids):
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each ingredient can be removed once.")
+        return ids
+
+    def validate(self, attrs):
+        if set(attrs["extra_ingredients"]) & set(attrs["removed_ingredients"]):
+            raise serializers.ValidationError(
+                "An ingredient can't be both added and removed."
+            )
+        return attrs
+
+
+class CartLineQuantitySerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_LINE_QUANTITY)
@@ -1,7 +1,27 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet
+from .views import (
+    CartItemDetailView,
+    CartItemListView,
+    CartView,
+    DeliveryQuotesView,
+    DriverPingsView,
+    LiveLocationView,
+    OrderViewSet,
+    order_events,
+)
 
 router = DefaultRouter()
 router.register(r"", OrderViewSet, basename="orders")
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = [
+    path("events/", order_events, name="order-events"),
+    path("tracking/pings/", DriverPingsView.as_view(), name="tracking-pings"),
+    path("tracking/<uuid:order_id>/", LiveLocationView.as_view(), name="tracking-live"),
+    path("delivery/quotes/", DeliveryQuotesView.as_view(), name="delivery-quotes"),
+    path("cart/", CartView.as_view(), name="cart"),
+    path("cart/items/", CartItemListView.as_view(), name="cart-items"),
+    path("cart/items/<int:line_id>/", CartItemDetailView.as_view(), name="cart-item-detail"),
+]
+
+urlpatterns += router.urls
\ No newline at end of file
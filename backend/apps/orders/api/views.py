@@ -1,13 +1,57 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, permissions, status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from apps.orders.models import Order
-from .serializers import OrderSerializer, OrderStatusSerializer
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication,
+    JWTStatelessUserAuthentication,
+)
+from rest_framework_simplejwt.exceptions import InvalidToken
+from apps.core.idempotency import idempotent
+from apps.core.pagination import KeysetPagination
+from apps.orders import delivery, events, tracking
+from apps.orders.cart_store import (
+    CartError,
+    get_cart_store,
+    is_valid_token,
+    new_cart_token,
+)
+from apps.orders.models import (
+    ArchivedOrder,
+    Cart,
+    Order,
+    OrderEvent,
+    OrderStatusConflict,
+)
+from apps.orders.payments import PaymentError, start_payment
+from apps.orders.services import CheckoutError, bulk_change_status, checkout
+from .serializers import (
+    BulkOrderStatusSerializer,
+    CartLineQuantitySerializer,
+    CartLineSerializer,
+    CheckoutSerializer,
+    DeliveryQuoteRequestSerializer,
+    OrderEventSerializer,
+    OrderSerializer,
+    OrderStatusSerializer,
+    PaymentRequestSerializer,
+    PaymentSerializer,
+)
+
+
+CART_TOKEN_HEADER = "X-Cart-Token"
 
 
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     queryset = Order.objects.all()
 
@@ -18,12 +62,64 @@ class OrderViewSet(viewsets.ModelViewSet):
         if getattr(self, "swagger_fake_view", False):
             return self.queryset.none()
 
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user).prefetch_related("items")
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    # Archived orders are read-only: `?archived=true` lists them, and
+    # retrieving an id no longer in the live table falls back to them
+
+    def get_archived_queryset(self):
+        return ArchivedOrder.objects.filter(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("archived") not in ("1", "true"):
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(self.get_archived_queryset())
+        data = self.get_serializer([archived.as_order() for archived in page], many=True).data
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = get_object_or_404(self.get_archived_queryset(), pk=kwargs["id"])
+            return Response(self.get_serializer(archived.as_order()).data)
+
+    @action(detail=True, methods=["get"])
+    def timeline(self, request, id=None):
+        # One query: the timeline index serves the order's events in order,
+        # and ownership is checked against the live and archived orders
+        owned = {"pk": OuterRef("order_id")}
+        if not request.user.is_staff:
+            owned["user"] = request.user
+        history = list(OrderEvent.objects.filter(order_id=id).filter(
+            Exists(Order.objects.filter(**owned))
+            | Exists(ArchivedOrder.objects.filter(**owned))
+        ))
+
+        # No events yet (or none written so far): the order may still be
+        # ours, it just has an empty timeline
+        if not history:
+            owned["pk"] = id
+            if not (
+                Order.objects.filter(**owned).exists()
+                or ArchivedOrder.objects.filter(**owned).exists()
+            ):
+                raise Http404
+        return Response({
+            "order": id,
+            "events": OrderEventSerializer(history, many=True).data,
+        })
+
     @action(detail=True, methods=["post"], url_path="change-status")
+    @idempotent
     def change_status(self, request, id=None):
         order = self.get_object()
 
@@ -34,6 +130,11 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         try:
             order.change_status(new_status)
+        except OrderStatusConflict as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_409_CONFLICT,
+            )
         except ValueError as e:
             return Response(
                 {"detail": str(e)},
@@ -43,4 +144,285 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response(
             {"detail": f"Order status updated to {order.status}"},
             status=status.HTTP_200_OK,
-        )
\ No newline at end of file
+        )
+
+    @action(detail=True, methods=["post"])
+    @idempotent
+    def pay(self, request, id=None):
+        order = self.get_object()
+
+        serializer = PaymentRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            payment = start_payment(order, serializer.validated_data["method"])
+        except PaymentError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # The charge runs in a payment worker: poll the order for the result
+        return Response(
+            PaymentSerializer(payment).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-status",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def bulk_status(self, request):
+        serializer = BulkOrderStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk_change_status(
+            serializer.validated_data["ids"],
+            serializer.validated_data["status"],
+        )
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"])
+    @idempotent
+    def checkout(self, request):
+        serializer = CheckoutSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+
+        cart = Cart.objects.filter(user=request.user).first()
+        if cart is None:
+            return Response(
+                {"detail": "Cart is empty."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            order = checkout(cart, **serializer.validated_data)
+        except CheckoutError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            OrderSerializer(order).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class CartStoreMixin:
+    """
+    Resolve the cart store for the request: the database cart for
+    authenticated users, a cache cart keyed by `X-Cart-Token` otherwise.
+    Anonymous responses always carry the (possibly new) token.
+    """
+
+    permission_classes = [permissions.AllowAny]
+    cart_token = None
+
+    def get_store(self, request):
+        if not request.user.is_authenticated:
+            token = request.headers.get(CART_TOKEN_HEADER)
+            self.cart_token = token if is_valid_token(token) else new_cart_token()
+        return get_cart_store(request, self.cart_token)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.cart_token:
+            response[CART_TOKEN_HEADER] = self.cart_token
+        return response
+
+
+class CartView(CartStoreMixin, APIView):
+
+    def get(self, request):
+        return Response(self.get_store(request).summary())
+
+    def delete(self, request):
+        self.get_store(request).clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartItemListView(CartStoreMixin, APIView):
+
+    def post(self, request):
+        serializer = CartLineSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            line = self.get_store(request).add(
+                data["pizza"],
+                data["size"],
+                quantity=data["quantity"],
+                extra_ids=data["extra_ingredients"],
+                removed_ids=data["removed_ingredients"],
+            )
+        except CartError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(line, status=status.HTTP_201_CREATED)
+
+
+class CartItemDetailView(CartStoreMixin, APIView):
+
+    def patch(self, request, line_id):
+        serializer = CartLineQuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            line = self.get_store(request).update(
+                line_id, serializer.validated_data["quantity"]
+            )
+        except KeyError:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except CartError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response(line)
+
+    def delete(self, request, line_id):
+        try:
+            self.get_store(request).remove(line_id)
+        except KeyError:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except CartError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DriverPingsView(APIView):
+    """
+    Batched driver GPS pings: `{"pings": [{"delivery": 1, "lat": 45.46,
+    "lon": 9.19, "at": 1767268800.0}, ...]}`. Neither authentication nor
+    ingestion queries the database.
+
+    Staff access comes from the token's `is_staff` claim, not the user
+    row: a demoted or deactivated staff user keeps posting pings until
+    their access token expires (`ACCESS_TOKEN_LIFETIME`).
+    """
+
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        try:
+            pings = tracking.parse_pings(request.data)
+        except tracking.InvalidPing as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        accepted = tracking.buffer.add(pings)
+        return Response(
+            {"accepted": accepted, "rejected": len(pings) - accepted},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class LiveLocationView(APIView):
+    """Latest driver position and trail of an order, served from the cache."""
+
+    authentication_classes = [JWTStatelessUserAuthentication]
+
+    def get(self, request, order_id):
+        position = tracking.live_position(order_id)
+        if position is None or not (
+            request.user.is_staff or position["user_id"] == str(request.user.id)
+        ):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "order": position["order"],
+            "latitude": position["latitude"],
+            "longitude": position["longitude"],
+            "at": position["at"],
+            "trail": position["trail"],
+        })
+
+
+class DeliveryQuotesView(APIView):
+    """
+    Delivery prices for many addresses at once, for reporting and zone
+    redesign: `{"addresses": [1, 2, ...]}`, optionally with candidate
+    `"zones": [{"name": "A", "radius_km": 2, "fee": "0.00"}, ...]` to
+    price against instead of the configured ones.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = DeliveryQuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        pricing = None
+        if "zones" in serializer.validated_data:
+            try:
+                pricing = delivery.DeliveryPricing(
+                    settings.DELIVERY_STORES, serializer.validated_data["zones"]
+                )
+            except delivery.InvalidZones as e:
+                return Response({"zones": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        results, summary = delivery.quote_addresses(
+            serializer.validated_data["addresses"], pricing
+        )
+        return Response({"results": results, "summary": summary})
+
+
+@sync_to_async
+def _stream_user(request):
+    """
+    Resolve the JWT user once per connection. `EventSource` cannot send
+    headers, so the access token may also come as `?token=`.
+    """
+    auth = JWTAuthentication()
+    raw_token = request.GET.get("token")
+    if not raw_token:
+        header = auth.get_header(request)
+        raw_token = header and auth.get_raw_token(header)
+    if not raw_token:
+        return None
+
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _csv_param(request, name):
+    return [value for value in request.GET.get(name, "").split(",") if value]
+
+
+async def order_events(request):
+    """
+    Server-Sent Events stream of order creation and status changes.
+
+    Staff receive every order; customers only their own. Narrow the
+    stream with `?status=confirmed,preparing` and `?order_type=delivery`.
+    """
+    user = await _stream_user(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    events.get_backend()
+    subscription = events.broker.subscribe(
+        statuses=_csv_param(request, "status"),
+        order_types=_csv_param(request, "order_type"),
+        user_id=None if user.is_staff else user.pk,
+    )
+
+    response = StreamingHttpResponse(
+        events.stream(subscription),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
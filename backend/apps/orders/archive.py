@@ -0,0 +1,56 @@
+"""
+Hot/cold separation for orders.
+
+`archive_orders()` moves delivered and cancelled orders older than
+`settings.ORDER_ARCHIVE_AFTER_DAYS` into `orders_order_archive`, one
+chunk per transaction: the chunk is copied with a single bulk INSERT and
+deleted from the live tables (items, payments and delivery info
+cascade). The live tables then only hold recent and in-flight orders,
+while archived ones stay readable through `ArchivedOrder.as_order()`.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.orders.models import ArchivedOrder, Order
+
+
+ARCHIVABLE_STATUSES = ["delivered", "cancelled"]
+
+
+def archivable_orders(older_than=None):
+    older_than = older_than or timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    return Order.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        created_at__lt=timezone.now() - older_than,
+    )
+
+
+def archive_orders(older_than=None, chunk_size=None):
+    """Archive every eligible order and return how many were moved."""
+    chunk_size = chunk_size or settings.ORDER_ARCHIVE_CHUNK_SIZE
+    queryset = (
+        archivable_orders(older_than)
+        .select_related("delivery_info")
+        .prefetch_related("items", "payments")
+        # Concurrent runs take disjoint chunks instead of colliding
+        .select_for_update(skip_locked=True, of=("self",))
+        .order_by("created_at", "id")
+    )
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(queryset[:chunk_size])
+            if not chunk:
+                return archived
+
+            ArchivedOrder.objects.bulk_create(
+                [ArchivedOrder.from_order(order) for order in chunk]
+            )
+            Order.objects.filter(pk__in=[order.pk for order in chunk]).delete()
+
+        archived += len(chunk)
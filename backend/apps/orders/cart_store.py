@@ -0,0 +1,396 @@
+"""
+Pluggable cart storage.
+
+Authenticated users keep their cart in `orders_cart`; anonymous visitors
+get a cache-backed cart addressed by an opaque `X-Cart-Token`, so
+browsing-and-abandoning never writes to the SQL database. Prices are
+taken from the in-process price matrix, which needs no query once warm.
+Cache carts are read-modified-written under a short lock taken with
+`cache.add()`, so concurrent requests on one token don't lose lines.
+When an anonymous visitor logs in, `merge_anonymous_cart()` re-prices
+the cached lines and folds the valid ones into their database cart in a
+fixed number of queries.
+
+Both stores expose lines as plain dicts:
+
+    {"id": 1, "pizza": 3, "size": 2, "quantity": 2,
+     "extra_ingredients": [7], "removed_ingredients": [],
+     "unit_price": "12.00", "extra_cost": "1.20", "subtotal": "26.40"}
+"""
+
+import logging
+import re
+import secrets
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.orders.models import Cart, CartItem
+from apps.products.models import Ingredient
+from apps.products.pricing import get_price_matrix
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+MAX_LINE_QUANTITY = 99
+# Seconds a cache cart lock lives, and how long writers wait for it
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 2
+
+
+class CartError(ValueError):
+    pass
+
+
+def new_cart_token():
+    return secrets.token_urlsafe(24)
+
+
+def is_valid_token(token):
+    return bool(token) and bool(TOKEN_PATTERN.match(token))
+
+
+def price_line(pizza_id, size_id, extra_ids, removed_ids):
+    """Return (unit_price, extra_cost) for a line, validated against the matrix."""
+    matrix = get_price_matrix()
+    try:
+        unit_price = matrix.price_for(pizza_id, size_id)
+        extra_cost = sum(
+            (matrix.extra_price(ingredient_id) for ingredient_id in extra_ids),
+            Decimal("0.00"),
+        )
+        for ingredient_id in removed_ids:
+            matrix.check_removable(pizza_id, ingredient_id)
+    except LookupError as e:
+        raise CartError(str(e)) from None
+    return unit_price, extra_cost
+
+
+def _line_key(pizza_id, size_id, extra_ids, removed_ids):
+    return (pizza_id, size_id, tuple(sorted(extra_ids)), tuple(sorted(removed_ids)))
+
+
+def _line(line_id, pizza_id, size_id, quantity, extra_ids, removed_ids,
+          unit_price, extra_cost):
+    unit_price = Decimal(unit_price)
+    extra_cost = Decimal(extra_cost)
+    return {
+        "id": line_id,
+        "pizza": pizza_id,
+        "size": size_id,
+        "quantity": quantity,
+        "extra_ingredients": sorted(extra_ids),
+        "removed_ingredients": sorted(removed_ids),
+        "unit_price": str(unit_price),
+        "extra_cost": str(extra_cost),
+        "subtotal": str((unit_price + extra_cost) * quantity),
+    }
+
+
+class BaseCartStore(ABC):
+
+    @abstractmethod
+    def lines(self):
+        ...
+
+    @abstractmethod
+    def add(self, pizza_id, size_id, quantity=1, extra_ids=(), removed_ids=()):
+        ...
+
+    @abstractmethod
+    def update(self, line_id, quantity):
+        ...
+
+    @abstractmethod
+    def remove(self, line_id):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    def summary(self):
+        lines = self.lines()
+        return {
+            "items": lines,
+            "total_items": sum(line["quantity"] for line in lines),
+            "total_price": str(sum(
+                (Decimal(line["subtotal"]) for line in lines), Decimal("0.00")
+            )),
+        }
+
+
+# -------------------------------------------------------------------
+# Anonymous carts (cache)
+# -------------------------------------------------------------------
+
+class CacheCartStore(BaseCartStore):
+    key_prefix = "cart"
+
+    def __init__(self, token):
+        self.token = token
+        self.cache = caches[settings.CART_CACHE_ALIAS]
+        self.key = f"{self.key_prefix}:{token}"
+
+    def _load(self):
+        return self.cache.get(self.key) or {"next_id": 1, "lines": []}
+
+    def _save(self, data):
+        self.cache.set(self.key, data, settings.ANONYMOUS_CART_TTL)
+
+    @contextmanager
+    def locked(self):
+        lock = f"{self.key}:lock"
+        deadline = time.monotonic() + LOCK_WAIT
+        while not self.cache.add(lock, 1, LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                raise CartError("The cart is being updated; please retry.")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            self.cache.delete(lock)
+
+    def lines(self):
+        return [_line(**line) for line in self._load()["lines"]]
+
+    def add(self, pizza_id, size_id, quantity=1, extra_ids=(), removed_ids=()):
+        unit_price, extra_cost = price_line(pizza_id, size_id, extra_ids, removed_ids)
+        key = _line_key(pizza_id, size_id, extra_ids, removed_ids)
+
+        with self.locked():
+            data = self._load()
+            for line in data["lines"]:
+                if _line_key(line["pizza_id"], line["size_id"], line["extra_ids"],
+                             line["removed_ids"]) == key:
+                    line["quantity"] = min(line["quantity"] + quantity, MAX_LINE_QUANTITY)
+                    break
+            else:
+                line = {
+                    "line_id": data["next_id"],
+                    "pizza_id": pizza_id,
+                    "size_id": size_id,
+                    "quantity": quantity,
+                    "extra_ids": sorted(extra_ids),
+                    "removed_ids": sorted(removed_ids),
+                    "unit_price": str(unit_price),
+                    "extra_cost": str(extra_cost),
+                }
+                data["next_id"] += 1
+                data["lines"].append(line)
+
+            self._save(data)
+        return _line(**line)
+
+    def update(self, line_id, quantity):
+        with self.locked():
+            data = self._load()
+            for line in data["lines"]:
+                if line["line_id"] == line_id:
+                    line["quantity"] = quantity
+                    self._save(data)
+                    return _line(**line)
+        raise KeyError(line_id)
+
+    def remove(self, line_id):
+        with self.locked():
+            data = self._load()
+            remaining = [line for line in data["lines"] if line["line_id"] != line_id]
+            if len(remaining) == len(data["lines"]):
+                raise KeyError(line_id)
+            data["lines"] = remaining
+            self._save(data)
+
+    def clear(self):
+        self.cache.delete(self.key)
+
+
+# -------------------------------------------------------------------
+# Authenticated carts (database)
+# -------------------------------------------------------------------
+
+class DatabaseCartStore(BaseCartStore):
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def cart(self):
+        if not hasattr(self, "_cart"):
+            self._cart, _ = Cart.objects.get_or_create(user=self.user)
+        return self._cart
+
+    def items(self):
+        ids = Ingredient.objects.only("pk")
+        return list(
+            CartItem.objects
+            .filter(cart__user=self.user)
+            .prefetch_related(
+                Prefetch("extra_ingredients", queryset=ids),
+                Prefetch("removed_ingredients", queryset=ids),
+            )
+            .order_by("pk")
+        )
+
+    @staticmethod
+    def item_key(item):
+        return _line_key(
+            item.pizza_id,
+            item.size_id,
+            [i.pk for i in item.extra_ingredients.all()],
+            [i.pk for i in item.removed_ingredients.all()],
+        )
+
+    @staticmethod
+    def as_line(item, extra_ids=None, removed_ids=None):
+        if extra_ids is None:
+            extra_ids = [i.pk for i in item.extra_ingredients.all()]
+        if removed_ids is None:
+            removed_ids = [i.pk for i in item.removed_ingredients.all()]
+        return _line(
+            item.pk, item.pizza_id, item.size_id, item.quantity,
+            extra_ids, removed_ids, item.unit_price, item.extra_cost,
+        )
+
+    def lines(self):
+        return [self.as_line(item) for item in self.items()]
+
+    def add(self, pizza_id, size_id, quantity=1, extra_ids=(), removed_ids=()):
+        unit_price, extra_cost = price_line(pizza_id, size_id, extra_ids, removed_ids)
+        key = _line_key(pizza_id, size_id, extra_ids, removed_ids)
+
+        with transaction.atomic():
+            for item in self.items():
+                if self.item_key(item) == key:
+                    item.quantity = min(item.quantity + quantity, MAX_LINE_QUANTITY)
+                    item.save(update_fields=["quantity", "update_at"])
+                    return self.as_line(item)
+
+            item = CartItem.objects.create(
+                cart=self.cart,
+                pizza_id=pizza_id,
+                size_id=size_id,
+                quantity=quantity,
+                unit_price=unit_price,
+                extra_cost=extra_cost,
+            )
+            item.extra_ingredients.set(extra_ids)
+            item.removed_ingredients.set(removed_ids)
+
+        return self.as_line(item, list(extra_ids), list(removed_ids))
+
+    def update(self, line_id, quantity):
+        item = CartItem.objects.filter(cart__user=self.user, pk=line_id).first()
+        if item is None:
+            raise KeyError(line_id)
+        item.quantity = quantity
+        item.save(update_fields=["quantity", "update_at"])
+        return self.as_line(item)
+
+    def remove(self, line_id):
+        deleted, _ = CartItem.objects.filter(cart__user=self.user, pk=line_id).delete()
+        if not deleted:
+            raise KeyError(line_id)
+
+    def clear(self):
+        CartItem.objects.filter(cart__user=self.user).delete()
+
+
+def get_cart_store(request, token=None):
+    if request.user.is_authenticated:
+        return DatabaseCartStore(request.user)
+    return CacheCartStore(token)
+
+
+def merge_anonymous_cart(token, user):
+    """
+    Fold the anonymous cart `token` into `user`'s database cart.
+
+    Every cached line is re-priced through `price_line()`, like a fresh
+    add: lines whose pizza, size or ingredients are no longer valid are
+    dropped. Matching lines add up their quantities, capped at
+    `MAX_LINE_QUANTITY`; the rest are bulk inserted together with their
+    ingredient M2M rows. Returns the number of lines merged.
+    """
+    anonymous = CacheCartStore(token)
+    with anonymous.locked():
+        lines = anonymous._load()["lines"]
+        if not lines:
+            return 0
+
+        valid = []
+        for line in lines:
+            # Lines cached before duplicates were rejected may repeat an id:
+            # the M2M tables hold each ingredient once per line
+            line = {
+                **line,
+                "extra_ids": sorted(set(line["extra_ids"])),
+                "removed_ids": sorted(set(line["removed_ids"])),
+            }
+            try:
+                unit_price, extra_cost = price_line(
+                    line["pizza_id"], line["size_id"], line["extra_ids"], line["removed_ids"]
+                )
+            except CartError as e:
+                logger.info("Dropped anonymous cart line on merge: %s", e)
+                continue
+            valid.append((line, unit_price, extra_cost))
+
+        store = DatabaseCartStore(user)
+        ExtraThrough = CartItem.extra_ingredients.through
+        RemovedThrough = CartItem.removed_ingredients.through
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = {store.item_key(item): item for item in store.items()}
+            changed = []
+            created = []
+
+            for line, unit_price, extra_cost in valid:
+                key = _line_key(line["pizza_id"], line["size_id"],
+                                line["extra_ids"], line["removed_ids"])
+                if key in existing:
+                    item = existing[key]
+                    item.quantity = min(item.quantity + line["quantity"], MAX_LINE_QUANTITY)
+                    item.update_at = now
+                    if item.pk:
+                        changed.append(item)
+                    continue
+
+                item = CartItem(
+                    cart=store.cart,
+                    pizza_id=line["pizza_id"],
+                    size_id=line["size_id"],
+                    quantity=min(line["quantity"], MAX_LINE_QUANTITY),
+                    unit_price=unit_price,
+                    extra_cost=extra_cost,
+                )
+                existing[key] = item
+                created.append((item, line))
+
+            if changed:
+                CartItem.objects.bulk_update(changed, ["quantity", "update_at"])
+
+            if created:
+                CartItem.objects.bulk_create([item for item, _ in created])
+                ExtraThrough.objects.bulk_create([
+                    ExtraThrough(cartitem_id=item.pk, ingredient_id=ingredient_id)
+                    for item, line in created
+                    for ingredient_id in line["extra_ids"]
+                ])
+                RemovedThrough.objects.bulk_create([
+                    RemovedThrough(cartitem_id=item.pk, ingredient_id=ingredient_id)
+                    for item, line in created
+                    for ingredient_id in line["removed_ids"]
+                ])
+
+        anonymous.clear()
+    return len(valid)
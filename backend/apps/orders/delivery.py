@@ -0,0 +1,226 @@
+"""
+Delivery distance, zone and fee.
+
+Stores (`settings.DELIVERY_STORES`) and zones (`settings.DELIVERY_ZONES`)
+are loaded once per process into NumPy arrays. `DeliveryPricing.locate()`
+prices any number of points at once: a haversine distance matrix against
+every store, the nearest store per point, then `np.searchsorted` over the
+zone radii for the zone, and so the fee. Points past the widest zone, or
+without coordinates, are not served.
+
+`quote_address()` prices one `Address` at checkout. Quotes are memoized
+per address location in an in-process LRU, so a repeat checkout is a
+dictionary lookup, and moving an address simply misses the cache.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.dispatch import receiver
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class DeliveryUnavailable(ValueError):
+    pass
+
+
+class InvalidZones(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class DeliveryQuote:
+    store: str
+    distance_km: float
+    zone: str
+    fee: Decimal
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points in degrees; arguments broadcast."""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    # Rounding can push antipodal points just past 1
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def parse_zones(zones):
+    """Validate zone definitions into (names, radii, fees), by ascending radius."""
+    try:
+        zones = sorted(
+            (
+                (float(zone["radius_km"]), str(zone["name"]), Decimal(str(zone["fee"])))
+                for zone in zones
+            ),
+            key=lambda zone: zone[0],
+        )
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        raise InvalidZones("Zones need a 'name', a 'radius_km' and a 'fee'.")
+
+    radii = [radius for radius, _, _ in zones]
+    if not zones or radii[0] <= 0 or len(set(radii)) != len(radii):
+        raise InvalidZones("Zones need distinct, positive radii.")
+    if any(fee < 0 for _, _, fee in zones):
+        raise InvalidZones("Zone fees can't be negative.")
+
+    return (
+        [name for _, name, _ in zones],
+        np.array(radii),
+        [fee.quantize(Decimal("0.01")) for _, _, fee in zones],
+    )
+
+
+class DeliveryPricing:
+
+    def __init__(self, stores, zones, cache_size=None):
+        if not stores:
+            raise ImproperlyConfigured("DELIVERY_STORES must list at least one store.")
+
+        self.store_names = [store["name"] for store in stores]
+        self.store_latitudes = np.array([float(store["latitude"]) for store in stores])
+        self.store_longitudes = np.array([float(store["longitude"]) for store in stores])
+        self.zone_names, self.radii, self.fees = parse_zones(zones)
+        self.quote = lru_cache(maxsize=cache_size)(self.quote)
+
+    def locate(self, latitudes, longitudes):
+        """
+        Price many points at once. Returns three arrays: the index of the
+        nearest store, the distance to it and the zone index, where
+        `len(self.fees)` means outside the delivery area. NaN coordinates
+        fall outside.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)[:, np.newaxis]
+        longitudes = np.asarray(longitudes, dtype=float)[:, np.newaxis]
+
+        distances = haversine_km(
+            latitudes, longitudes, self.store_latitudes, self.store_longitudes
+        )
+        nearest = distances.argmin(axis=1)
+        distance = distances[np.arange(len(distances)), nearest].round(3)
+        # A point exactly on a ring's radius still belongs to that ring
+        zone = np.searchsorted(self.radii, distance, side="left")
+        return nearest, distance, zone
+
+    def quote_many(self, latitudes, longitudes):
+        """A `DeliveryQuote` per point, None where there is no delivery."""
+        nearest, distance, zone = self.locate(latitudes, longitudes)
+        return list(map(self._quote, nearest.tolist(), distance.tolist(), zone.tolist()))
+
+    def quote(self, latitude, longitude):
+        """Memoized `DeliveryQuote` for one point, or None."""
+        return self.quote_many([latitude], [longitude])[0]
+
+    def _quote(self, store, distance, zone):
+        if zone >= len(self.fees):
+            return None
+        return DeliveryQuote(
+            self.store_names[store], distance, self.zone_names[zone], self.fees[zone]
+        )
+
+
+_pricing = None
+
+
+def get_pricing():
+    global _pricing
+    if _pricing is None:
+        _pricing = DeliveryPricing(
+            settings.DELIVERY_STORES,
+            settings.DELIVERY_ZONES,
+            settings.DELIVERY_QUOTE_CACHE_SIZE,
+        )
+    return _pricing
+
+
+@receiver(setting_changed)
+def _reset_pricing(setting, **kwargs):
+    global _pricing
+    if setting.startswith("DELIVERY_"):
+        _pricing = None
+
+
+def quote_address(address):
+    """Price delivery to `address`, or raise `DeliveryUnavailable`."""
+    if address is None:
+        raise DeliveryUnavailable("A delivery address is required.")
+    if address.latitude is None or address.longitude is None:
+        raise DeliveryUnavailable("This address has not been located yet.")
+
+    # Decimal coordinates hash exactly: the cache key is the location
+    quote = get_pricing().quote(address.latitude, address.longitude)
+    if quote is None:
+        raise DeliveryUnavailable("This address is outside our delivery area.")
+    return quote
+
+
+def quote_addresses(address_ids, pricing=None):
+    """
+    Price many addresses with one query and one `locate()` call. Returns
+    a result per address, in input order, and the count per zone:
+
+        [{"address": 1, "store": "...", "distance_km": 1.234, "zone": "A",
+          "fee": "0.00"}, {"address": 2, "zone": None, "detail": "..."}, ...],
+        {"A": 1, ..., "outside": 0, "unlocated": 0, "not_found": 1}
+    """
+    from apps.accounts.models import Address
+
+    pricing = pricing or get_pricing()
+    address_ids = list(dict.fromkeys(address_ids))
+    # Floats straight from the database: converting to Decimal and back
+    # would cost more than the pricing itself
+    coordinates = {
+        pk: (latitude, longitude)
+        for pk, latitude, longitude in Address.objects
+        .filter(pk__in=address_ids)
+        .values_list(
+            "pk", Cast("latitude", FloatField()), Cast("longitude", FloatField())
+        )
+    }
+    located = [pk for pk, point in coordinates.items() if None not in point]
+
+    nearest, distance, zone = pricing.locate(
+        [coordinates[pk][0] for pk in located],
+        [coordinates[pk][1] for pk in located],
+    )
+    counts = np.bincount(zone, minlength=len(pricing.fees) + 1).tolist()
+    summary = dict(zip(pricing.zone_names, counts))
+    summary["outside"] = counts[-1]
+    summary["unlocated"] = len(coordinates) - len(located)
+    summary["not_found"] = len(address_ids) - len(coordinates)
+
+    fees = [str(fee) for fee in pricing.fees]
+    results = {}
+    for pk, store, km, index in zip(
+        located, nearest.tolist(), distance.tolist(), zone.tolist()
+    ):
+        results[pk] = {
+            "address": pk,
+            "store": pricing.store_names[store],
+            "distance_km": km,
+            "zone": pricing.zone_names[index],
+            "fee": fees[index],
+        } if index < len(fees) else {
+            "address": pk,
+            "zone": None,
+            "detail": "Outside the delivery area.",
+        }
+
+    def unpriced(pk):
+        detail = "Address not found." if pk not in coordinates else (
+            "Address has not been located yet."
+        )
+        return {"address": pk, "zone": None, "detail": detail}
+
+    return [results.get(pk) or unpriced(pk) for pk in address_ids], summary
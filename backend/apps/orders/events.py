@@ -0,0 +1,232 @@
+"""
+Real-time order events.
+
+Order creation and status changes are published after commit to a
+backend (`settings.ORDER_EVENTS_BACKEND`). The local backend hands them
+straight to the in-process broker; the Redis backend fans them out over
+pub/sub so every worker's broker receives them. Each streaming
+connection is an asyncio queue registered with the broker, with its
+filters applied at publish time: idle connections cost a coroutine and
+a queue, never a database query.
+
+Event payload:
+
+    {"type": "order.status", "id": "...", "order_number": "PME-...",
+     "user_id": 1, "status": "ready", "order_type": "pickup",
+     "at": "2026-01-01T12:00:00+00:00"}
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = "order.created"
+ORDER_STATUS = "order.status"
+
+
+def build_event(event_type, order_id, order_number, user_id, status, order_type):
+    return {
+        "type": event_type,
+        "id": str(order_id),
+        "order_number": order_number,
+        "user_id": user_id,
+        "status": status,
+        "order_type": order_type,
+        "at": timezone.now().isoformat(),
+    }
+
+
+def event_for_order(event_type, order):
+    return build_event(
+        event_type,
+        order.pk,
+        order.order_number,
+        order.user_id,
+        order.status,
+        order.order_type,
+    )
+
+
+# -------------------------------------------------------------------
+# In-process broker
+# -------------------------------------------------------------------
+
+class Subscription:
+    """One streaming connection: a bounded queue plus its filters."""
+
+    def __init__(self, loop, statuses=None, order_types=None, user_id=None,
+                 max_pending=100):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.statuses = set(statuses or ())
+        self.order_types = set(order_types or ())
+        self.user_id = user_id
+
+    def matches(self, event):
+        if self.statuses and event["status"] not in self.statuses:
+            return False
+        if self.order_types and event["order_type"] not in self.order_types:
+            return False
+        if self.user_id is not None and event["user_id"] != self.user_id:
+            return False
+        return True
+
+    def _enqueue(self, event):
+        # Slow consumer: drop the oldest event rather than grow without bound
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self._enqueue, event)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker:
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, loop=None, **filters):
+        subscription = Subscription(loop or asyncio.get_running_loop(), **filters)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                try:
+                    subscription.deliver(event)
+                except RuntimeError:
+                    # The connection's event loop is gone
+                    self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+# -------------------------------------------------------------------
+# Backends
+# -------------------------------------------------------------------
+
+class LocalBackend:
+    """Single-process delivery: publish straight to this worker's broker."""
+
+    def publish(self, event):
+        broker.dispatch(event)
+
+
+class RedisBackend:
+    """
+    Cross-process delivery over Redis pub/sub. A daemon thread per worker
+    forwards messages from the channel to the local broker.
+    """
+
+    channel = "pizzamama:order-events"
+
+    def __init__(self, url=None):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured(
+                "RedisBackend requires the 'redis' package"
+            ) from e
+
+        self.client = redis.Redis.from_url(url or settings.REDIS_URL)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, event):
+        self.client.publish(self.channel, json.dumps(event))
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="order-events", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            try:
+                broker.dispatch(json.loads(message["data"]))
+            except (TypeError, ValueError):
+                logger.warning("Dropped malformed order event: %r", message)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.ORDER_EVENTS_BACKEND)()
+        if hasattr(_backend, "_ensure_listener"):
+            _backend._ensure_listener()
+    return _backend
+
+
+def publish(event):
+    """Publish `event` once the current transaction commits."""
+    transaction.on_commit(lambda: _publish_now(event))
+
+
+def _publish_now(event):
+    try:
+        get_backend().publish(event)
+    except Exception:
+        logger.exception("Failed to publish order event %s", event["type"])
+
+
+# -------------------------------------------------------------------
+# Server-Sent Events
+# -------------------------------------------------------------------
+
+def format_sse(event):
+    return (
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+    )
+
+
+async def stream(subscription, keepalive=None):
+    """Yield SSE frames for `subscription` until the client disconnects."""
+    keepalive = keepalive or settings.ORDER_EVENTS_KEEPALIVE
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await subscription.get(timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
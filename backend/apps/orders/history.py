@@ -0,0 +1,115 @@
+"""
+Append-only order history (`OrderEvent`).
+
+Transitions never wait on the history table: events are collected in
+memory and handed to the process-wide `writer` when their transaction
+commits, so a rolled-back change leaves no trace. A daemon thread then
+bulk-inserts them every `settings.ORDER_HISTORY_FLUSH_INTERVAL` seconds,
+or as soon as `ORDER_HISTORY_BATCH_SIZE` are pending. With an interval
+of 0 events are written synchronously at commit, one INSERT per
+transaction. A batch that fails to insert goes back to the buffer and
+is retried with the next flush (or, when synchronous, the next commit).
+Pending events are flushed at interpreter exit; a hard crash loses at
+most one interval of history.
+"""
+
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+STATUS = "status"
+PAYMENT = "payment"
+DELIVERY = "delivery"
+
+
+class HistoryWriter:
+
+    def __init__(self):
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, events):
+        if not settings.ORDER_HISTORY_FLUSH_INTERVAL:
+            with self._lock:
+                # Events of an earlier failed write go first
+                batch, self._pending = self._pending + list(events), []
+            self._write(batch)
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's thread and buffer are not ours
+                self._pending, self._thread, self._pid = [], None, os.getpid()
+            self._pending.extend(events)
+            full = len(self._pending) >= settings.ORDER_HISTORY_BATCH_SIZE
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="order-history", daemon=True
+                )
+                self._thread.start()
+
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, events):
+        from apps.orders.models import OrderEvent
+
+        try:
+            OrderEvent.objects.bulk_create(
+                events, batch_size=settings.ORDER_HISTORY_BATCH_SIZE
+            )
+        except Exception:
+            logger.exception(
+                "Failed to write %d order events; retrying with the next flush",
+                len(events),
+            )
+            with self._lock:
+                self._pending[:0] = events
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.ORDER_HISTORY_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+
+writer = HistoryWriter()
+atexit.register(writer.flush)
+
+
+def record(events):
+    """Queue `OrderEvent` instances for writing once the transaction commits."""
+    if events:
+        transaction.on_commit(lambda: writer.add(events))
+
+
+def event(order_id, kind, from_status="", to_status="", at=None, **data):
+    from apps.orders.models import OrderEvent
+
+    return OrderEvent(
+        order_id=order_id,
+        kind=kind,
+        from_status=from_status,
+        to_status=to_status,
+        data=data,
+        created_at=at or timezone.now(),
+    )
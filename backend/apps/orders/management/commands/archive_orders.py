@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.orders.archive import archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move old delivered/cancelled orders into the order archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help="Archive orders created more than this many days ago.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the orders that would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options["days"])
+
+        if options["dry_run"]:
+            count = archivable_orders(older_than).count()
+            self.stdout.write(f"{count} orders would be archived.")
+            return
+
+        count = archive_orders(older_than, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} orders."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.payments import run_worker
+
+
+class Command(BaseCommand):
+    help = "Process queued payment charges from the payment outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the outbox is empty instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        totals = run_worker(
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+        )
+        summary = ", ".join(f"{count} {outcome}" for outcome, count in sorted(totals.items()))
+        self.stdout.write(self.style.SUCCESS(f"Payments processed: {summary or 'none'}."))
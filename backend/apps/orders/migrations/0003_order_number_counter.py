@@ -0,0 +1,24 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('next_value', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'orders_order_number_counter',
+            },
+        ),
+    ]
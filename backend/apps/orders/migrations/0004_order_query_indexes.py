@@ -0,0 +1,24 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_profile_avatar_variants'),
+        ('orders', '0003_order_number_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed', 'preparing', 'ready', 'out_for_delivery'])), fields=['status', 'created_at'], name='order_active_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['order', 'status'], name='payment_order_status_idx'),
+        ),
+    ]
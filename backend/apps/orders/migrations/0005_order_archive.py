@@ -0,0 +1,35 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:22
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('order_number', models.CharField(max_length=20, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'In Attesa'), ('confirmed', 'Confermato'), ('preparing', 'In Preparazione'), ('ready', 'Pronto'), ('out_for_delivery', 'In Consegna'), ('delivered', 'Consegnato'), ('cancelled', 'Annullato'), ('refunded', 'Rimborsato')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('month', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'orders_order_archive',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='archive_user_created_idx'), models.Index(fields=['month'], name='archive_month_idx')],
+            },
+        ),
+    ]
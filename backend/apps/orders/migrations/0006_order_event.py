@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:24
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('created', 'Creato'), ('status', 'Stato'), ('payment', 'Pagamento'), ('delivery', 'Consegna')], max_length=20)),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(blank=True, max_length=20)),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='history', to='orders.order')),
+            ],
+            options={
+                'db_table': 'orders_order_event',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['order', 'created_at', 'id'], name='order_event_timeline_idx'), models.Index(fields=['created_at'], name='order_event_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e ora di creazione del record.')),
+                ('update_at', models.DateTimeField(auto_now=True, help_text="Data e l'ora di l'ultima modifica.")),
+                ('status', models.CharField(choices=[('pending', 'In attesa'), ('processing', 'In elaborazione'), ('done', 'Completato'), ('failed', 'Fallito')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claim', models.UUIDField(blank=True, null=True)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='orders.payment')),
+            ],
+            options={
+                'db_table': 'orders_payment_outbox',
+                'indexes': [models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['status', 'available_at'], name='payment_outbox_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_payment_outbox'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'processing', 'completed'])), fields=('order',), name='payment_one_open_per_order'),
+        ),
+    ]
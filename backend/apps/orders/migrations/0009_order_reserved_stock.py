@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_payment_one_open_per_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='reserved_stock',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
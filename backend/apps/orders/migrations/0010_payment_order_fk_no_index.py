@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-18 00:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_reserved_stock'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='order',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='orders.order'),
+        ),
+    ]
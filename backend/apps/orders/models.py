@@ -1,8 +1,18 @@
-from django.db import models
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper, F, Max, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from django.utils.functional import cached_property
+from apps.orders import events, history
+from apps.orders.numbering import next_order_number
+from apps.products import stock
 from apps.products.models import Pizza, PizzaSize, Ingredient
 from apps.accounts.models import Address
 from apps.core.models import TimeStampedModel
@@ -10,6 +20,34 @@ import uuid
 
 
 # CART
+def _line_total(prefix=""):
+    return ExpressionWrapper(
+        (F(f"{prefix}unit_price") + F(f"{prefix}extra_cost")) * F(f"{prefix}quantity"),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+class CartQuerySet(models.QuerySet):
+
+    def with_totals(self):
+        """Annotate `items_count` and `items_total` for every cart in one query."""
+        return self.annotate(
+            items_count=Coalesce(Sum("items__quantity"), 0),
+            items_total=Coalesce(
+                Sum(_line_total("items__")),
+                Value(Decimal("0.00")),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+
+    def abandoned(self, older_than=timedelta(hours=24)):
+        """Carts with items that nobody has touched for `older_than`."""
+        return (
+            self.alias(last_activity=Max("items__update_at"))
+            .filter(last_activity__lt=timezone.now() - older_than)
+        )
+
+
 class Cart(TimeStampedModel):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -20,6 +58,8 @@ class Cart(TimeStampedModel):
     )
     session_key = models.CharField(max_length=40, null=True, blank=True)
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         db_table = "orders_cart"
         constraints = [
@@ -30,13 +70,43 @@ class Cart(TimeStampedModel):
             )
         ]
 
+    def get_totals(self):
+        """
+        Return (items_count, items_total), reusing `with_totals()` annotations
+        or prefetched items when present, otherwise one aggregate query.
+        """
+        if hasattr(self, "items_count") and hasattr(self, "items_total"):
+            return self.items_count, self.items_total
+
+        if "items" in getattr(self, "_prefetched_objects_cache", {}):
+            items = self.items.all()
+            return (
+                sum(item.quantity for item in items),
+                sum((item.subtotal for item in items), Decimal("0.00")),
+            )
+
+        totals = self.items.aggregate(
+            items_count=Coalesce(Sum("quantity"), 0),
+            items_total=Coalesce(
+                Sum(_line_total()),
+                Value(Decimal("0.00")),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+        return totals["items_count"], totals["items_total"]
+
+    @cached_property
+    def totals(self):
+        """`get_totals()`, computed once per instance for both properties."""
+        return self.get_totals()
+
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.totals[0]
 
     @property
     def total_price(self):
-        return sum(item.subtotal for item in self.items.all())
+        return self.totals[1]
 
     def __str__(self):
         return self.user.username if self.user else f"Session {self.session_key}"
@@ -81,7 +151,46 @@ class CartItem(TimeStampedModel):
         return (self.unit_price + self.extra_cost) * self.quantity
 
 
+# ORDER NUMBER COUNTER
+class OrderNumberCounter(models.Model):
+    """Next free order number of a day; workers lease blocks from it."""
+
+    day = models.DateField(unique=True)
+    next_value = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = "orders_order_number_counter"
+
+    def __str__(self):
+        return f"{self.day}: {self.next_value}"
+
+
 # ORDER
+class OrderStatusConflict(ValueError):
+    """The order's status changed since it was loaded."""
+
+    def __init__(self, order_id, expected_status):
+        self.order_id = order_id
+        self.expected_status = expected_status
+        super().__init__(
+            f"Order {order_id} is no longer {expected_status}; reload and retry"
+        )
+
+
+# Statuses a kitchen/staff queue works on; the rest is history
+ACTIVE_ORDER_STATUSES = ["pending", "confirmed", "preparing", "ready", "out_for_delivery"]
+
+
+class OrderQuerySet(models.QuerySet):
+
+    def active(self, since=None):
+        """Orders still moving through the kitchen, oldest first."""
+        queryset = self.filter(status__in=ACTIVE_ORDER_STATUSES)
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        return queryset.order_by("created_at")
+
+
 class Order(TimeStampedModel):
 
     STATUS_CHOICES = [
@@ -109,6 +218,13 @@ class Order(TimeStampedModel):
         "out_for_delivery": ["delivered"],
     }
 
+    STATUS_TIMESTAMPS = {
+        "confirmed": "confirmed_at",
+        "delivered": "delivered_at",
+    }
+
+    STATUS_FIELDS = {"status", "confirmed_at", "delivered_at", "update_at"}
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
     order_number = models.CharField(max_length=20, unique=True)
@@ -147,9 +263,29 @@ class Order(TimeStampedModel):
     confirmed_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
 
+    # Units taken from stock at confirmation ({"<ingredient id>": units}),
+    # so cancelling gives back exactly that even if recipes changed since
+    reserved_stock = models.JSONField(default=dict, blank=True, editable=False)
+
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         db_table = "orders_order"
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # Seek index for the keyset-paginated order history
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="order_user_created_idx",
+            ),
+            # Staff queues only ever look at live orders: leave the
+            # delivered/cancelled history out of the index
+            models.Index(
+                fields=["status", "created_at"],
+                name="order_active_status_idx",
+                condition=models.Q(status__in=ACTIVE_ORDER_STATUSES),
+            ),
+        ]
 
     def clean(self):
         calculated_total = (
@@ -163,6 +299,13 @@ class Order(TimeStampedModel):
             raise ValidationError("Total amount is inconsistent.")
 
     def change_status(self, new_status):
+        """
+        Move the order to `new_status` with a compare-and-swap UPDATE.
+
+        Only `status`, `update_at` and the matching timestamp are written,
+        and only if the row still has the status this instance was loaded
+        with; otherwise `OrderStatusConflict` is raised.
+        """
         allowed = self.VALID_TRANSITIONS.get(self.status, [])
 
         if new_status not in allowed:
@@ -170,24 +313,78 @@ class Order(TimeStampedModel):
                 f"Invalid status transition from {self.status} to {new_status}"
             )
 
-        self.status = new_status
-
-        if new_status == "confirmed":
-            self.confirmed_at = timezone.now()
+        now = timezone.now()
+        changes = {"status": new_status, "update_at": now}
+        if new_status in self.STATUS_TIMESTAMPS:
+            changes[self.STATUS_TIMESTAMPS[new_status]] = now
+
+        # Confirming consumes ingredient stock; cancelling gives it back
+        reserve = new_status == "confirmed"
+        release = new_status == "cancelled" and self.status == "confirmed"
+
+        if reserve:
+            requirements = self.stock_requirements()
+            changes["reserved_stock"] = {str(pk): units for pk, units in requirements.items()}
+            with transaction.atomic():
+                self._swap_status(changes)
+                stock.reserve(requirements)
+        elif release:
+            requirements = self.released_stock()
+            changes["reserved_stock"] = {}
+            with transaction.atomic():
+                self._swap_status(changes)
+                stock.release(requirements)
+        else:
+            self._swap_status(changes)
+
+        history.record([
+            history.event(self.pk, history.STATUS, self.status, new_status, at=now)
+        ])
+
+        for field, value in changes.items():
+            setattr(self, field, value)
+
+        events.publish(events.event_for_order(events.ORDER_STATUS, self))
+
+    def _swap_status(self, changes):
+        updated = (
+            Order.objects
+            .filter(pk=self.pk, status=self.status)
+            .update(**changes)
+        )
+        if not updated:
+            raise OrderStatusConflict(self.pk, self.status)
 
-        if new_status == "delivered":
-            self.delivered_at = timezone.now()
+    def stock_requirements(self):
+        return stock.requirements_for_items(self.items.select_related("size"))
 
-        self.save()
+    def released_stock(self):
+        """What cancelling gives back: the units reserved at confirmation."""
+        if not self.reserved_stock:
+            # Confirmed before reservations were recorded
+            return self.stock_requirements()
+        return {int(pk): units for pk, units in self.reserved_stock.items()}
 
     def save(self, *args, **kwargs):
         if not self.order_number:
-            self.order_number = f"PME-{uuid.uuid4().hex[:8].upper()}"
+            self.order_number = next_order_number()
 
-        self.full_clean()
+        # Status-only writes cannot break the amounts: skip validation.
+        # Allocated numbers are unique by construction: skip the unique check.
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or not set(update_fields) <= self.STATUS_FIELDS:
+            self.full_clean(validate_unique=False)
 
+        creating = self._state.adding
         super().save(*args, **kwargs)
 
+        if creating:
+            history.record([
+                history.event(self.pk, history.CREATED, to_status=self.status,
+                              at=self.created_at)
+            ])
+            events.publish(events.event_for_order(events.ORDER_CREATED, self))
+
     def __str__(self):
         return self.order_number
 
@@ -230,6 +427,11 @@ class OrderItem(TimeStampedModel):
 
 
 # PAYMENT
+
+# An order has at most one payment in one of these statuses
+OPEN_PAYMENT_STATUSES = ["pending", "processing", "completed"]
+
+
 class Payment(TimeStampedModel):
 
     STATUS_CHOICES = [
@@ -252,6 +454,8 @@ class Payment(TimeStampedModel):
         Order,
         on_delete=models.CASCADE,
         related_name="payments",
+        # Covered by the (order, status) index
+        db_index=False,
     )
 
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -264,6 +468,79 @@ class Payment(TimeStampedModel):
 
     class Meta:
         db_table = "orders_payment"
+        indexes = [
+            models.Index(fields=["order", "status"], name="payment_order_status_idx"),
+        ]
+        constraints = [
+            # Backstop against double charges if two requests race past
+            # the order lock in `start_payment()`
+            models.UniqueConstraint(
+                fields=["order"],
+                condition=models.Q(status__in=OPEN_PAYMENT_STATUSES),
+                name="payment_one_open_per_order",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.status if "status" in field_names else None
+        return instance
+
+    def save(self, *args, **kwargs):
+        previous = getattr(self, "_loaded_status", "")
+        super().save(*args, **kwargs)
+
+        if self.status != previous:
+            history.record([
+                history.event(
+                    self.order_id, history.PAYMENT, previous or "", self.status,
+                    payment=self.pk, amount=self.amount, method=self.method,
+                )
+            ])
+            self._loaded_status = self.status
+
+
+# PAYMENT OUTBOX
+class PaymentOutbox(TimeStampedModel):
+    """
+    Gateway work for a payment, written in the same transaction as the
+    payment and processed later by `process_payments` workers.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "In attesa"),
+        ("processing", "In elaborazione"),
+        ("done", "Completato"),
+        ("failed", "Fallito"),
+    ]
+
+    payment = models.ForeignKey(
+        Payment,
+        on_delete=models.CASCADE,
+        related_name="outbox",
+    )
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+
+    # Set by the worker that claimed the row, until `locked_until`
+    claim = models.UUIDField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = "orders_payment_outbox"
+        indexes = [
+            # Workers only ever look for due or stale work
+            models.Index(
+                fields=["status", "available_at"],
+                name="payment_outbox_due_idx",
+                condition=models.Q(status__in=["pending", "processing"]),
+            ),
+        ]
 
 
 # DELIVERY INFO
@@ -301,4 +578,162 @@ class DeliveryInfo(TimeStampedModel):
     )
 
     class Meta:
-        db_table = "orders_delivery_info"
\ No newline at end of file
+        db_table = "orders_delivery_info"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.status if "status" in field_names else None
+        return instance
+
+    def save(self, *args, **kwargs):
+        previous = getattr(self, "_loaded_status", "")
+        super().save(*args, **kwargs)
+
+        if self.status != previous:
+            history.record([
+                history.event(
+                    self.order_id, history.DELIVERY, previous or "", self.status,
+                    driver=self.driver_name,
+                )
+            ])
+            self._loaded_status = self.status
+
+
+# ORDER EVENT
+class OrderEvent(models.Model):
+    """
+    Append-only history of an order. Rows outlive their order (no FK
+    constraint), so archived orders keep their timeline.
+    """
+
+    KIND_CHOICES = [
+        ("created", "Creato"),
+        ("status", "Stato"),
+        ("payment", "Pagamento"),
+        ("delivery", "Consegna"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="history",
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20, blank=True)
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "orders_order_event"
+        ordering = ["created_at", "id"]
+        indexes = [
+            # One order's timeline, already in order
+            models.Index(
+                fields=["order", "created_at", "id"],
+                name="order_event_timeline_idx",
+            ),
+            # Time-range scans for prep/delivery time analytics
+            models.Index(fields=["created_at"], name="order_event_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} {self.kind}: {self.from_status} -> {self.to_status}"
+
+
+# ORDER ARCHIVE
+def _row(instance):
+    row = {}
+    for field in instance._meta.concrete_fields:
+        value = field.value_from_object(instance)
+        if isinstance(value, datetime):
+            # DjangoJSONEncoder would truncate to milliseconds
+            value = value.isoformat()
+        row[field.attname] = value
+    return row
+
+
+def _restore(model, row):
+    fields = [field for field in model._meta.concrete_fields if field.attname in row]
+    return model.from_db(
+        None,
+        [field.attname for field in fields],
+        [field.to_python(row[field.attname]) for field in fields],
+    )
+
+
+class ArchivedOrder(models.Model):
+    """
+    A delivered/cancelled order moved out of the live tables, together
+    with its items, payments and delivery info, as one JSON document.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    order_number = models.CharField(max_length=20, unique=True)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name="archived_orders",
+    )
+
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+
+    # First day of the order's month: the archive's partition key
+    month = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        db_table = "orders_order_archive"
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="archive_user_created_idx",
+            ),
+            models.Index(fields=["month"], name="archive_month_idx"),
+        ]
+
+    @classmethod
+    def from_order(cls, order):
+        """Build the archive row; `items`/`payments`/`delivery_info` should be preloaded."""
+        delivery_info = getattr(order, "delivery_info", None)
+        return cls(
+            id=order.pk,
+            order_number=order.order_number,
+            user_id=order.user_id,
+            status=order.status,
+            created_at=order.created_at,
+            month=timezone.localdate(order.created_at).replace(day=1),
+            payload={
+                "order": _row(order),
+                "items": [_row(item) for item in order.items.all()],
+                "payments": [_row(payment) for payment in order.payments.all()],
+                "delivery_info": _row(delivery_info) if delivery_info else None,
+            },
+        )
+
+    def as_order(self):
+        """Rebuild a read-only `Order` with its related rows prefetched."""
+        order = _restore(Order, self.payload["order"])
+        order._prefetched_objects_cache = {
+            "items": [_restore(OrderItem, row) for row in self.payload["items"]],
+            "payments": [_restore(Payment, row) for row in self.payload["payments"]],
+        }
+        delivery_info = self.payload["delivery_info"]
+        if delivery_info:
+            order.delivery_info = _restore(DeliveryInfo, delivery_info)
+        return order
+
+    def __str__(self):
+        return self.order_number
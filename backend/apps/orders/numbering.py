@@ -0,0 +1,131 @@
+"""
+Sequential, per-day order numbers: `PME-YYMMDD-NNNNN`.
+
+Each worker process leases a block of numbers from the day's
+`OrderNumberCounter` row with a single conditional UPDATE, then hands
+them out from an in-memory `itertools.count` without touching the
+database or taking a lock until the block runs out. Numbers are unique
+by construction, so `Order.save()` needs no uniqueness pre-check; the
+unique index stays as a backstop. Unused numbers of a block are lost
+when a process exits, so sequences can have gaps.
+
+A block leased inside a caller's transaction is only shared once that
+transaction commits: if it rolls back, the counter UPDATE is undone and
+the block is dropped so another process can't receive the same range.
+The lease only holds a weak reference to its `on_commit` callback;
+Django discards the callbacks of a rolled back transaction or savepoint,
+and with it the last reference, so the lease sees the rollback without
+inspecting the connection.
+"""
+
+import itertools
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+PREFIX = "PME"
+
+
+def format_number(day, value):
+    return f"{PREFIX}-{day:%y%m%d}-{value:05d}"
+
+
+def lease_block(day, size):
+    """Reserve `size` numbers for `day` and return the first one."""
+    from apps.orders.models import OrderNumberCounter
+
+    counters = OrderNumberCounter.objects.filter(day=day)
+
+    while True:
+        with transaction.atomic():
+            # Write first: the row lock is held before we read our range back
+            if counters.update(next_value=F("next_value") + size):
+                return counters.values_list("next_value", flat=True).get() - size
+
+            try:
+                with transaction.atomic():
+                    OrderNumberCounter.objects.create(day=day, next_value=1 + size)
+                return 1
+            except IntegrityError:
+                # Another process created today's row first: lease from it
+                continue
+
+
+@dataclass
+class _Lease:
+    pid: int
+    thread: int
+    day: object
+    numbers: itertools.count
+    end: int
+    confirmed: bool = True
+    # Weak reference to the on_commit callback of an unconfirmed lease
+    callback: object = None
+
+    def is_usable(self, day):
+        # A forked child must not reuse its parent's block
+        if self.pid != os.getpid() or self.day != day:
+            return False
+        if self.confirmed:
+            return True
+        # Uncommitted lease: only its own thread, and only while the
+        # transaction that took it is alive (rollback drops the callback)
+        return threading.get_ident() == self.thread and self.callback() is not None
+
+
+class OrderNumberAllocator:
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._current = None
+        self._lock = threading.Lock()
+
+    def _take(self, lease, day):
+        if lease is None or not lease.is_usable(day):
+            return None
+        value = next(lease.numbers)
+        return value if value < lease.end else None
+
+    def _lease(self, day):
+        size = self.block_size or settings.ORDER_NUMBER_BLOCK_SIZE
+        in_transaction = connection.in_atomic_block
+        start = lease_block(day, size)
+
+        lease = _Lease(
+            os.getpid(), threading.get_ident(), day, itertools.count(start), start + size
+        )
+        if in_transaction:
+            def confirm():
+                lease.confirmed = True
+
+            lease.confirmed = False
+            lease.callback = weakref.ref(confirm)
+            transaction.on_commit(confirm)
+        return lease
+
+    def next_number(self, day=None):
+        day = day or timezone.localdate()
+
+        value = self._take(self._current, day)
+        if value is None:
+            with self._lock:
+                value = self._take(self._current, day)
+                if value is None:
+                    self._current = self._lease(day)
+                    value = next(self._current.numbers)
+
+        return format_number(day, value)
+
+
+allocator = OrderNumberAllocator()
+
+
+def next_order_number():
+    return allocator.next_number()
@@ -0,0 +1,323 @@
+"""
+Asynchronous payment processing through a transactional outbox.
+
+`start_payment()` records a pending `Payment` together with a
+`PaymentOutbox` row in one transaction, so gateway work is enqueued if
+and only if the payment exists. Requests never wait on the gateway.
+
+Workers (`manage.py process_payments`) claim due rows in batches with a
+conditional UPDATE stamped with a claim token, call the gateway from a
+thread pool, then settle each row in one transaction: the payment gets
+its final status and an approved payment confirms its order. A claimed
+payment is "processing" while its charge is in flight. A paid order
+that can't be confirmed is settled as "unconfirmed" and the reason is
+kept on its payment history event, for staff to resolve. Every
+write is conditional on the claim token, so a worker whose lease
+expired cannot overwrite the result of the one that took over.
+Transient gateway errors are retried with exponential backoff up to
+`settings.PAYMENT_MAX_ATTEMPTS`; declines are final.
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.orders import history
+from apps.orders.models import OPEN_PAYMENT_STATUSES, Order, Payment, PaymentOutbox
+
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_METHODS = ["card", "paypal"]
+
+
+class PaymentError(ValueError):
+    pass
+
+
+# -------------------------------------------------------------------
+# Gateways
+# -------------------------------------------------------------------
+
+class GatewayError(Exception):
+    """Transient gateway failure (timeout, 5xx): the charge may be retried."""
+
+
+@dataclass
+class GatewayResult:
+    approved: bool
+    transaction_id: str = ""
+    response: dict = field(default_factory=dict)
+
+
+class StubGateway:
+    """
+    Local stand-in for a card gateway, for development and offline
+    benchmarks. Each charge sleeps `latency` ± `jitter` seconds, then
+    fails transiently with probability `failure_rate` or is declined with
+    probability `decline_rate`. Like real gateways it is idempotent per
+    payment: charging the same payment again returns the first outcome.
+    """
+
+    def __init__(self, latency=0.2, jitter=0.05, failure_rate=0.05,
+                 decline_rate=0.02, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self._random = random.Random(seed)
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def charge(self, payment_id, amount, method):
+        with self._lock:
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+        if delay:
+            time.sleep(delay)
+
+        with self._lock:
+            if payment_id in self._results:
+                return self._results[payment_id]
+            if roll < self.failure_rate:
+                raise GatewayError("Gateway timeout")
+
+            approved = roll < 1 - self.decline_rate
+            result = GatewayResult(
+                approved=approved,
+                transaction_id=f"stub_{uuid.uuid4().hex[:16]}" if approved else "",
+                response={
+                    "gateway": "stub",
+                    "amount": str(amount),
+                    "method": method,
+                    "outcome": "approved" if approved else "declined",
+                },
+            )
+            self._results[payment_id] = result
+            return result
+
+
+_gateway = None
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        config = settings.PAYMENT_GATEWAY
+        _gateway = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+    return _gateway
+
+
+# -------------------------------------------------------------------
+# Enqueueing
+# -------------------------------------------------------------------
+
+def start_payment(order, method):
+    """Record a pending payment for `order` and enqueue its gateway charge."""
+    if method not in GATEWAY_METHODS:
+        raise PaymentError(f"{method} payments are not processed online.")
+
+    with transaction.atomic():
+        # Concurrent /pay/ calls for one order queue on its row lock, so
+        # the later ones see the payment the first one created
+        locked = Order.objects.select_for_update().only("status").get(pk=order.pk)
+        if locked.status != "pending":
+            raise PaymentError("Only pending orders can be paid.")
+        if order.payments.filter(status__in=OPEN_PAYMENT_STATUSES).exists():
+            raise PaymentError("This order already has a payment in progress.")
+
+        try:
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    order=order,
+                    amount=order.total_amount,
+                    method=method,
+                    status="pending",
+                )
+        except IntegrityError:
+            raise PaymentError("This order already has a payment in progress.") from None
+        PaymentOutbox.objects.create(payment=payment)
+
+    return payment
+
+
+# -------------------------------------------------------------------
+# Processing
+# -------------------------------------------------------------------
+
+def backoff(attempts):
+    """Seconds to wait before retry number `attempts`, jittered to spread retries."""
+    ceiling = min(
+        settings.PAYMENT_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.PAYMENT_RETRY_BACKOFF_MAX,
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _due(now):
+    # Pending work whose time has come, or claims whose worker vanished
+    return (
+        Q(status="pending", available_at__lte=now)
+        | Q(status="processing", locked_until__lt=now)
+    )
+
+
+def claim(batch_size):
+    """Claim up to `batch_size` due outbox rows for this worker."""
+    now = timezone.now()
+    ids = list(
+        PaymentOutbox.objects
+        .filter(_due(now))
+        .order_by("available_at")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    token = uuid.uuid4()
+    with transaction.atomic():
+        # Rows another worker claimed in between no longer match `_due`
+        PaymentOutbox.objects.filter(_due(now), pk__in=ids).update(
+            status="processing",
+            claim=token,
+            locked_until=now + timedelta(seconds=settings.PAYMENT_CLAIM_TIMEOUT),
+            attempts=F("attempts") + 1,
+            update_at=now,
+        )
+        Payment.objects.filter(outbox__claim=token, status="pending").update(
+            status="processing", update_at=now,
+        )
+    return list(
+        PaymentOutbox.objects
+        .filter(claim=token)
+        .select_related("payment__order")
+    )
+
+
+def _settle(entry, result=None, error=None):
+    """
+    Apply a gateway outcome to `entry`; return "completed", "unconfirmed"
+    (paid, but the order could not be confirmed), "failed", "retry" or "lost".
+    """
+    now = timezone.now()
+    payment = entry.payment
+    mine = PaymentOutbox.objects.filter(pk=entry.pk, claim=entry.claim)
+
+    if error is not None and entry.attempts < settings.PAYMENT_MAX_ATTEMPTS:
+        with transaction.atomic():
+            retried = mine.update(
+                status="pending",
+                claim=None,
+                locked_until=None,
+                available_at=now + timedelta(seconds=backoff(entry.attempts)),
+                last_error=str(error),
+                update_at=now,
+            )
+            if retried:
+                # Nothing in flight until the next claim
+                Payment.objects.filter(pk=payment.pk, status="processing").update(
+                    status="pending", update_at=now,
+                )
+        return "retry" if retried else "lost"
+
+    approved = result is not None and result.approved
+    new_status = "completed" if approved else "failed"
+
+    with transaction.atomic():
+        settled = mine.update(
+            status="done" if approved else "failed",
+            claim=None,
+            locked_until=None,
+            last_error="" if error is None else str(error),
+            update_at=now,
+        )
+        if not settled:
+            return "lost"
+
+        Payment.objects.filter(pk=payment.pk, status__in=["pending", "processing"]).update(
+            status=new_status,
+            transaction_id=result.transaction_id if result else "",
+            gateway_response=result.response if result else {"error": str(error)},
+            update_at=now,
+        )
+
+        outcome, details = new_status, {}
+        order = payment.order
+        if approved and order.status == "pending":
+            try:
+                with transaction.atomic():
+                    order.change_status("confirmed")
+            except ValueError as e:
+                # The money is in; staff must resolve the order by hand
+                logger.error("Paid order %s could not be confirmed: %s", order.pk, e)
+                outcome, details = "unconfirmed", {"confirmation_error": str(e)}
+
+        history.record([
+            history.event(
+                payment.order_id, history.PAYMENT, payment.status, new_status,
+                at=now, payment=payment.pk, amount=payment.amount, method=payment.method,
+                **details,
+            )
+        ])
+
+    return outcome
+
+
+def process_entry(entry, gateway=None):
+    gateway = gateway or get_gateway()
+    payment = entry.payment
+    try:
+        result = gateway.charge(payment.pk, payment.amount, payment.method)
+    except GatewayError as e:
+        return _settle(entry, error=e)
+    return _settle(entry, result=result)
+
+
+def process_batch(batch_size, executor=None, gateway=None):
+    """Claim and process one batch; return a Counter of outcomes."""
+    entries = claim(batch_size)
+    gateway = gateway or get_gateway()
+
+    def run(entry):
+        try:
+            return process_entry(entry, gateway)
+        except Exception:
+            logger.exception("Payment outbox entry %s crashed", entry.pk)
+            return "error"
+        finally:
+            if executor:
+                # Pool threads own their connections
+                close_old_connections()
+
+    outcomes = executor.map(run, entries) if executor else map(run, entries)
+    return Counter(outcomes)
+
+
+def run_worker(workers=4, batch_size=None, poll_interval=1.0, once=False):
+    """Process the outbox until stopped (or until it is empty, with `once`)."""
+    batch_size = batch_size or workers * 4
+    totals = Counter()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="payments") as pool:
+        while True:
+            outcomes = process_batch(batch_size, executor=pool)
+            totals.update(outcomes)
+            if not outcomes:
+                if once and not PaymentOutbox.objects.filter(
+                    status__in=["pending", "processing"]
+                ).exists():
+                    return totals
+                time.sleep(poll_interval)
@@ -0,0 +1,230 @@
+"""
+Order workflows that span several models.
+
+`checkout()` turns a cart into an order in one transaction with a fixed
+number of queries: cart lines, their pizzas/sizes and both ingredient
+M2Ms are prefetched, unit prices come from the in-process price matrix,
+snapshots are built in memory and the order items are bulk inserted.
+The delivery fee is priced server-side from the address coordinates.
+
+`bulk_change_status()` moves many orders at once with one conditional
+UPDATE per source status. Both publish order events after commit.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.orders import delivery, events, history
+from apps.orders.models import Cart, CartItem, Order, OrderItem, OrderStatusConflict
+from apps.products.models import Ingredient
+from apps.products.pricing import get_price_matrix
+
+
+class CheckoutError(ValueError):
+    pass
+
+
+def _cart_lines(cart):
+    ingredients = Ingredient.objects.only("pk", "name", "price_per_extra", "is_active")
+    return list(
+        CartItem.objects
+        .filter(cart=cart)
+        .select_related("pizza", "size")
+        .prefetch_related(
+            Prefetch("extra_ingredients", queryset=ingredients),
+            Prefetch("removed_ingredients", queryset=ingredients),
+        )
+        .order_by("pk")
+    )
+
+
+def _snapshot(ingredients, with_price):
+    return [
+        {
+            "id": ingredient.pk,
+            "name": ingredient.name,
+            **({"price": str(ingredient.price_per_extra)} if with_price else {}),
+        }
+        for ingredient in ingredients
+    ]
+
+
+def checkout(cart, order_type="delivery", delivery_address=None):
+    """Create a pending order from `cart`, then empty the cart."""
+    delivery_fee = Decimal("0.00")
+    if order_type == "delivery":
+        try:
+            delivery_fee = delivery.quote_address(delivery_address).fee
+        except delivery.DeliveryUnavailable as e:
+            raise CheckoutError(str(e)) from None
+
+    with transaction.atomic():
+        # Concurrent checkouts of the same cart queue up here; the later
+        # ones then read the lines the first one left: none
+        Cart.objects.select_for_update().get(pk=cart.pk)
+        lines = _cart_lines(cart)
+        if not lines:
+            raise CheckoutError("Cart is empty.")
+
+        matrix = get_price_matrix()
+        items = []
+        subtotal = Decimal("0.00")
+
+        for line in lines:
+            pizza = line.pizza
+            if not (pizza.is_active and pizza.is_available):
+                raise CheckoutError(f"{pizza.name} is currently unavailable.")
+
+            try:
+                unit_price = matrix.price_for(pizza.pk, line.size_id)
+            except LookupError:
+                raise CheckoutError(
+                    f"{pizza.name} is not available in size {line.size.name}."
+                ) from None
+
+            extras = list(line.extra_ingredients.all())
+            for ingredient in extras:
+                if not ingredient.is_active:
+                    raise CheckoutError(f"{ingredient.name} is no longer available.")
+            extra_cost = sum(
+                (ingredient.price_per_extra for ingredient in extras),
+                Decimal("0.00"),
+            )
+
+            items.append(OrderItem(
+                pizza=pizza,
+                size=line.size,
+                quantity=line.quantity,
+                unit_price=unit_price,
+                extra_cost=extra_cost,
+                extra_ingredients_snapshot=_snapshot(extras, with_price=True),
+                removed_ingredients_snapshot=_snapshot(
+                    line.removed_ingredients.all(), with_price=False
+                ),
+            ))
+            subtotal += (unit_price + extra_cost) * line.quantity
+
+        order = Order(
+            user=cart.user,
+            order_type=order_type,
+            delivery_address=delivery_address,
+            subtotal=subtotal,
+            delivery_fee=delivery_fee,
+            tax_amount=Decimal("0.00"),
+            discount_amount=Decimal("0.00"),
+            total_amount=subtotal + delivery_fee,
+        )
+        order.save()
+
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+
+        CartItem.objects.filter(cart=cart).delete()
+
+    return order
+
+
+def _needs_stock(source_status, new_status):
+    return new_status == "confirmed" or (
+        new_status == "cancelled" and source_status == "confirmed"
+    )
+
+
+def bulk_change_status(order_ids, new_status):
+    """
+    Move `order_ids` to `new_status` and return a result per order.
+
+    Transitions are validated in memory against `Order.VALID_TRANSITIONS`
+    and applied with one `UPDATE ... WHERE id IN (...) AND status=?` per
+    source status. Transitions that reserve or release stock go through
+    `Order.change_status()` one by one. Results keep the input order:
+
+        [{"id": ..., "ok": True, "status": "ready"}, ...]
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    rows = {
+        row[0]: row
+        for row in Order.objects.filter(pk__in=order_ids).values_list(
+            "pk", "status", "order_number", "user_id", "order_type"
+        )
+    }
+    current = {pk: row[1] for pk, row in rows.items()}
+
+    results = {}
+    set_based = defaultdict(list)
+    one_by_one = []
+
+    for order_id in order_ids:
+        source = current.get(order_id)
+        if source is None:
+            results[order_id] = {"ok": False, "detail": "Order not found."}
+        elif new_status not in Order.VALID_TRANSITIONS.get(source, []):
+            results[order_id] = {
+                "ok": False,
+                "status": source,
+                "detail": f"Invalid status transition from {source} to {new_status}",
+            }
+        elif _needs_stock(source, new_status):
+            one_by_one.append(order_id)
+        else:
+            set_based[source].append(order_id)
+
+    now = timezone.now()
+    changes = {"status": new_status, "update_at": now}
+    if new_status in Order.STATUS_TIMESTAMPS:
+        changes[Order.STATUS_TIMESTAMPS[new_status]] = now
+
+    raced = []
+    for source, ids in set_based.items():
+        updated = Order.objects.filter(pk__in=ids, status=source).update(**changes)
+        if updated == len(ids):
+            for order_id in ids:
+                results[order_id] = {"ok": True, "status": new_status}
+        else:
+            raced.extend(ids)
+
+    if raced:
+        # Some rows moved concurrently: find out which updates were ours
+        for order_id, status, update_at in (
+            Order.objects.filter(pk__in=raced).values_list("pk", "status", "update_at")
+        ):
+            if status == new_status and update_at == now:
+                results[order_id] = {"ok": True, "status": new_status}
+            else:
+                results[order_id] = {
+                    "ok": False,
+                    "status": status,
+                    "detail": str(OrderStatusConflict(order_id, current[order_id])),
+                }
+        for order_id in raced:
+            results.setdefault(order_id, {"ok": False, "detail": "Order not found."})
+
+    moved = []
+    for source, ids in set_based.items():
+        for order_id in ids:
+            if results[order_id]["ok"]:
+                _, _, order_number, user_id, order_type = rows[order_id]
+                moved.append(history.event(
+                    order_id, history.STATUS, source, new_status, at=now
+                ))
+                events.publish(events.build_event(
+                    events.ORDER_STATUS, order_id, order_number,
+                    user_id, new_status, order_type,
+                ))
+    history.record(moved)
+
+    if one_by_one:
+        for order in Order.objects.filter(pk__in=one_by_one):
+            try:
+                order.change_status(new_status)
+            except ValueError as e:
+                results[order.pk] = {"ok": False, "status": order.status, "detail": str(e)}
+            else:
+                results[order.pk] = {"ok": True, "status": new_status}
+
+    return [{"id": order_id, **results[order_id]} for order_id in order_ids]
@@ -0,0 +1,19 @@
+import factory
+from decimal import Decimal
+
+from apps.accounts.tests.factories import UserFactory
+from apps.orders.models import Order
+
+
+class OrderFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Order
+
+    user = factory.SubFactory(UserFactory)
+    order_type = "pickup"
+    subtotal = Decimal("10.00")
+    delivery_fee = Decimal("0.00")
+    tax_amount = Decimal("0.00")
+    discount_amount = Decimal("0.00")
+    total_amount = Decimal("10.00")
@@ -0,0 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.tests.factories import UserFactory
+from apps.orders.archive import archive_orders
+from apps.orders.models import (
+    ArchivedOrder,
+    DeliveryInfo,
+    Order,
+    OrderItem,
+    Payment,
+)
+from apps.orders.tests.factories import OrderFactory
+from apps.products.tests.factories import PizzaFactory, PizzaSizeFactory
+
+
+def create_order(user, status="delivered", days_ago=365):
+    order = OrderFactory(user=user)
+    created_at = timezone.now() - timedelta(days=days_ago)
+    Order.objects.filter(pk=order.pk).update(status=status, created_at=created_at)
+    order.status, order.created_at = status, created_at
+    return order
+
+
+@pytest.fixture
+def old_order():
+    order = create_order(UserFactory())
+    OrderItem.objects.create(
+        order=order,
+        pizza=PizzaFactory(),
+        size=PizzaSizeFactory(),
+        quantity=2,
+        unit_price=Decimal("4.50"),
+        extra_cost=Decimal("0.50"),
+        extra_ingredients_snapshot=[{"id": 1, "name": "Basilico", "price": "0.50"}],
+    )
+    Payment.objects.create(order=order, amount=10, method="card", status="completed")
+    DeliveryInfo.objects.create(order=order, status="delivered", customer_rating=5)
+    return order
+
+
+@pytest.mark.django_db
+def test_archive_moves_only_old_finished_orders(old_order):
+    user = old_order.user
+    cancelled = create_order(user, status="cancelled")
+    recent = create_order(user, days_ago=1)
+    active = create_order(user, status="preparing")
+
+    assert archive_orders(chunk_size=1) == 2
+
+    assert set(Order.objects.values_list("pk", flat=True)) == {recent.pk, active.pk}
+    assert set(ArchivedOrder.objects.values_list("pk", flat=True)) == {
+        old_order.pk, cancelled.pk,
+    }
+    assert not OrderItem.objects.exists()
+    assert not Payment.objects.exists()
+    assert not DeliveryInfo.objects.exists()
+
+    archived = ArchivedOrder.objects.get(pk=old_order.pk)
+    assert archived.month == timezone.localdate(old_order.created_at).replace(day=1)
+
+
+@pytest.mark.django_db
+def test_archived_order_round_trip(old_order):
+    archive_orders()
+
+    order = ArchivedOrder.objects.get(pk=old_order.pk).as_order()
+
+    assert order.order_number == old_order.order_number
+    assert order.total_amount == Decimal("10.00")
+    assert order.created_at == old_order.created_at
+    [item] = order.items.all()
+    assert item.subtotal == Decimal("10.00")
+    assert item.extra_ingredients_snapshot[0]["name"] == "Basilico"
+    assert order.payments.all()[0].status == "completed"
+    assert order.delivery_info.customer_rating == 5
+
+
+@pytest.mark.django_db
+def test_api_serves_archived_orders(old_order, django_assert_max_num_queries):
+    create_order(old_order.user, days_ago=1)
+    archive_orders()
+    client = APIClient()
+    client.force_authenticate(user=old_order.user)
+
+    response = client.get("/api/v1/orders/")
+    ids = [o["id"] for o in response.data["results"]]
+    assert len(ids) == 1
+    assert str(old_order.pk) not in ids
+
+    with django_assert_max_num_queries(1):
+        response = client.get("/api/v1/orders/?archived=true")
+    assert [o["id"] for o in response.data["results"]] == [str(old_order.pk)]
+    assert response.data["results"][0]["items"][0]["quantity"] == 2
+
+    response = client.get(f"/api/v1/orders/{old_order.pk}/")
+    assert response.status_code == 200
+    assert response.data["order_number"] == old_order.order_number
+
+    client.force_authenticate(user=UserFactory())
+    response = client.get(f"/api/v1/orders/{old_order.pk}/")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_archive_orders_command(old_order):
+    out = StringIO()
+
+    call_command("archive_orders", "--dry-run", stdout=out)
+    assert "1 orders would be archived" in out.getvalue()
+    assert Order.objects.filter(pk=old_order.pk).exists()
+
+    call_command("archive_orders", "--days", "400", stdout=out)
+    assert Order.objects.filter(pk=old_order.pk).exists()
+
+    call_command("archive_orders", stdout=out)
+    assert "Archived 1 orders" in out.getvalue()
+    assert not Order.objects.filter(pk=old_order.pk).exists()
@@ -0,0 +1,70 @@
+import uuid
+
+import pytest
+from rest_framework.test import APIClient
+from apps.orders.models import Order
+from apps.orders.services import bulk_change_status
+from apps.accounts.tests.factories import UserFactory
+from apps.orders.tests.factories import OrderFactory
+
+
+def create_orders(user, count, status="pending"):
+    orders = OrderFactory.create_batch(count, user=user)
+    Order.objects.filter(pk__in=[o.pk for o in orders]).update(status=status)
+    return orders
+
+
+@pytest.mark.django_db
+def test_bulk_transition_uses_one_update_per_source_status(django_assert_num_queries):
+    user = UserFactory()
+    orders = create_orders(user, 200, status="preparing")
+
+    with django_assert_num_queries(2):
+        results = bulk_change_status([o.pk for o in orders], "ready")
+
+    assert all(result["ok"] for result in results)
+    assert Order.objects.filter(status="ready").count() == 200
+
+
+@pytest.mark.django_db
+def test_bulk_transition_reports_per_order_results():
+    user = UserFactory()
+    preparing = create_orders(user, 2, status="preparing")
+    delivered = create_orders(user, 1, status="delivered")
+    unknown = uuid.uuid4()
+
+    results = bulk_change_status(
+        [preparing[0].pk, delivered[0].pk, unknown, preparing[1].pk], "ready"
+    )
+
+    assert [r["ok"] for r in results] == [True, False, False, True]
+    assert results[1]["status"] == "delivered"
+    assert results[2]["detail"] == "Order not found."
+
+
+@pytest.mark.django_db
+def test_bulk_confirm_goes_through_stock_path():
+    user = UserFactory()
+    orders = create_orders(user, 3)
+
+    results = bulk_change_status([o.pk for o in orders], "confirmed")
+
+    assert all(result["ok"] for result in results)
+    assert Order.objects.filter(status="confirmed", confirmed_at__isnull=False).count() == 3
+
+
+@pytest.mark.django_db
+def test_bulk_status_endpoint_is_staff_only():
+    user = UserFactory()
+    orders = create_orders(user, 2, status="preparing")
+    payload = {"ids": [str(o.pk) for o in orders], "status": "ready"}
+    client = APIClient()
+
+    client.force_authenticate(user=user)
+    assert client.post("/api/v1/orders/bulk-status/", payload, format="json").status_code == 403
+
+    client.force_authenticate(user=UserFactory(is_staff=True))
+    response = client.post("/api/v1/orders/bulk-status/", payload, format="json")
+
+    assert response.status_code == 200
+    assert [r["id"] for r in response.data["results"]] == [o.pk for o in orders]
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from apps.orders.models import Cart, CartItem
+from apps.accounts.tests.factories import UserFactory
+from apps.products.tests.factories import PizzaFactory, PizzaSizeFactory
+
+
+def fill_cart(cart, lines):
+    pizza = PizzaFactory()
+    size = PizzaSizeFactory()
+    for quantity, unit_price, extra_cost in lines:
+        CartItem.objects.create(
+            cart=cart,
+            pizza=pizza,
+            size=size,
+            quantity=quantity,
+            unit_price=unit_price,
+            extra_cost=extra_cost,
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("line_count", [1, 25])
+def test_cart_totals_use_one_query_regardless_of_items(line_count, django_assert_num_queries):
+    cart = Cart.objects.create(user=UserFactory())
+    fill_cart(cart, [(2, Decimal("8.00"), Decimal("1.50"))] * line_count)
+
+    with django_assert_num_queries(1):
+        assert cart.get_totals() == (2 * line_count, Decimal("19.00") * line_count)
+
+
+@pytest.mark.django_db
+def test_empty_cart_totals_are_zero():
+    cart = Cart.objects.create(user=UserFactory())
+
+    assert cart.total_items == 0
+    assert cart.total_price == Decimal("0.00")
+
+
+@pytest.mark.django_db
+def test_total_items_and_price_share_one_query(django_assert_num_queries):
+    cart = Cart.objects.create(user=UserFactory())
+    fill_cart(cart, [(3, Decimal("5.00"), Decimal("0"))])
+
+    with django_assert_num_queries(1):
+        assert (cart.total_items, cart.total_price) == (3, Decimal("15.00"))
+
+
+@pytest.mark.django_db
+def test_with_totals_annotates_many_carts_in_one_query(django_assert_num_queries):
+    full = Cart.objects.create(user=UserFactory())
+    fill_cart(full, [(1, Decimal("7.00"), Decimal("0.00")), (3, Decimal("9.00"), Decimal("1.00"))])
+    empty = Cart.objects.create(user=UserFactory())
+
+    with django_assert_num_queries(1):
+        carts = {cart.pk: cart for cart in Cart.objects.with_totals()}
+        totals = {pk: (cart.total_items, cart.total_price) for pk, cart in carts.items()}
+
+    assert totals[full.pk] == (4, Decimal("37.00"))
+    assert totals[empty.pk] == (0, Decimal("0.00"))
+
+
+@pytest.mark.django_db
+def test_abandoned_carts_have_only_stale_items():
+    stale = Cart.objects.create(user=UserFactory())
+    fill_cart(stale, [(1, Decimal("7.00"), Decimal("0.00"))])
+    CartItem.objects.filter(cart=stale).update(update_at=timezone.now() - timedelta(days=2))
+
+    active = Cart.objects.create(user=UserFactory())
+    fill_cart(active, [(1, Decimal("7.00"), Decimal("0.00"))])
+    Cart.objects.create(user=UserFactory())
+
+    abandoned = list(Cart.objects.abandoned().with_totals())
+
+    assert [cart.pk for cart in abandoned] == [stale.pk]
+    assert abandoned[0].total_price == Decimal("7.00")
@@ -0,0 +1,207 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+from apps.orders.cart_store import CacheCartStore, MAX_LINE_QUANTITY, merge_anonymous_cart
+from apps.orders.models import CartItem
+from apps.products.pricing import get_price_matrix
+from apps.accounts.tests.factories import UserFactory
+from apps.products.tests.factories import (
+    IngredientFactory,
+    PizzaFactory,
+    PizzaIngredientFactory,
+    PizzaSizeFactory,
+)
+
+
+@pytest.fixture
+def menu(db):
+    return {
+        "pizza": PizzaFactory(base_price=Decimal("8.00")),
+        "size": PizzaSizeFactory(price_multiplier=Decimal("1.50")),
+        "olives": IngredientFactory(price_per_extra=Decimal("1.20")),
+    }
+
+
+def line_payload(menu, quantity=1):
+    return {
+        "pizza": menu["pizza"].pk,
+        "size": menu["size"].pk,
+        "quantity": quantity,
+        "extra_ingredients": [menu["olives"].pk],
+    }
+
+
+@pytest.mark.django_db
+def test_anonymous_cart_never_queries_the_database(menu, django_assert_num_queries):
+    client = APIClient()
+    get_price_matrix()
+
+    with django_assert_num_queries(0):
+        response = client.post("/api/v1/orders/cart/items/", line_payload(menu), format="json")
+        token = response["X-Cart-Token"]
+        client.post("/api/v1/orders/cart/items/", line_payload(menu), format="json",
+                    HTTP_X_CART_TOKEN=token)
+        cart = client.get("/api/v1/orders/cart/", HTTP_X_CART_TOKEN=token)
+
+    assert response.status_code == 201
+    assert cart.data["total_items"] == 2
+    assert cart.data["total_price"] == "26.40"
+    assert not CartItem.objects.exists()
+
+
+@pytest.mark.django_db
+def test_anonymous_cart_update_and_remove(menu):
+    client = APIClient()
+    line = client.post("/api/v1/orders/cart/items/", line_payload(menu), format="json")
+    token = line["X-Cart-Token"]
+    url = f"/api/v1/orders/cart/items/{line.data['id']}/"
+
+    updated = client.patch(url, {"quantity": 3}, format="json", HTTP_X_CART_TOKEN=token)
+    removed = client.delete(url, HTTP_X_CART_TOKEN=token)
+    missing = client.delete(url, HTTP_X_CART_TOKEN=token)
+
+    assert updated.data["subtotal"] == "39.60"
+    assert removed.status_code == 204
+    assert missing.status_code == 404
+
+
+@pytest.mark.django_db
+def test_unknown_pizza_is_rejected(menu):
+    payload = dict(line_payload(menu), pizza=999999)
+
+    response = APIClient().post("/api/v1/orders/cart/items/", payload, format="json")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_authenticated_cart_is_stored_in_database(menu):
+    user = UserFactory()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    client.post("/api/v1/orders/cart/items/", line_payload(menu, 2), format="json")
+    response = client.get("/api/v1/orders/cart/")
+
+    assert "X-Cart-Token" not in response
+    assert response.data["total_items"] == 2
+    assert CartItem.objects.get().extra_ingredients.get() == menu["olives"]
+
+
+@pytest.mark.django_db
+def test_login_merges_anonymous_cart(menu):
+    user = UserFactory(username="mario")
+    authenticated = APIClient()
+    authenticated.force_authenticate(user=user)
+    authenticated.post("/api/v1/orders/cart/items/", line_payload(menu, 1), format="json")
+
+    anonymous = APIClient()
+    first = anonymous.post("/api/v1/orders/cart/items/", line_payload(menu, 2), format="json")
+    token = first["X-Cart-Token"]
+    plain = dict(line_payload(menu), extra_ingredients=[])
+    anonymous.post("/api/v1/orders/cart/items/", plain, format="json", HTTP_X_CART_TOKEN=token)
+
+    response = anonymous.post(
+        "/api/v1/auth/login/",
+        {"username": "mario", "password": "password123"},
+        HTTP_X_CART_TOKEN=token,
+    )
+
+    assert response.status_code == 200
+    quantities = sorted(
+        (item.extra_ingredients.count(), item.quantity)
+        for item in CartItem.objects.filter(cart__user=user)
+    )
+    assert quantities == [(0, 1), (1, 3)]
+
+    leftover = anonymous.get("/api/v1/orders/cart/", HTTP_X_CART_TOKEN=token)
+    assert leftover.data["items"] == []
+
+
+@pytest.mark.django_db
+def test_removed_ingredients_must_be_removable_from_the_recipe(menu):
+    recipe = PizzaIngredientFactory(pizza=menu["pizza"], is_removable=False)
+    client = APIClient()
+
+    fixed = client.post("/api/v1/orders/cart/items/", dict(
+        line_payload(menu), removed_ingredients=[recipe.ingredient.pk]
+    ), format="json")
+    foreign = client.post("/api/v1/orders/cart/items/", dict(
+        line_payload(menu), removed_ingredients=[menu["olives"].pk]
+    ), format="json")
+
+    assert fixed.status_code == foreign.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("extra, removed", [(2, 0), (1, 1)])
+def test_repeated_or_conflicting_ingredients_are_rejected(menu, extra, removed):
+    PizzaIngredientFactory(pizza=menu["pizza"], ingredient=menu["olives"], is_removable=True)
+    olives = menu["olives"].pk
+
+    response = APIClient().post("/api/v1/orders/cart/items/", dict(
+        line_payload(menu),
+        extra_ingredients=[olives] * extra,
+        removed_ingredients=[olives] * removed,
+    ), format="json")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_merge_charges_and_stores_a_repeated_extra_once(menu):
+    user = UserFactory()
+    token = "t" * 24
+    # Cached before repeated ids were rejected
+    CacheCartStore(token).add(
+        menu["pizza"].pk, menu["size"].pk, extra_ids=[menu["olives"].pk] * 2
+    )
+
+    assert merge_anonymous_cart(token, user) == 1
+
+    item = CartItem.objects.get(cart__user=user)
+    assert item.extra_cost == Decimal("1.20")
+    assert list(item.extra_ingredients.all()) == [menu["olives"]]
+
+
+@pytest.mark.django_db
+def test_merge_revalidates_lines_and_caps_quantities(menu):
+    user = UserFactory()
+    token = "t" * 24
+    anonymous = CacheCartStore(token)
+    anonymous.add(menu["pizza"].pk, menu["size"].pk, quantity=60)
+    gone = PizzaFactory()
+    anonymous.add(gone.pk, menu["size"].pk)
+    authenticated = APIClient()
+    authenticated.force_authenticate(user=user)
+    authenticated.post("/api/v1/orders/cart/items/", dict(
+        line_payload(menu, 60), extra_ingredients=[]
+    ), format="json")
+    gone.delete()
+
+    assert merge_anonymous_cart(token, user) == 1
+
+    item = CartItem.objects.get(cart__user=user)
+    assert item.quantity == MAX_LINE_QUANTITY
+    assert anonymous.lines() == []
+
+
+@pytest.mark.django_db
+def test_login_succeeds_when_merge_fails(menu, monkeypatch):
+    UserFactory(username="mario")
+    token = "t" * 24
+    CacheCartStore(token).add(menu["pizza"].pk, menu["size"].pk)
+
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("apps.accounts.api.views.merge_anonymous_cart", broken)
+    response = APIClient().post(
+        "/api/v1/auth/login/",
+        {"username": "mario", "password": "password123"},
+        HTTP_X_CART_TOKEN=token,
+    )
+
+    assert response.status_code == 200
+    assert "access" in response.data
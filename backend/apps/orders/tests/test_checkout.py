@@ -0,0 +1,135 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.orders.models import Cart, CartItem, Order
+from apps.orders.services import CheckoutError, checkout
+from apps.accounts.tests.factories import UserFactory
+from apps.products.tests.factories import (
+    IngredientFactory,
+    PizzaFactory,
+    PizzaIngredientFactory,
+    PizzaSizeFactory,
+)
+
+
+def build_cart(user, line_count):
+    cart = Cart.objects.create(user=user)
+    size = PizzaSizeFactory(price_multiplier=Decimal("1.50"))
+    olives = IngredientFactory(price_per_extra=Decimal("1.20"))
+    basil = IngredientFactory()
+
+    for i in range(line_count):
+        pizza = PizzaIngredientFactory(
+            ingredient=basil, pizza__base_price=Decimal("8.00")
+        ).pizza
+        item = CartItem.objects.create(
+            cart=cart, pizza=pizza, size=size, quantity=2, unit_price=Decimal("1.00")
+        )
+        item.extra_ingredients.add(olives)
+        item.removed_ingredients.add(basil)
+    return cart
+
+
+@pytest.mark.django_db
+def test_checkout_snapshots_lines_and_prices_from_matrix():
+    user = UserFactory()
+    cart = build_cart(user, 2)
+
+    order = checkout(cart, order_type="pickup")
+
+    items = list(order.items.order_by("pk"))
+    assert len(items) == 2
+    assert items[0].unit_price == Decimal("12.00")
+    assert items[0].extra_cost == Decimal("1.20")
+    assert items[0].extra_ingredients_snapshot[0]["price"] == "1.20"
+    assert set(items[0].removed_ingredients_snapshot[0]) == {"id", "name"}
+    assert order.subtotal == order.total_amount == Decimal("52.80")
+    assert order.status == "pending"
+    assert not cart.items.exists()
+
+
+@pytest.mark.django_db
+def test_checkout_query_count_does_not_grow_with_lines():
+    small = build_cart(UserFactory(), 1)
+    large = build_cart(UserFactory(), 30)
+    checkout(build_cart(UserFactory(), 1), order_type="pickup")  # warm the price matrix
+
+    with CaptureQueriesContext(connection) as small_queries:
+        checkout(small, order_type="pickup")
+    with CaptureQueriesContext(connection) as large_queries:
+        checkout(large, order_type="pickup")
+
+    assert len(small_queries) == len(large_queries)
+
+
+@pytest.mark.django_db
+def test_checkout_rejects_unavailable_pizza_and_keeps_cart():
+    user = UserFactory()
+    cart = Cart.objects.create(user=user)
+    pizza = PizzaIngredientFactory(ingredient__stock_quantity=0).pizza
+    CartItem.objects.create(
+        cart=cart, pizza=pizza, size=PizzaSizeFactory(), quantity=1, unit_price=1
+    )
+
+    with pytest.raises(CheckoutError):
+        checkout(cart, order_type="pickup")
+
+    assert cart.items.count() == 1
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_checkout_endpoint_creates_order():
+    user = UserFactory()
+    build_cart(user, 3)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post("/api/v1/orders/checkout/", {"order_type": "pickup"})
+
+    assert response.status_code == 201
+    assert len(response.data["items"]) == 3
+    assert Order.objects.get(pk=response.data["id"]).user == user
+
+
+@pytest.mark.django_db
+def test_checkout_endpoint_requires_address_for_delivery():
+    user = UserFactory()
+    build_cart(user, 1)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post("/api/v1/orders/checkout/", {"order_type": "delivery"})
+
+    assert response.status_code == 400
+    assert "delivery_address" in response.data
+
+
+@pytest.mark.django_db
+def test_checkout_rejects_inactive_extra_ingredient():
+    user = UserFactory()
+    cart = build_cart(user, 1)
+    extra = cart.items.get().extra_ingredients.get()
+    extra.is_active = False
+    extra.save()
+
+    with pytest.raises(CheckoutError, match="no longer available"):
+        checkout(cart, order_type="pickup")
+
+    assert cart.items.count() == 1
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_checkout_twice_creates_one_order():
+    user = UserFactory()
+    cart = build_cart(user, 1)
+
+    checkout(cart, order_type="pickup")
+    with pytest.raises(CheckoutError, match="empty"):
+        checkout(cart, order_type="pickup")
+
+    assert Order.objects.count() == 1
@@ -0,0 +1,192 @@
+import math
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+from apps.accounts.models import Address
+from apps.accounts.tests.factories import UserFactory
+from apps.orders import delivery
+from apps.orders.models import Order
+from apps.orders.services import CheckoutError, checkout
+from apps.orders.tests.test_checkout import build_cart
+
+
+STORE = (45.0, 9.0)
+# Along a meridian a degree of latitude is a fixed distance
+KM = 1 / (delivery.EARTH_RADIUS_KM * math.pi / 180)
+
+
+@pytest.fixture(autouse=True)
+def delivery_settings(settings):
+    settings.DELIVERY_STORES = [
+        {"name": "Centro", "latitude": STORE[0], "longitude": STORE[1]},
+        {"name": "Nord", "latitude": STORE[0] + 20 * KM, "longitude": STORE[1]},
+    ]
+    settings.DELIVERY_ZONES = [
+        {"name": "B", "radius_km": 5, "fee": "2.50"},
+        {"name": "A", "radius_km": 2, "fee": "0"},
+    ]
+
+
+def make_address(user, km_south=None, label="Casa"):
+    located = km_south is not None
+    return Address.objects.create(
+        user=user,
+        label=label,
+        street_address="Via Roma 1",
+        city="Milano",
+        postal_code="20100",
+        province="MI",
+        latitude=Decimal(f"{STORE[0] - km_south * KM:.6f}") if located else None,
+        longitude=Decimal(f"{STORE[1]:.6f}") if located else None,
+    )
+
+
+def test_haversine_matches_known_distance():
+    # Milano Duomo - Roma Colosseo
+    assert delivery.haversine_km(45.4642, 9.1900, 41.8902, 12.4922) == pytest.approx(477, abs=1)
+
+
+def test_quote_many_picks_nearest_store_and_zone():
+    pricing = delivery.get_pricing()
+
+    quotes = pricing.quote_many(
+        [STORE[0] - 1 * KM, STORE[0] - 4 * KM, STORE[0] + 19 * KM, STORE[0] - 8 * KM, math.nan],
+        [STORE[1]] * 5,
+    )
+
+    assert [(q.store, q.zone, q.fee) for q in quotes[:3]] == [
+        ("Centro", "A", Decimal("0.00")),
+        ("Centro", "B", Decimal("2.50")),
+        ("Nord", "A", Decimal("0.00")),
+    ]
+    assert quotes[1].distance_km == pytest.approx(4, abs=0.01)
+    assert quotes[3:] == [None, None]
+
+
+@pytest.mark.django_db
+def test_quote_address_is_memoized_per_location():
+    address = make_address(UserFactory(), km_south=3)
+    pricing = delivery.get_pricing()
+
+    assert delivery.quote_address(address).zone == "B"
+    assert delivery.quote_address(address).zone == "B"
+    assert pricing.quote.cache_info().hits == 1
+
+    address.latitude = Decimal(f"{STORE[0] - 1 * KM:.6f}")
+    assert delivery.quote_address(address).zone == "A"
+
+
+@pytest.mark.django_db
+def test_checkout_prices_delivery_from_address():
+    user = UserFactory()
+    cart = build_cart(user, 1)
+
+    order = checkout(cart, delivery_address=make_address(user, km_south=3))
+
+    assert order.delivery_fee == Decimal("2.50")
+    assert order.total_amount == order.subtotal + Decimal("2.50")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("km_south", [8, None])
+def test_checkout_rejects_undeliverable_address(km_south):
+    user = UserFactory()
+    cart = build_cart(user, 1)
+
+    with pytest.raises(CheckoutError):
+        checkout(cart, delivery_address=make_address(user, km_south=km_south))
+
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_order_create_ignores_client_fee():
+    user = UserFactory()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post("/api/v1/orders/", {
+        "order_type": "delivery",
+        "delivery_address": make_address(user, km_south=1).pk,
+        "subtotal": "10.00",
+        "delivery_fee": "9.99",
+        "total_amount": "19.99",
+    })
+
+    assert response.status_code == 201
+    assert response.data["delivery_fee"] == "0.00"
+    assert response.data["total_amount"] == "10.00"
+
+
+@pytest.mark.django_db
+def test_order_create_rejects_another_users_address():
+    client = APIClient()
+    client.force_authenticate(user=UserFactory())
+
+    response = client.post("/api/v1/orders/", {
+        "order_type": "delivery",
+        "delivery_address": make_address(UserFactory(), km_south=1).pk,
+        "subtotal": "10.00",
+    })
+
+    assert response.status_code == 400
+    assert "delivery_address" in response.data
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_batch_quotes_in_input_order_with_summary(django_assert_num_queries):
+    user = UserFactory()
+    near = make_address(user, km_south=1, label="near")
+    far = make_address(user, km_south=8, label="far")
+    unlocated = make_address(user, label="unlocated")
+    staff = APIClient()
+    staff.force_authenticate(user=UserFactory(is_staff=True))
+
+    with django_assert_num_queries(1):
+        response = staff.post(
+            "/api/v1/orders/delivery/quotes/",
+            {"addresses": [far.pk, near.pk, unlocated.pk, 999999]},
+            format="json",
+        )
+
+    assert response.status_code == 200
+    results = response.data["results"]
+    assert [result["address"] for result in results] == [far.pk, near.pk, unlocated.pk, 999999]
+    assert results[1]["zone"] == "A" and results[1]["fee"] == "0.00"
+    assert results[0]["zone"] is None
+    assert response.data["summary"] == {
+        "A": 1, "B": 0, "outside": 1, "unlocated": 1, "not_found": 1,
+    }
+
+
+@pytest.mark.django_db
+def test_batch_quotes_against_candidate_zones():
+    address = make_address(UserFactory(), km_south=8)
+    staff = APIClient()
+    staff.force_authenticate(user=UserFactory(is_staff=True))
+    url = "/api/v1/orders/delivery/quotes/"
+
+    response = staff.post(url, {
+        "addresses": [address.pk],
+        "zones": [{"name": "Città", "radius_km": 10, "fee": "3.00"}],
+    }, format="json")
+    assert response.data["results"][0]["fee"] == "3.00"
+
+    response = staff.post(url, {
+        "addresses": [address.pk], "zones": [{"name": "Città", "radius_km": -1, "fee": "3"}],
+    }, format="json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_batch_quotes_are_staff_only():
+    client = APIClient()
+    client.force_authenticate(user=UserFactory())
+
+    response = client.post(
+        "/api/v1/orders/delivery/quotes/", {"addresses": [1]}, format="json"
+    )
+
+    assert response.status_code == 403
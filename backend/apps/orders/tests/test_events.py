@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.orders import events
+from apps.orders.services import bulk_change_status
+from apps.accounts.tests.factories import UserFactory
+from apps.orders.tests.factories import OrderFactory
+
+
+@pytest.fixture(autouse=True)
+def broker(monkeypatch):
+    broker = events.Broker()
+    monkeypatch.setattr(events, "broker", broker)
+    return broker
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+
+def drain(loop, subscription):
+    loop.run_until_complete(asyncio.sleep(0))
+    received = []
+    while not subscription.queue.empty():
+        received.append(subscription.queue.get_nowait())
+    return received
+
+
+@pytest.mark.django_db
+def test_status_change_reaches_matching_subscriptions_after_commit(
+    broker, loop, django_capture_on_commit_callbacks
+):
+    order = OrderFactory()
+    cancelled = broker.subscribe(loop=loop, statuses=["cancelled"])
+    delivery = broker.subscribe(loop=loop, order_types=["delivery"])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.change_status("cancelled")
+        assert drain(loop, cancelled) == []
+
+    received = drain(loop, cancelled)
+    assert [(e["type"], e["id"], e["status"]) for e in received] == [
+        (events.ORDER_STATUS, str(order.pk), "cancelled")
+    ]
+    assert drain(loop, delivery) == []
+
+
+@pytest.mark.django_db
+def test_order_creation_and_bulk_changes_are_published(
+    broker, loop, django_capture_on_commit_callbacks
+):
+    user = UserFactory()
+    subscription = broker.subscribe(loop=loop, user_id=user.pk)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order = OrderFactory(user=user)
+        OrderFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        bulk_change_status([order.pk], "cancelled")
+
+    received = [(e["type"], e["status"]) for e in drain(loop, subscription)]
+    assert received == [
+        (events.ORDER_CREATED, "pending"),
+        (events.ORDER_STATUS, "cancelled"),
+    ]
+
+
+def test_stream_formats_server_sent_events(broker, loop):
+    async def read_frames():
+        subscription = broker.subscribe()
+        frames = events.stream(subscription, keepalive=0.01)
+        first = await frames.__anext__()
+        keepalive = await frames.__anext__()
+        subscription.deliver({"type": "order.status", "status": "ready"})
+        event = await frames.__anext__()
+        await frames.aclose()
+        return first, keepalive, event, len(broker)
+
+    first, keepalive, event, remaining = loop.run_until_complete(read_frames())
+
+    assert first.startswith("retry:")
+    assert keepalive == ": keepalive\n\n"
+    assert event.startswith("event: order.status\ndata: ")
+    assert json.loads(event.split("data: ", 1)[1])["status"] == "ready"
+    assert remaining == 0
+
+
+@pytest.mark.django_db
+def test_event_stream_requires_authentication():
+    response = APIClient().get("/api/v1/orders/events/")
+
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_event_stream_accepts_query_token(broker):
+    user = UserFactory()
+    token = str(AccessToken.for_user(user))
+
+    response = APIClient().get(f"/api/v1/orders/events/?token={token}&status=ready")
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/event-stream"
+    assert len(broker) == 1
@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+import pytest
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.tests.factories import UserFactory
+from apps.orders import history
+from apps.orders.archive import archive_orders
+from apps.orders.history import HistoryWriter
+from apps.orders.models import DeliveryInfo, Order, OrderEvent, Payment
+from apps.orders.services import bulk_change_status
+from apps.orders.tests.factories import OrderFactory
+
+
+
+def timeline(order):
+    return list(
+        OrderEvent.objects.filter(order=order).values_list("kind", "from_status", "to_status")
+    )
+
+
+@pytest.mark.django_db
+def test_status_changes_are_recorded(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        order = OrderFactory()
+        order.change_status("confirmed")
+        order.change_status("preparing")
+
+    assert timeline(order) == [
+        ("created", "", "pending"),
+        ("status", "pending", "confirmed"),
+        ("status", "confirmed", "preparing"),
+    ]
+    assert OrderEvent.objects.filter(order=order).last().created_at == order.update_at
+
+
+@pytest.mark.django_db
+def test_rolled_back_change_leaves_no_event(django_capture_on_commit_callbacks):
+    order = OrderFactory()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            order.change_status("confirmed")
+            raise RuntimeError
+
+    assert timeline(order) == []
+
+
+@pytest.mark.django_db
+def test_transition_does_not_wait_for_history(
+    monkeypatch, settings, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    settings.ORDER_HISTORY_FLUSH_INTERVAL = 3600
+    writer = HistoryWriter()
+    monkeypatch.setattr(history, "writer", writer)
+    orders = [OrderFactory() for _ in range(3)]
+
+    # One UPDATE per transition; the events wait in the writer's buffer
+    with django_assert_num_queries(3):
+        for order in orders:
+            with django_capture_on_commit_callbacks(execute=True):
+                order.change_status("cancelled")
+    assert not OrderEvent.objects.exists()
+
+    with django_assert_num_queries(1):
+        writer.flush()
+    assert OrderEvent.objects.filter(to_status="cancelled").count() == 3
+
+
+@pytest.mark.django_db
+def test_bulk_payment_and_delivery_changes_are_recorded(django_capture_on_commit_callbacks):
+    order = OrderFactory()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.filter(pk=order.pk).update(status="ready")
+        bulk_change_status([order.pk], "out_for_delivery")
+
+        payment = Payment.objects.create(order=order, amount=10, method="card", status="pending")
+        payment.status = "completed"
+        payment.save()
+        payment.save()
+
+        delivery = DeliveryInfo.objects.create(order=order, status="assigned")
+        delivery = DeliveryInfo.objects.get(pk=delivery.pk)
+        delivery.status = "in_transit"
+        delivery.save()
+
+    assert timeline(order) == [
+        ("status", "ready", "out_for_delivery"),
+        ("payment", "", "pending"),
+        ("payment", "pending", "completed"),
+        ("delivery", "", "assigned"),
+        ("delivery", "assigned", "in_transit"),
+    ]
+
+
+@pytest.mark.django_db
+def test_timeline_endpoint(django_capture_on_commit_callbacks, django_assert_num_queries):
+    user = UserFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        order = OrderFactory(user=user)
+        order.change_status("cancelled")
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with django_assert_num_queries(1):
+        response = client.get(f"/api/v1/orders/{order.pk}/timeline/")
+    assert response.status_code == 200
+    assert [e["to_status"] for e in response.data["events"]] == ["pending", "cancelled"]
+
+    # Archived orders keep their history
+    Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=365))
+    archive_orders()
+    response = client.get(f"/api/v1/orders/{order.pk}/timeline/")
+    assert len(response.data["events"]) == 2
+
+    client.force_authenticate(user=UserFactory())
+    response = client.get(f"/api/v1/orders/{order.pk}/timeline/")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_timeline_of_order_without_events_is_empty():
+    user = UserFactory()
+    order = OrderFactory(user=user)
+    OrderEvent.objects.all().delete()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(f"/api/v1/orders/{order.pk}/timeline/")
+
+    assert response.status_code == 200
+    assert response.data["events"] == []
+
+
+@pytest.mark.django_db
+def test_failed_batch_is_retried_with_next_flush(monkeypatch, settings):
+    settings.ORDER_HISTORY_FLUSH_INTERVAL = 3600
+    writer = HistoryWriter()
+    order = OrderFactory()
+    OrderEvent.objects.all().delete()
+    writer._pending = [history.event(order.pk, history.STATUS, "pending", "cancelled")]
+
+    real_bulk_create = OrderEvent.objects.bulk_create
+
+    def failing(*args, **kwargs):
+        monkeypatch.setattr(OrderEvent.objects, "bulk_create", real_bulk_create)
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(OrderEvent.objects, "bulk_create", failing)
+    writer.flush()
+    assert not OrderEvent.objects.exists()
+
+    writer.flush()
+    assert timeline(order) == [("status", "pending", "cancelled")]
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from apps.accounts.tests.factories import UserFactory
+from apps.core import idempotency
+from apps.orders.models import Order
+
+
+ORDER = {
+    "order_type": "pickup",
+    "subtotal": "10.00",
+    "delivery_fee": "0.00",
+    "tax_amount": "0.00",
+    "discount_amount": "0.00",
+    "total_amount": "10.00",
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    caches["default"].clear()
+    yield
+    caches["default"].clear()
+
+
+@pytest.fixture
+def client():
+    client = APIClient()
+    client.force_authenticate(user=UserFactory())
+    return client
+
+
+@pytest.mark.django_db
+def test_retried_create_is_replayed(client, django_assert_num_queries):
+    first = client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+    assert first.status_code == 201
+
+    with django_assert_num_queries(0):
+        retry = client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+
+    assert retry.status_code == 201
+    assert retry["Idempotent-Replayed"] == "true"
+    assert retry.data["id"] == first.data["id"]
+    assert Order.objects.count() == 1
+
+    other = client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-2")
+    assert other.data["id"] != first.data["id"]
+
+
+@pytest.mark.django_db
+def test_key_reused_with_other_body_is_rejected(client):
+    client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+
+    response = client.post(
+        "/api/v1/orders/", {**ORDER, "order_type": "dine_in"}, HTTP_IDEMPOTENCY_KEY="k-1"
+    )
+
+    assert response.status_code == 422
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_keys_are_scoped_per_user(client):
+    client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+
+    other = APIClient()
+    other.force_authenticate(user=UserFactory())
+    response = other.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+
+    assert response.status_code == 201
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_retried_status_change_is_replayed(client):
+    client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+    order = Order.objects.get()
+    url = f"/api/v1/orders/{order.pk}/change-status/"
+
+    first = client.post(url, {"status": "confirmed"}, HTTP_IDEMPOTENCY_KEY="s-1")
+    retry = client.post(url, {"status": "confirmed"}, HTTP_IDEMPOTENCY_KEY="s-1")
+
+    # Without the key the retry would be an invalid confirmed -> confirmed
+    assert first.status_code == retry.status_code == 200
+    assert retry["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.django_db
+def test_duplicate_waits_for_the_first_request(client, settings, monkeypatch):
+    settings.IDEMPOTENCY_WAIT = 5
+    monkeypatch.setattr(idempotency, "_storage_key", lambda request, key: "fixed")
+    first = client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+    cache = caches["default"]
+
+    # Pretend the first request is still running: hold its lock and let
+    # it store its response shortly after the duplicate arrives
+    stored = cache.get("fixed")
+    cache.delete("fixed")
+    cache.add("fixed:lock", "busy")
+    threading.Timer(0.2, cache.set, ("fixed", stored)).start()
+
+    response = client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+
+    assert response.status_code == 201
+    assert response.data["id"] == first.data["id"]
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_duplicate_gives_up_while_first_is_running(client, settings, monkeypatch):
+    settings.IDEMPOTENCY_WAIT = 0.1
+    monkeypatch.setattr(idempotency, "_storage_key", lambda request, key: "fixed")
+    caches["default"].add("fixed:lock", "busy")
+
+    response = client.post("/api/v1/orders/", ORDER, HTTP_IDEMPOTENCY_KEY="k-1")
+
+    assert response.status_code == 409
+    assert not Order.objects.exists()
@@ -0,0 +1,110 @@
+import datetime
+
+import pytest
+from django.db import transaction
+
+from apps.accounts.tests.factories import UserFactory
+from apps.orders import numbering
+from apps.orders.models import OrderNumberCounter
+from apps.orders.numbering import OrderNumberAllocator
+from apps.orders.tests.factories import OrderFactory
+
+
+DAY = datetime.date(2026, 3, 14)
+
+
+@pytest.mark.django_db
+def test_numbers_are_sequential_per_day():
+    allocator = OrderNumberAllocator(block_size=3)
+
+    numbers = [allocator.next_number(DAY) for _ in range(7)]
+
+    assert numbers[0] == "PME-260314-00001"
+    assert numbers[-1] == "PME-260314-00007"
+    assert len(set(numbers)) == 7
+    assert OrderNumberCounter.objects.get(day=DAY).next_value == 10
+
+
+@pytest.mark.django_db
+def test_one_lease_per_block(django_assert_num_queries):
+    allocator = OrderNumberAllocator(block_size=5)
+    allocator.next_number(DAY)
+
+    with django_assert_num_queries(0):
+        for _ in range(4):
+            allocator.next_number(DAY)
+
+    # Block exhausted: UPDATE + read-back inside a savepoint
+    with django_assert_num_queries(4):
+        assert allocator.next_number(DAY) == "PME-260314-00006"
+
+
+@pytest.mark.django_db
+def test_workers_get_disjoint_blocks(monkeypatch):
+    first = OrderNumberAllocator(block_size=10)
+    second = OrderNumberAllocator(block_size=10)
+
+    assert first.next_number(DAY) == "PME-260314-00001"
+    assert second.next_number(DAY) == "PME-260314-00011"
+
+    # A forked worker inherits the parent's lease but must not reuse it
+    monkeypatch.setattr(numbering.os, "getpid", lambda: -1)
+    assert first.next_number(DAY) == "PME-260314-00021"
+
+
+@pytest.mark.django_db
+def test_new_day_starts_over():
+    allocator = OrderNumberAllocator(block_size=10)
+    allocator.next_number(DAY)
+
+    assert allocator.next_number(DAY + datetime.timedelta(days=1)) == "PME-260315-00001"
+
+
+@pytest.mark.django_db
+def test_rolled_back_lease_is_dropped():
+    allocator = OrderNumberAllocator(block_size=10)
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            allocator.next_number(DAY)
+            raise RuntimeError
+
+    # The counter row was rolled back: the same range is leased again
+    # instead of handing out numbers another worker may now receive
+    assert allocator.next_number(DAY) == "PME-260314-00001"
+    assert OrderNumberCounter.objects.get(day=DAY).next_value == 11
+
+
+@pytest.mark.django_db
+def test_lease_rolled_back_with_its_savepoint_is_dropped():
+    allocator = OrderNumberAllocator(block_size=10)
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            assert allocator.next_number(DAY) == "PME-260314-00001"
+            raise RuntimeError
+    with transaction.atomic():
+        # A new transaction in the same thread must not resume the block
+        assert allocator.next_number(DAY) == "PME-260314-00001"
+        assert allocator.next_number(DAY) == "PME-260314-00002"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_committed_lease_is_kept():
+    allocator = OrderNumberAllocator(block_size=10)
+
+    with transaction.atomic():
+        allocator.next_number(DAY)
+
+    assert allocator.next_number(DAY) == "PME-260314-00002"
+
+
+@pytest.mark.django_db
+def test_orders_get_allocated_numbers():
+    user = UserFactory()
+
+    orders = OrderFactory.create_batch(3, user=user)
+
+    numbers = [order.order_number for order in orders]
+    assert len(set(numbers)) == 3
+    assert all(number.startswith("PME-") and len(number) == 16 for number in numbers)
@@ -0,0 +1,98 @@
+import base64
+import json
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.orders.models import Order
+from apps.accounts.tests.factories import UserFactory
+from apps.orders.tests.factories import OrderFactory
+
+
+def create_orders(user, count):
+    orders = OrderFactory.create_batch(count, user=user)
+    # Identical timestamps: the id tiebreaker has to keep pages stable
+    Order.objects.filter(user=user).update(created_at=timezone.now())
+    return orders
+
+
+@pytest.mark.django_db
+def test_order_list_walks_every_page_once(django_assert_max_num_queries):
+    user = UserFactory()
+    orders = create_orders(user, 7)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    seen = []
+    url = "/api/v1/orders/?page_size=3"
+    while url:
+        with django_assert_max_num_queries(3):
+            response = client.get(url)
+
+        assert response.status_code == 200
+        assert "count" not in response.data
+        seen.extend(row["id"] for row in response.data["results"])
+        url = response.data["next"]
+
+    assert len(seen) == len(orders)
+    assert set(seen) == {str(order.id) for order in orders}
+
+
+@pytest.mark.django_db
+def test_order_list_previous_link_returns_prior_page():
+    user = UserFactory()
+    create_orders(user, 5)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    first = client.get("/api/v1/orders/?page_size=2").data
+    second = client.get(first["next"]).data
+    back = client.get(second["previous"]).data
+
+    assert first["previous"] is None
+    assert [row["id"] for row in back["results"]] == [
+        row["id"] for row in first["results"]
+    ]
+    assert back["previous"] is None
+
+
+@pytest.mark.django_db
+def test_order_list_page_numbers_are_opt_in():
+    user = UserFactory()
+    create_orders(user, 5)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get("/api/v1/orders/?page=2&page_size=2")
+
+    assert response.status_code == 200
+    assert response.data["count"] == 5
+    assert len(response.data["results"]) == 2
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_returns_404():
+    user = UserFactory()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get("/api/v1/orders/?cursor=not-a-cursor")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("payload", [
+    {"v": ["x", "y", "z"]},
+    {"v": 5},
+    {"v": ["2026-01-01T00:00:00+00:00", None]},
+    ["x"],
+])
+def test_tampered_cursor_returns_404(payload):
+    client = APIClient()
+    client.force_authenticate(user=UserFactory())
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    for url in ("/api/v1/orders/", "/api/v1/products/pizzas/"):
+        response = client.get(url, {"cursor": cursor})
+        assert response.status_code == 404
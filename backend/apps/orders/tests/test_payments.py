@@ -0,0 +1,181 @@
+from datetime import timedelta
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.orders.models import Order, OrderEvent, Payment, PaymentOutbox
+from apps.orders.payments import (
+    GatewayError,
+    PaymentError,
+    StubGateway,
+    _settle,
+    claim,
+    process_batch,
+    start_payment,
+)
+from apps.orders.tests.factories import OrderFactory
+
+
+
+def gateway(**options):
+    return StubGateway(**{"latency": 0, "jitter": 0, "failure_rate": 0,
+                          "decline_rate": 0, "seed": 1, **options})
+
+
+@pytest.fixture
+def order():
+    return OrderFactory()
+
+
+@pytest.mark.django_db
+def test_start_payment_enqueues_gateway_work(order):
+    payment = start_payment(order, "card")
+
+    assert payment.status == "pending"
+    assert payment.amount == order.total_amount
+    entry = PaymentOutbox.objects.get(payment=payment)
+    assert entry.status == "pending" and entry.attempts == 0
+
+    with pytest.raises(PaymentError):
+        start_payment(order, "card")
+    with pytest.raises(PaymentError):
+        start_payment(OrderFactory(user=order.user), "cash")
+
+
+@pytest.mark.django_db
+def test_start_payment_checks_the_locked_order_row(order):
+    # Another request cancelled the order after this instance was loaded
+    Order.objects.filter(pk=order.pk).update(status="cancelled")
+
+    with pytest.raises(PaymentError):
+        start_payment(order, "card")
+    assert not Payment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_one_open_payment_per_order_is_enforced(order):
+    Payment.objects.create(order=order, amount=10, method="card", status="failed")
+    Payment.objects.create(order=order, amount=10, method="card", status="pending")
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Payment.objects.create(order=order, amount=10, method="card", status="processing")
+
+
+@pytest.mark.django_db
+def test_approved_payment_confirms_order(order):
+    payment = start_payment(order, "card")
+
+    assert process_batch(10, gateway=gateway()) == {"completed": 1}
+
+    payment.refresh_from_db()
+    order.refresh_from_db()
+    assert payment.status == "completed"
+    assert payment.transaction_id.startswith("stub_")
+    assert order.status == "confirmed"
+    assert PaymentOutbox.objects.get().status == "done"
+
+
+@pytest.mark.django_db
+def test_claimed_payment_is_processing(order):
+    payment = start_payment(order, "card")
+
+    claim(10)
+
+    payment.refresh_from_db()
+    assert payment.status == "processing"
+
+
+@pytest.mark.django_db
+def test_paid_order_that_cannot_be_confirmed_is_reported(
+    order, monkeypatch, django_capture_on_commit_callbacks
+):
+    def out_of_stock(self, new_status):
+        raise ValueError("Not enough Mozzarella in stock.")
+
+    monkeypatch.setattr(Order, "change_status", out_of_stock)
+    payment = start_payment(order, "card")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert process_batch(10, gateway=gateway()) == {"unconfirmed": 1}
+
+    payment.refresh_from_db()
+    assert payment.status == "completed"
+    event = OrderEvent.objects.filter(order=order, kind="payment").latest("created_at")
+    assert event.data["confirmation_error"] == "Not enough Mozzarella in stock."
+
+
+@pytest.mark.django_db
+def test_declined_payment_is_final(order):
+    payment = start_payment(order, "card")
+
+    assert process_batch(10, gateway=gateway(decline_rate=1)) == {"failed": 1}
+
+    payment.refresh_from_db()
+    order.refresh_from_db()
+    assert payment.status == "failed"
+    assert order.status == "pending"
+    assert PaymentOutbox.objects.get().status == "failed"
+
+
+@pytest.mark.django_db
+def test_transient_errors_are_retried_with_backoff(order, settings):
+    settings.PAYMENT_MAX_ATTEMPTS = 2
+    payment = start_payment(order, "card")
+    flaky = gateway(failure_rate=1)
+
+    assert process_batch(10, gateway=flaky) == {"retry": 1}
+    entry = PaymentOutbox.objects.get()
+    assert entry.status == "pending" and entry.attempts == 1
+    assert entry.available_at > timezone.now()
+    assert "timeout" in entry.last_error
+
+    # Not due yet
+    assert process_batch(10, gateway=flaky) == {}
+
+    PaymentOutbox.objects.update(available_at=timezone.now())
+    assert process_batch(10, gateway=flaky) == {"failed": 1}
+    payment.refresh_from_db()
+    assert payment.status == "failed"
+    assert payment.gateway_response == {"error": "Gateway timeout"}
+
+
+@pytest.mark.django_db
+def test_claims_do_not_overlap(order):
+    for _ in range(3):
+        start_payment(OrderFactory(user=order.user), "card")
+
+    first = claim(2)
+    second = claim(10)
+
+    assert len(first) == 2 and len(second) == 1
+    assert not {e.pk for e in first} & {e.pk for e in second}
+    assert claim(10) == []
+
+
+@pytest.mark.django_db
+def test_expired_claim_is_taken_over(order):
+    start_payment(order, "card")
+    [stale] = claim(10)
+    PaymentOutbox.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+    [current] = claim(10)
+    assert current.attempts == 2
+
+    # The first worker finally answers, but its claim is gone
+    assert _settle(stale, error=GatewayError("late")) == "lost"
+    assert PaymentOutbox.objects.get().claim == current.claim
+
+
+@pytest.mark.django_db
+def test_pay_endpoint_does_not_call_the_gateway(order):
+    client = APIClient()
+    client.force_authenticate(user=order.user)
+
+    response = client.post(f"/api/v1/orders/{order.pk}/pay/", {"method": "card"})
+
+    assert response.status_code == 202
+    assert response.data["status"] == "pending"
+    assert Payment.objects.get().status == "pending"
+    assert PaymentOutbox.objects.filter(status="pending").count() == 1
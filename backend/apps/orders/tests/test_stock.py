@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+import pytest
+from apps.orders.models import Order, OrderItem
+from apps.products.models import Ingredient
+from apps.products.stock import InsufficientStock
+from apps.accounts.tests.factories import UserFactory
+from apps.orders.tests.factories import OrderFactory
+from apps.products.tests.factories import (
+    IngredientFactory,
+    PizzaFactory,
+    PizzaIngredientFactory,
+    PizzaSizeFactory,
+)
+
+
+def create_order(user, pizza, size, quantity=1, extras=(), removed=()):
+    order = OrderFactory(user=user)
+    OrderItem.objects.create(
+        order=order,
+        pizza=pizza,
+        size=size,
+        quantity=quantity,
+        unit_price=10,
+        extra_ingredients_snapshot=[
+            {"id": i.pk, "name": i.name, "price": "1.00"} for i in extras
+        ],
+        removed_ingredients_snapshot=[
+            {"id": i.pk, "name": i.name, "price": "0.00"} for i in removed
+        ],
+    )
+    return order
+
+
+@pytest.mark.django_db
+def test_confirm_consumes_recipe_scaled_by_size_with_extras_and_removals():
+    user = UserFactory()
+    pizza = PizzaFactory()
+    size = PizzaSizeFactory(price_multiplier=Decimal("1.50"))
+    mozzarella = PizzaIngredientFactory(pizza=pizza, quantity=Decimal("2.00")).ingredient
+    basil = PizzaIngredientFactory(pizza=pizza, quantity=Decimal("1.00")).ingredient
+    olives = IngredientFactory(stock_quantity=10)
+
+    order = create_order(user, pizza, size, quantity=3, extras=[olives], removed=[basil])
+    order.change_status("confirmed")
+
+    # 2 x 1.5 x 3 = 9 mozzarella, 1 x 1.5 x 3 = 4.5 -> 5 olives, basil removed
+    assert Ingredient.objects.get(pk=mozzarella.pk).stock_quantity == 91
+    assert Ingredient.objects.get(pk=olives.pk).stock_quantity == 5
+    assert Ingredient.objects.get(pk=basil.pk).stock_quantity == 100
+
+
+@pytest.mark.django_db
+def test_insufficient_stock_rolls_back_every_ingredient():
+    user = UserFactory()
+    pizza = PizzaFactory()
+    size = PizzaSizeFactory()
+    plenty = PizzaIngredientFactory(pizza=pizza, ingredient__stock_quantity=100).ingredient
+    scarce = PizzaIngredientFactory(pizza=pizza, ingredient__stock_quantity=1).ingredient
+
+    order = create_order(user, pizza, size, quantity=2)
+
+    with pytest.raises(InsufficientStock):
+        order.change_status("confirmed")
+
+    order.refresh_from_db()
+    assert order.status == "pending"
+    assert Ingredient.objects.get(pk=plenty.pk).stock_quantity == 100
+    assert Ingredient.objects.get(pk=scarce.pk).stock_quantity == 1
+
+
+@pytest.mark.django_db
+def test_cancelling_a_confirmed_order_releases_stock():
+    user = UserFactory()
+    pizza = PizzaFactory()
+    ingredient = PizzaIngredientFactory(pizza=pizza).ingredient
+    order = create_order(user, pizza, PizzaSizeFactory(), quantity=4)
+
+    order.change_status("confirmed")
+    assert Ingredient.objects.get(pk=ingredient.pk).stock_quantity == 96
+
+    order.change_status("cancelled")
+    assert Ingredient.objects.get(pk=ingredient.pk).stock_quantity == 100
+
+
+@pytest.mark.django_db
+def test_cancel_releases_what_was_reserved_after_recipe_changes():
+    user = UserFactory()
+    pizza = PizzaFactory()
+    recipe = PizzaIngredientFactory(pizza=pizza, quantity=Decimal("1.00"))
+    size = PizzaSizeFactory(price_multiplier=Decimal("1.00"))
+    order = create_order(user, pizza, size, quantity=4)
+
+    order.change_status("confirmed")
+    recipe.quantity = Decimal("3.00")
+    recipe.save()
+    size.price_multiplier = Decimal("2.00")
+    size.save()
+    Order.objects.get(pk=order.pk).change_status("cancelled")
+
+    assert Ingredient.objects.get(pk=recipe.ingredient_id).stock_quantity == 100
+    assert Order.objects.get(pk=order.pk).reserved_stock == {}
+
+
+@pytest.mark.django_db
+def test_low_stock_is_a_database_filter():
+    low = IngredientFactory(stock_quantity=10, minimum_stock=20)
+    IngredientFactory(stock_quantity=30, minimum_stock=20)
+
+    assert list(Ingredient.objects.low_stock()) == [low]
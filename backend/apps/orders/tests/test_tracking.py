@@ -0,0 +1,154 @@
+import time
+from decimal import Decimal
+
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from apps.accounts.api.serializers import LoginSerializer
+from apps.accounts.tests.factories import UserFactory
+from apps.orders import tracking
+from apps.orders.models import DeliveryInfo
+from apps.orders.tests.factories import OrderFactory
+
+
+@pytest.fixture(autouse=True)
+def buffer(monkeypatch):
+    caches["default"].clear()
+    buffer = tracking.LocationBuffer()
+    monkeypatch.setattr(tracking, "buffer", buffer)
+    yield buffer
+    caches["default"].clear()
+
+
+def client_for(user):
+    client = APIClient()
+    token = LoginSerializer.get_token(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return client
+
+
+def create_delivery(user, status="in_transit"):
+    order = OrderFactory(user=user, order_type="delivery")
+    return DeliveryInfo.objects.create(order=order, status=status)
+
+
+def ping(delivery, lat, lon, at=None):
+    return {"delivery": delivery.pk, "lat": lat, "lon": lon,
+            **({"at": at} if at is not None else {})}
+
+
+@pytest.mark.django_db
+def test_ingest_batch_updates_latest_position(django_assert_num_queries):
+    customer = UserFactory()
+    delivery = create_delivery(customer)
+    done = create_delivery(customer, status="delivered")
+    update_at = delivery.update_at
+    driver = client_for(UserFactory(is_staff=True))
+
+    # Active deliveries load + one bulk UPDATE; no user lookup
+    with django_assert_num_queries(2):
+        response = driver.post("/api/v1/orders/tracking/pings/", {"pings": [
+            ping(delivery, 45.1, 9.1, at=100),
+            ping(delivery, 45.2, 9.2, at=101),
+            ping(done, 45.3, 9.3),
+        ]}, format="json")
+
+    assert response.status_code == 202
+    assert response.data == {"accepted": 2, "rejected": 1}
+
+    delivery.refresh_from_db()
+    assert delivery.current_latitude == Decimal("45.200000")
+    assert delivery.current_longitude == Decimal("9.200000")
+    assert delivery.update_at == update_at
+
+
+@pytest.mark.django_db
+def test_positions_are_coalesced_into_one_update(
+    buffer, settings, django_assert_num_queries
+):
+    settings.TRACKING_FLUSH_INTERVAL = 3600
+    deliveries = [create_delivery(UserFactory()) for _ in range(5)]
+    buffer.active_deliveries()
+    now = time.time()
+
+    with django_assert_num_queries(0):
+        for step in range(10):
+            buffer.add([
+                (d.pk, 45 + step / 100, 9 + step / 100, now + step) for d in deliveries
+            ])
+
+    with django_assert_num_queries(1):
+        assert buffer.flush() == 5
+
+    assert set(
+        DeliveryInfo.objects.values_list("current_latitude", flat=True)
+    ) == {Decimal("45.090000")}
+
+
+@pytest.mark.django_db
+def test_trail_is_a_bounded_ring_buffer(buffer, settings):
+    settings.TRACKING_TRAIL_LENGTH = 3
+    delivery = create_delivery(UserFactory())
+
+    buffer.add([(delivery.pk, 45.0 + i, 9.0, 100.0 + i) for i in range(5)])
+    # A late, older fix does not move the driver back, nor count as accepted
+    assert buffer.add([(delivery.pk, 10.0, 10.0, 50.0)]) == 0
+
+    position = tracking.live_position(delivery.order_id)
+    assert [fix[0] for fix in position["trail"]] == [47.0, 48.0, 49.0]
+    assert position["latitude"] == 49.0
+
+
+@pytest.mark.django_db
+def test_finished_deliveries_are_dropped_on_reload(buffer, settings):
+    settings.TRACKING_FLUSH_INTERVAL = 3600
+    delivery = create_delivery(UserFactory())
+    buffer.add([(delivery.pk, 45.0, 9.0, 100.0)])
+
+    DeliveryInfo.objects.filter(pk=delivery.pk).update(status="delivered")
+    buffer._active_loaded_at = None
+    buffer.active_deliveries()
+
+    assert buffer._trails == {} and buffer._dirty == {}
+
+
+@pytest.mark.django_db
+def test_live_location_is_served_without_sql(buffer, django_assert_num_queries):
+    customer = UserFactory()
+    delivery = create_delivery(customer)
+    buffer.add([(delivery.pk, 45.5, 9.5, time.time())])
+    url = f"/api/v1/orders/tracking/{delivery.order_id}/"
+
+    owner = client_for(customer)
+    with django_assert_num_queries(0):
+        response = owner.get(url)
+    assert response.status_code == 200
+    assert (response.data["latitude"], response.data["longitude"]) == (45.5, 9.5)
+
+    assert client_for(UserFactory(is_staff=True)).get(url).status_code == 200
+    assert client_for(UserFactory()).get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_only_staff_can_post_pings():
+    delivery = create_delivery(UserFactory())
+
+    response = client_for(UserFactory()).post(
+        "/api/v1/orders/tracking/pings/", {"pings": [ping(delivery, 45, 9)]}, format="json"
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("payload", [
+    {},
+    {"pings": []},
+    {"pings": [{"delivery": 1, "lat": "north", "lon": 9}]},
+    {"pings": [{"delivery": 1, "lat": 91, "lon": 9}]},
+])
+def test_invalid_batches_are_rejected(payload):
+    response = client_for(UserFactory(is_staff=True)).post(
+        "/api/v1/orders/tracking/pings/", payload, format="json"
+    )
+    assert response.status_code == 400
@@ -1,7 +1,9 @@
 import pytest
 from django.core.exceptions import ValidationError
-from apps.orders.models import Order
+from rest_framework.test import APIClient
+from apps.orders.models import Order, OrderStatusConflict
 from apps.accounts.tests.factories import UserFactory
+from apps.orders.tests.factories import OrderFactory
 
 
 @pytest.mark.django_db
@@ -56,4 +58,63 @@ def test_total_amount_validation():
             tax_amount=0,
             discount_amount=0,
             total_amount=5,
-        )
\ No newline at end of file
+        )
+
+
+
+@pytest.mark.django_db
+def test_status_transition_is_a_single_update(django_assert_num_queries):
+    order = OrderFactory()
+    order.status = "preparing"
+    order.save(update_fields=["status"])
+
+    with django_assert_num_queries(1):
+        order.change_status("ready")
+
+    order.refresh_from_db()
+    assert order.status == "ready"
+
+
+@pytest.mark.django_db
+def test_stale_status_raises_conflict():
+    order = OrderFactory()
+    stale = Order.objects.get(pk=order.pk)
+
+    order.change_status("cancelled")
+
+    with pytest.raises(OrderStatusConflict):
+        stale.change_status("confirmed")
+
+    stale.refresh_from_db()
+    assert stale.status == "cancelled"
+    assert stale.confirmed_at is None
+
+
+@pytest.mark.django_db
+def test_change_status_endpoint_reports_conflict(monkeypatch):
+    user = UserFactory()
+    order = OrderFactory(user=user)
+    Order.objects.filter(pk=order.pk).update(status="cancelled")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # The view loads the fresh row, so a stale client only gets 400...
+    response = client.post(
+        f"/api/v1/orders/{order.id}/change-status/", {"status": "confirmed"}
+    )
+    assert response.status_code == 400
+
+    # ...while a row moving between load and update is a 409
+    original = Order.change_status
+
+    def racing_change_status(self, new_status):
+        Order.objects.filter(pk=self.pk).update(status="ready")
+        return original(self, new_status)
+
+    Order.objects.filter(pk=order.pk).update(status="preparing")
+    monkeypatch.setattr(Order, "change_status", racing_change_status)
+    response = client.post(
+        f"/api/v1/orders/{order.id}/change-status/", {"status": "ready"}
+    )
+
+    assert response.status_code == 409
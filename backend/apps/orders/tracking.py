@@ -0,0 +1,246 @@
+"""
+Live driver positions.
+
+Drivers post pings in batches. Each process keeps the last
+`settings.TRACKING_TRAIL_LENGTH` positions per active delivery in a ring
+buffer (`collections.deque`), and publishes the latest position and
+trail of every delivery touched by a batch to the cache with one
+`set_many()`, keyed by order, so any worker can serve the live position
+without touching SQL.
+
+The database only gets the latest position: a daemon thread writes all
+deliveries that moved since the last flush with one multi-row UPDATE
+every `TRACKING_FLUSH_INTERVAL` seconds (0: at every batch). Positions
+are not business changes, so `update_at` is left alone. Pings for
+deliveries that are not active are dropped; the set of active
+deliveries is reloaded every `TRACKING_ACTIVE_REFRESH` seconds.
+
+Cached entry, under `tracking:<order id>`:
+
+    {"order": "...", "user_id": "...", "latitude": 45.46, "longitude": 9.19,
+     "at": 1767268800.0, "trail": [[45.46, 9.19, 1767268800.0], ...]}
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ["assigned", "in_transit"]
+COORDINATE_PLACES = Decimal("0.000001")
+# Backends that support UPDATE ... FROM (SQLite since 3.33)
+UPDATE_FROM_VENDORS = {"postgresql", "sqlite"}
+
+
+class InvalidPing(ValueError):
+    pass
+
+
+def parse_pings(payload, now=None):
+    """Validate a batch body into [(delivery_id, latitude, longitude, at), ...]."""
+    now = now or time.time()
+    pings = payload.get("pings") if isinstance(payload, dict) else None
+    if not isinstance(pings, list) or not pings:
+        raise InvalidPing("Expected a non-empty 'pings' list.")
+    if len(pings) > settings.TRACKING_MAX_BATCH:
+        raise InvalidPing(f"At most {settings.TRACKING_MAX_BATCH} pings per batch.")
+
+    parsed = []
+    for index, ping in enumerate(pings):
+        try:
+            delivery_id = int(ping["delivery"])
+            latitude = float(ping["lat"])
+            longitude = float(ping["lon"])
+            at = float(ping.get("at", now))
+        except (KeyError, TypeError, ValueError):
+            raise InvalidPing(f"Ping {index} needs numeric 'delivery', 'lat' and 'lon'.")
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise InvalidPing(f"Ping {index} is out of range.")
+        # Device clocks drift: never accept fixes from the future
+        parsed.append((delivery_id, latitude, longitude, min(at, now)))
+    return parsed
+
+
+def cache_key(order_id):
+    return f"tracking:{order_id}"
+
+
+def live_position(order_id):
+    return caches[settings.TRACKING_CACHE_ALIAS].get(cache_key(order_id))
+
+
+def write_positions(rows):
+    """Set [(delivery id, latitude, longitude), ...] with one UPDATE."""
+    from apps.orders.models import DeliveryInfo
+
+    if connection.vendor not in UPDATE_FROM_VENDORS:
+        DeliveryInfo.objects.bulk_update(
+            [
+                DeliveryInfo(pk=pk, current_latitude=latitude, current_longitude=longitude)
+                for pk, latitude, longitude in rows
+            ],
+            ["current_latitude", "current_longitude"],
+        )
+        return
+
+    # bulk_update()'s CASE WHEN expressions cost ~25x more to build than
+    # the database takes to run this join against a VALUES list
+    meta = DeliveryInfo._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    sql = (
+        f"UPDATE {table} SET "
+        f"{quote(meta.get_field('current_latitude').column)} = v.column2, "
+        f"{quote(meta.get_field('current_longitude').column)} = v.column3 "
+        f"FROM (VALUES {', '.join(['(%s, %s, %s)'] * len(rows))}) AS v "
+        f"WHERE {table}.{quote(meta.pk.column)} = v.column1"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+
+
+class LocationBuffer:
+
+    def __init__(self):
+        self._trails = {}
+        self._dirty = {}
+        self._active = {}
+        self._active_loaded_at = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    # Active deliveries
+
+    def active_deliveries(self):
+        """{delivery id: (order id, user id)}, reloaded at most every refresh interval."""
+        loaded_at = self._active_loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > settings.TRACKING_ACTIVE_REFRESH:
+            from apps.orders.models import DeliveryInfo
+
+            active = {
+                pk: (str(order_id), str(user_id))
+                for pk, order_id, user_id in DeliveryInfo.objects
+                .filter(status__in=ACTIVE_STATUSES)
+                .values_list("pk", "order_id", "order__user_id")
+            }
+            with self._lock:
+                # Finished deliveries no longer take pings: forget their trails
+                self._trails = {
+                    pk: trail for pk, trail in self._trails.items() if pk in active
+                }
+                self._dirty = {
+                    pk: point for pk, point in self._dirty.items() if pk in active
+                }
+            self._active = active
+            self._active_loaded_at = time.monotonic()
+        return self._active
+
+    # Ingestion
+
+    def add(self, pings):
+        """Buffer parsed pings; return how many were accepted (active, not stale)."""
+        active = self.active_deliveries()
+        entries = {}
+        accepted = 0
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: start from a clean buffer and thread
+                self._trails, self._dirty, self._thread = {}, {}, None
+                self._pid = os.getpid()
+
+            for delivery_id, latitude, longitude, at in pings:
+                if delivery_id not in active:
+                    continue
+
+                trail = self._trails.get(delivery_id)
+                if trail is None:
+                    trail = self._trails[delivery_id] = deque(
+                        maxlen=settings.TRACKING_TRAIL_LENGTH
+                    )
+                if trail and at < trail[-1][2]:
+                    # Late delivery of an older fix: keep it out of "latest"
+                    continue
+                trail.append((latitude, longitude, at))
+                self._dirty[delivery_id] = (latitude, longitude)
+                accepted += 1
+
+                order_id, user_id = active[delivery_id]
+                entries[cache_key(order_id)] = (order_id, user_id, trail)
+
+            snapshot = {
+                key: {
+                    "order": order_id,
+                    "user_id": user_id,
+                    "latitude": trail[-1][0],
+                    "longitude": trail[-1][1],
+                    "at": trail[-1][2],
+                    "trail": list(trail),
+                }
+                for key, (order_id, user_id, trail) in entries.items()
+            }
+            start_thread = (
+                settings.TRACKING_FLUSH_INTERVAL and self._thread is None and self._dirty
+            )
+            if start_thread:
+                self._thread = threading.Thread(
+                    target=self._run, name="driver-tracking", daemon=True
+                )
+
+        if snapshot:
+            caches[settings.TRACKING_CACHE_ALIAS].set_many(
+                snapshot, settings.TRACKING_CACHE_TTL
+            )
+
+        if not settings.TRACKING_FLUSH_INTERVAL:
+            self.flush()
+        elif start_thread:
+            self._thread.start()
+
+        return accepted
+
+    # Persistence
+
+    def flush(self):
+        """Write the latest position of every moved delivery in one UPDATE."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+
+        rows = [
+            (
+                delivery_id,
+                Decimal(latitude).quantize(COORDINATE_PLACES),
+                Decimal(longitude).quantize(COORDINATE_PLACES),
+            )
+            for delivery_id, (latitude, longitude) in dirty.items()
+        ]
+        size = settings.TRACKING_FLUSH_BATCH_SIZE
+        for start in range(0, len(rows), size):
+            write_positions(rows[start:start + size])
+        return len(rows)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.TRACKING_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush driver positions")
+            close_old_connections()
+
+
+buffer = LocationBuffer()
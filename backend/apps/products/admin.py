@@ -6,6 +6,7 @@ from .models import (
     PizzaSize,
     Pizza,
     PizzaIngredient,
+    PizzaPrice,
 )
 
 
@@ -14,4 +15,21 @@ admin.site.register(Allergen)
 admin.site.register(Ingredient)
 admin.site.register(PizzaSize)
 admin.site.register(Pizza)
-admin.site.register(PizzaIngredient)
\ No newline at end of file
+admin.site.register(PizzaIngredient)
+
+
+@admin.register(PizzaPrice)
+class PizzaPriceAdmin(admin.ModelAdmin):
+    # Derived from Pizza.base_price and PizzaSize.price_multiplier by
+    # the pricing signals: edit those, never the matrix itself
+    list_display = ("pizza", "size", "price", "update_at")
+    list_select_related = ("pizza", "size")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,123 @@
+"""
+Allergen bitmask maintenance.
+
+Every `Allergen` owns one bit. `Ingredient.allergen_mask` is the OR of
+its allergens and `Pizza.allergen_mask` the OR of its recipe
+ingredients, so "free from" filtering is a single bitwise predicate on
+`products_pizza` instead of two M2M joins.
+"""
+
+from collections import defaultdict
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.products import cache as menu_cache
+from apps.products.models import Allergen, Ingredient, Pizza, PizzaIngredient
+
+
+class UnknownAllergens(ValueError):
+
+    def __init__(self, names):
+        self.names = names
+        super().__init__(f"Unknown allergens: {', '.join(names)}")
+
+
+def mask_for_names(names):
+    """
+    OR together the bits of the allergens named in `names`
+    (case-insensitive). Raises `UnknownAllergens` if any name does not
+    resolve: a typo must never widen an allergen filter to the whole menu.
+    """
+    condition = Q()
+    for name in names:
+        condition |= Q(name__iexact=name)
+
+    if not condition:
+        return 0
+
+    mask = 0
+    found = set()
+    for name, bit in Allergen.objects.filter(condition).values_list("name", "bit"):
+        mask |= 1 << bit
+        found.add(name.casefold())
+
+    unknown = [name for name in names if name.casefold() not in found]
+    if unknown:
+        raise UnknownAllergens(unknown)
+    return mask
+
+
+def exclude_allergens(queryset, mask):
+    """Keep only pizzas whose recipe contains none of the allergens in `mask`."""
+    if not mask:
+        return queryset
+
+    return (
+        queryset
+        .alias(allergen_conflicts=F("allergen_mask").bitand(mask))
+        .filter(allergen_conflicts=0)
+    )
+
+
+def _apply_masks(model, current, computed):
+    """Write changed masks with one UPDATE per distinct mask value."""
+    by_mask = defaultdict(list)
+    for pk, mask in computed.items():
+        if current.get(pk) != mask:
+            by_mask[mask].append(pk)
+
+    now = timezone.now()
+    for mask, pks in by_mask.items():
+        model.objects.filter(pk__in=pks).update(allergen_mask=mask, update_at=now)
+
+    return [pk for pks in by_mask.values() for pk in pks]
+
+
+def refresh_pizza_masks(pizza_ids):
+    pizza_ids = list(pizza_ids)
+    if not pizza_ids:
+        return []
+
+    current = dict(
+        Pizza.objects.filter(pk__in=pizza_ids).values_list("pk", "allergen_mask")
+    )
+    computed = dict.fromkeys(current, 0)
+    for pizza_id, mask in (
+        PizzaIngredient.objects
+        .filter(pizza_id__in=pizza_ids)
+        .values_list("pizza_id", "ingredient__allergen_mask")
+    ):
+        computed[pizza_id] |= mask
+
+    changed = _apply_masks(Pizza, current, computed)
+    if changed:
+        menu_cache.invalidate_catalog()
+    return changed
+
+
+def refresh_ingredient_masks(ingredient_ids):
+    ingredient_ids = list(ingredient_ids)
+    if not ingredient_ids:
+        return []
+
+    current = dict(
+        Ingredient.objects.filter(pk__in=ingredient_ids).values_list("pk", "allergen_mask")
+    )
+    computed = dict.fromkeys(current, 0)
+    for ingredient_id, bit in (
+        Ingredient.allergens.through.objects
+        .filter(ingredient_id__in=ingredient_ids)
+        .values_list("ingredient_id", "allergen__bit")
+    ):
+        computed[ingredient_id] |= 1 << bit
+
+    changed = _apply_masks(Ingredient, current, computed)
+    if changed:
+        refresh_pizza_masks(
+            PizzaIngredient.objects
+            .filter(ingredient_id__in=changed)
+            .values_list("pizza_id", flat=True)
+            .distinct()
+        )
+    return changed
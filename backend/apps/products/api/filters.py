@@ -0,0 +1,54 @@
+import django_filters
+from django.db.models import Case, When, IntegerField, Subquery
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+
+from apps.products.allergens import UnknownAllergens, exclude_allergens, mask_for_names
+from apps.products.models import Category, Pizza
+from apps.products.search import search_pizza_ids
+
+
+class RankedPizzaSearchFilter(SearchFilter):
+    """
+    `?search=` backed by the full-text index instead of `LIKE '%term%'`.
+
+    Results keep the index ranking unless the client asks for an
+    explicit `?ordering=`. The search runs against the already filtered
+    queryset, so hidden pizzas never take a place in the ranked limit.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        ranked_ids = search_pizza_ids(" ".join(terms), within=queryset)
+        if not ranked_ids:
+            return queryset.none()
+
+        rank = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ranked_ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=ranked_ids).order_by(rank)
+
+
+class PizzaFilter(django_filters.FilterSet):
+    exclude_allergens = django_filters.CharFilter(method="filter_exclude_allergens")
+    category_tree = django_filters.CharFilter(method="filter_category_tree")
+
+    class Meta:
+        model = Pizza
+        fields = ["category"]
+
+    def filter_exclude_allergens(self, queryset, name, value):
+        names = [item.strip() for item in value.split(",") if item.strip()]
+        try:
+            mask = mask_for_names(names)
+        except UnknownAllergens as e:
+            raise ValidationError({"exclude_allergens": [str(e)]})
+        return exclude_allergens(queryset, mask)
+
+    def filter_category_tree(self, queryset, name, value):
+        root_path = Category.objects.filter(slug=value).values("path")[:1]
+        return queryset.filter(category__path__startswith=Subquery(root_path))
@@ -0,0 +1,101 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from apps.products import cache as menu_cache
+
+
+class ConditionalGetMixin:
+    """
+    Compute cheap HTTP validators for catalog responses.
+
+    The validator is a single aggregate over the filtered queryset
+    (max `update_at` plus row count), so a 304 never serializes anything.
+    """
+
+    def get_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+
+        summary = queryset.order_by().aggregate(
+            last_modified=Max("update_at"),
+            count=Count("pk"),
+        )
+
+        last_modified = summary["last_modified"]
+        fingerprint = "|".join([
+            request.get_full_path(),
+            str(summary["count"]),
+            last_modified.isoformat() if last_modified else "",
+        ])
+
+        return {
+            "etag": f'W/"{hashlib.md5(fingerprint.encode("utf-8")).hexdigest()}"',
+            "last_modified": int(last_modified.timestamp()) if last_modified else None,
+        }
+
+    def not_modified_response(self, request, validators):
+        return get_conditional_response(
+            request,
+            etag=validators["etag"],
+            last_modified=validators["last_modified"],
+        )
+
+    def set_validator_headers(self, response, validators):
+        response["ETag"] = validators["etag"]
+        if validators["last_modified"] is not None:
+            response["Last-Modified"] = http_date(validators["last_modified"])
+        return response
+
+
+class MenuCacheMixin(ConditionalGetMixin):
+    """
+    Serve `list` and `retrieve` from the versioned catalog snapshot cache.
+
+    Pages are keyed by the absolute request URI (filters, ordering and
+    page included) and stored together with their validators, so a hit,
+    conditional or not, is answered without touching the database.
+    """
+
+    menu_cache_header = "X-Menu-Cache"
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = menu_cache.page_key(self.basename, request.build_absolute_uri())
+
+        page = menu_cache.get_page(key)
+        if page is not None:
+            validators = page["validators"]
+            response = (
+                self.not_modified_response(request, validators)
+                or Response(page["data"])
+            )
+            response[self.menu_cache_header] = "HIT"
+            return self.set_validator_headers(response, validators)
+
+        validators = self.get_validators(request)
+
+        response = self.not_modified_response(request, validators)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+            if response.status_code == 200:
+                menu_cache.set_page(
+                    key, {"data": response.data, "validators": validators}
+                )
+
+        response[self.menu_cache_header] = "MISS"
+        return self.set_validator_headers(response, validators)
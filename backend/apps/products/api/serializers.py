@@ -1,14 +1,40 @@
 from rest_framework import serializers
-from apps.products.models import Pizza, Category
+from apps.core.images import variant_urls
+from apps.products.models import Pizza, PizzaPrice, Category
+
+
+class ImageVariantsField(serializers.Field):
+    """Expose a stored variant map as URLs and `srcset` strings."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return variant_urls(value)
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Category
-        fields = ["id", "name", "slug"]
+        fields = ["id", "name", "slug", "image", "image_variants"]
+
+
+class PizzaPriceSerializer(serializers.ModelSerializer):
+    size_name = serializers.CharField(source="size.name", read_only=True)
+    diameter_cm = serializers.IntegerField(source="size.diameter_cm", read_only=True)
+
+    class Meta:
+        model = PizzaPrice
+        fields = ["size", "size_name", "diameter_cm", "price"]
 
 
 class PizzaSerializer(serializers.ModelSerializer):
+    prices = PizzaPriceSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Pizza
         fields = [
@@ -16,6 +42,9 @@ class PizzaSerializer(serializers.ModelSerializer):
             "name",
             "slug",
             "base_price",
+            "prices",
+            "image",
+            "image_variants",
             "is_featured",
             "category",
-        ]
\ No newline at end of file
+        ]
@@ -1,8 +1,13 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import PizzaViewSet, CategoryViewSet
+from .views import PizzaViewSet, CategoryViewSet, MenuCacheStatsView
 
 router = DefaultRouter()
 router.register(r"categories", CategoryViewSet, basename="categories")
 router.register(r"pizzas", PizzaViewSet, basename="pizzas")
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = [
+    path("cache-stats/", MenuCacheStatsView.as_view(), name="menu-cache-stats"),
+]
+
+urlpatterns += router.urls
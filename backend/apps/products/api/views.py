@@ -1,26 +1,85 @@
+from django.db.models import Prefetch
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, permissions
-from apps.products.models import Pizza, Category
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.core.pagination import KeysetPagination
+from apps.products import cache as menu_cache
+from apps.products.models import Pizza, PizzaPrice, Category
+from .filters import PizzaFilter, RankedPizzaSearchFilter
+from .mixins import MenuCacheMixin
 from .serializers import PizzaSerializer, CategorySerializer
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(MenuCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
         return Category.objects.filter(is_active=True)
 
+    @action(detail=False, methods=["get"])
+    def tree(self, request):
+        return self.cached_response(self.tree_response, request)
 
-class PizzaViewSet(viewsets.ReadOnlyModelViewSet):
+    def tree_response(self, request):
+        categories = self.get_queryset().order_by("path")
+
+        nodes = {}
+        roots = []
+        for category in categories:
+            node = {
+                "id": category.id,
+                "name": category.name,
+                "slug": category.slug,
+                "sort_order": category.sort_order,
+                "children": [],
+            }
+            nodes[category.id] = node
+
+            if category.parent_id is None:
+                roots.append(node)
+            elif category.parent_id in nodes:
+                nodes[category.parent_id]["children"].append(node)
+            # Children of inactive categories are hidden with their parent
+
+        def sort_level(level):
+            level.sort(key=lambda node: (node["sort_order"], node["name"]))
+            for node in level:
+                sort_level(node["children"])
+            return level
+
+        return Response(sort_level(roots))
+
+
+class PizzaViewSet(MenuCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PizzaSerializer
     permission_classes = [permissions.AllowAny]
-    filterset_fields = ["category"]
-    search_fields = ["name"]
+    filter_backends = [DjangoFilterBackend, RankedPizzaSearchFilter, OrderingFilter]
+    filterset_class = PizzaFilter
     ordering_fields = ["base_price", "created_at"]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return (
             Pizza.objects
-            .filter(is_active=True)
+            .filter(is_active=True, is_available=True)
             .select_related("category")
-        )
\ No newline at end of file
+            .prefetch_related(
+                Prefetch(
+                    "prices",
+                    queryset=PizzaPrice.objects
+                    .select_related("size")
+                    .order_by("size__diameter_cm"),
+                )
+            )
+        )
+
+
+class MenuCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(menu_cache.get_stats())
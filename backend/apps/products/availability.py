@@ -0,0 +1,67 @@
+"""
+Pizza availability maintenance.
+
+`Pizza.is_available` is false while any recipe ingredient is inactive or
+out of stock. It is recomputed only for the pizzas using the ingredients
+that changed, with conditional UPDATEs that write just the rows whose
+flag actually flips, so the menu can filter on an indexed column instead
+of joining `PizzaIngredient` per request.
+"""
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.products import cache as menu_cache
+from apps.products.models import Pizza, PizzaIngredient
+
+
+def _missing_ingredient():
+    return PizzaIngredient.objects.filter(pizza=OuterRef("pk")).filter(
+        Q(ingredient__stock_quantity=0) | Q(ingredient__is_active=False)
+    )
+
+
+def _refresh(pizzas):
+    now = timezone.now()
+    missing = Exists(_missing_ingredient())
+
+    changed = (
+        pizzas.filter(is_available=True)
+        .filter(missing)
+        .update(is_available=False, update_at=now)
+    )
+    changed += (
+        pizzas.filter(is_available=False)
+        .exclude(missing)
+        .update(is_available=True, update_at=now)
+    )
+
+    if changed:
+        menu_cache.invalidate_catalog()
+    return changed
+
+
+def refresh_pizza_availability(pizza_ids=None):
+    """Recompute `is_available` for `pizza_ids` (every pizza when None)."""
+    if pizza_ids is None:
+        return _refresh(Pizza.objects.all())
+
+    pizza_ids = list(pizza_ids)
+    if not pizza_ids:
+        return 0
+    return _refresh(Pizza.objects.filter(pk__in=pizza_ids))
+
+
+def refresh_ingredient_availability(ingredient_ids):
+    """Recompute `is_available` for the pizzas using `ingredient_ids`."""
+    ingredient_ids = list(ingredient_ids)
+    if not ingredient_ids:
+        return 0
+
+    return _refresh(
+        Pizza.objects.filter(
+            pk__in=PizzaIngredient.objects
+            .filter(ingredient_id__in=ingredient_ids)
+            .values("pizza_id")
+        )
+    )
@@ -0,0 +1,105 @@
+"""
+Versioned snapshot cache for the public catalog endpoints.
+
+Cached pages are addressed through a global catalog version. Any write
+to the catalog bumps the version, so old pages are never deleted one by
+one: they stop being addressed and expire on their own.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+VERSION_KEY = "menu:version"
+HITS_KEY = "menu:stats:hits"
+MISSES_KEY = "menu:stats:misses"
+
+
+def get_cache():
+    return caches[settings.MENU_CACHE_ALIAS]
+
+
+def _new_version():
+    # Nanosecond seed: if the version key is ever evicted, the new value
+    # is still greater than any version used by pages still in the cache.
+    return time.time_ns()
+
+
+def get_catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        cache.add(VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+
+    return version
+
+
+def bump_catalog_version():
+    cache = get_cache()
+
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        version = _new_version()
+        cache.set(VERSION_KEY, version, timeout=None)
+        return version
+
+
+def invalidate_catalog():
+    """
+    Bump the version now and again once the current transaction commits,
+    so a page rebuilt from uncommitted state cannot outlive the write.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def page_key(scope, uri):
+    digest = hashlib.md5(uri.encode("utf-8")).hexdigest()
+    return f"menu:page:{get_catalog_version()}:{scope}:{digest}"
+
+
+def get_page(key):
+    page = get_cache().get(key)
+    _count(HITS_KEY if page is not None else MISSES_KEY)
+    return page
+
+
+def set_page(key, page):
+    get_cache().set(key, page, timeout=settings.MENU_CACHE_TIMEOUT)
+
+
+def _count(key):
+    cache = get_cache()
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_stats():
+    cache = get_cache()
+    values = cache.get_many([VERSION_KEY, HITS_KEY, MISSES_KEY])
+
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+
+    return {
+        "version": values.get(VERSION_KEY),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,554 @@
+"""
+Streaming catalog import/export (CSV and JSON Lines).
+
+A catalog file is a stream of typed records. Every record has a `type`
+(category, allergen, ingredient, size, pizza) and references other
+records by name. Export writes the types in dependency order; import
+buffers records per type and flushes them in chunks with
+`bulk_create`/`bulk_update`, flushing pending dependencies first.
+
+Slugs are allocated in memory against one prefetched slug set per model.
+Because bulk writes skip model signals, derived data (category paths,
+allergen masks, price matrix, search index, menu cache) is refreshed
+once for the touched rows at the end of the import.
+"""
+
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.slugs import SlugAllocator
+from apps.products import cache as menu_cache
+from apps.products.allergens import refresh_ingredient_masks, refresh_pizza_masks
+from apps.products.availability import (
+    refresh_ingredient_availability,
+    refresh_pizza_availability,
+)
+from apps.products.models import (
+    Category,
+    Allergen,
+    Ingredient,
+    PizzaSize,
+    Pizza,
+    PizzaIngredient,
+)
+from apps.products.pricing import rebuild_price_matrix
+from apps.products.search import index_pizzas
+
+
+RECORD_TYPES = ["category", "allergen", "ingredient", "size", "pizza"]
+
+CSV_FIELDS = [
+    "type", "name", "slug", "parent", "category", "symbol", "description",
+    "short_description", "cost_per_unit", "price_per_extra", "stock_quantity",
+    "minimum_stock", "diameter_cm", "price_multiplier", "base_price",
+    "sort_order", "is_active", "is_featured", "allergens", "ingredients",
+]
+
+LIST_SEPARATOR = "|"
+PART_SEPARATOR = ":"
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+# -------------------------------------------------------------------
+# Formats
+# -------------------------------------------------------------------
+
+def _encode_csv(record):
+    row = dict(record)
+    if "allergens" in row:
+        row["allergens"] = LIST_SEPARATOR.join(row["allergens"])
+    if "ingredients" in row:
+        row["ingredients"] = LIST_SEPARATOR.join(
+            PART_SEPARATOR.join([
+                item["name"],
+                str(item["quantity"]),
+                "1" if item["is_removable"] else "0",
+            ])
+            for item in row["ingredients"]
+        )
+    return row
+
+
+def _decode_csv(row):
+    record = {key: value for key, value in row.items() if value not in ("", None)}
+    if "allergens" in record:
+        record["allergens"] = record["allergens"].split(LIST_SEPARATOR)
+    if "ingredients" in record:
+        items = []
+        for item in record["ingredients"].split(LIST_SEPARATOR):
+            name, quantity, removable = item.rsplit(PART_SEPARATOR, 2)
+            items.append({
+                "name": name,
+                "quantity": quantity,
+                "is_removable": removable == "1",
+            })
+        record["ingredients"] = items
+    return record
+
+
+def read_records(stream, fmt):
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            try:
+                yield _decode_csv(row)
+            except ValueError:
+                raise CatalogImportError(
+                    f"Line {reader.line_num}: ingredients must be "
+                    f"'name{PART_SEPARATOR}quantity{PART_SEPARATOR}removable' items"
+                ) from None
+    else:
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise CatalogImportError(f"Line {number}: invalid JSON: {e.msg}") from None
+            if not isinstance(record, dict):
+                raise CatalogImportError(f"Line {number}: a record must be a JSON object")
+            yield record
+
+
+class RecordWriter:
+    def __init__(self, stream, fmt):
+        self.fmt = fmt
+        self.stream = stream
+        if fmt == "csv":
+            self.writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.fmt == "csv":
+            self.writer.writerow(_encode_csv(record))
+        else:
+            self.stream.write(json.dumps(record, default=str) + "\n")
+
+
+# -------------------------------------------------------------------
+# Value parsing
+# -------------------------------------------------------------------
+
+def _decimal(record, key, default=None):
+    value = record.get(key, default)
+    if value is None:
+        raise CatalogImportError(f"Missing '{key}'")
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise CatalogImportError(f"Invalid decimal for '{key}': {value!r}") from None
+
+
+def _int(record, key, default=None):
+    value = record.get(key, default)
+    if value is None:
+        raise CatalogImportError(f"Missing '{key}'")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CatalogImportError(f"Invalid integer for '{key}': {value!r}") from None
+
+
+def _bool(record, key, default):
+    value = record.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _required(record, key):
+    value = record.get(key)
+    if not value:
+        raise CatalogImportError(f"Missing '{key}'")
+    return value
+
+
+# -------------------------------------------------------------------
+# Import
+# -------------------------------------------------------------------
+
+class CatalogImporter:
+    def __init__(self, chunk_size=500):
+        self.chunk_size = chunk_size
+        self.pending = {record_type: [] for record_type in RECORD_TYPES}
+        self.rows = 0
+
+        self.categories = {c.name: c for c in Category.objects.all()}
+        self.allergens = {a.name: a for a in Allergen.objects.all()}
+        self.ingredients = {i.name: i for i in Ingredient.objects.all()}
+        self.sizes = {s.name: s for s in PizzaSize.objects.all()}
+        self.pizzas = {p.name: p for p in Pizza.objects.all()}
+
+        self.slugs = {
+            Category: SlugAllocator(c.slug for c in self.categories.values()),
+            Ingredient: SlugAllocator(i.slug for i in self.ingredients.values()),
+            Pizza: SlugAllocator(p.slug for p in self.pizzas.values()),
+        }
+        self.free_bits = sorted(
+            set(range(Allergen.MAX_ALLERGENS))
+            - {a.bit for a in self.allergens.values()}
+        )
+
+        self.touched = {record_type: set() for record_type in RECORD_TYPES}
+        self.parent_links = {}
+
+    def run(self, records):
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            for line, record in enumerate(records, start=1):
+                record_type = record.get("type")
+                if record_type not in self.pending:
+                    raise CatalogImportError(
+                        f"Record {line}: unknown type {record_type!r}"
+                    )
+                self.pending[record_type].append((line, record))
+                self.rows += 1
+
+                if len(self.pending[record_type]) >= self.chunk_size:
+                    self.flush(record_type)
+
+            for record_type in RECORD_TYPES:
+                self.flush(record_type)
+
+            self.refresh_derived_data()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": self.rows,
+            "seconds": elapsed,
+            "rows_per_second": self.rows / elapsed if elapsed else 0.0,
+        }
+
+    def flush(self, record_type):
+        # Records may reference anything of an earlier type
+        for dependency in RECORD_TYPES[:RECORD_TYPES.index(record_type)]:
+            if self.pending[dependency]:
+                self.flush(dependency)
+
+        chunk, self.pending[record_type] = self.pending[record_type], []
+        if not chunk:
+            return
+
+        handler = getattr(self, f"import_{record_type}_chunk")
+        current_line = None
+        try:
+            rows = []
+            for current_line, record in chunk:
+                rows.append(self.parse(record_type, record))
+            current_line = None
+            # A name repeated within the chunk: the last record wins
+            handler(list({row["name"]: row for row in rows}.values()))
+        except (CatalogImportError, ValidationError) as e:
+            where = f"Record {current_line}" if current_line else f"{record_type} chunk"
+            raise CatalogImportError(f"{where}: {e}") from None
+
+    def parse(self, record_type, record):
+        return {"name": _required(record, "name"), "record": record}
+
+    def _upsert(self, model, objects, existing, fields, slug_field=True):
+        """Create or update `objects` ((name, values) pairs) matched by name."""
+        now = timezone.now()
+        new = {}
+        changed = {}
+        for name, values in objects:
+            obj = existing.get(name)
+            if obj is None:
+                obj = model(name=name)
+                if slug_field:
+                    obj.slug = self.slugs[model].allocate(values.get("slug") or name)
+                existing[name] = obj
+                new[name] = obj
+            elif name not in new:
+                obj.update_at = now
+                changed[name] = obj
+
+            for field, value in values.items():
+                if field != "slug":
+                    setattr(obj, field, value)
+
+        model.objects.bulk_create(new.values(), batch_size=self.chunk_size)
+        model.objects.bulk_update(
+            changed.values(), fields + ["update_at"], batch_size=self.chunk_size
+        )
+        return [*new.values(), *changed.values()]
+
+    def import_category_chunk(self, rows):
+        objects = []
+        for row in rows:
+            record = row["record"]
+            objects.append((row["name"], {
+                "slug": record.get("slug"),
+                "description": record.get("description", ""),
+                "is_active": _bool(record, "is_active", True),
+                "sort_order": _int(record, "sort_order", 0),
+            }))
+
+        categories = self._upsert(
+            Category, objects, self.categories,
+            ["description", "is_active", "sort_order"],
+        )
+
+        # Parents may appear later in the stream: link them at the end
+        for row in rows:
+            self.parent_links[row["name"]] = row["record"].get("parent") or None
+        self.touched["category"].update(c.pk for c in categories)
+
+    def link_category_parents(self):
+        linked = []
+        for name, parent_name in self.parent_links.items():
+            category = self.categories[name]
+            parent = self.categories.get(parent_name) if parent_name else None
+            if parent_name and parent is None:
+                raise CatalogImportError(f"Unknown parent category {parent_name!r}")
+            if category.parent_id != (parent.pk if parent else None):
+                category.parent = parent
+                linked.append(category)
+
+        Category.objects.bulk_update(linked, ["parent"], batch_size=self.chunk_size)
+
+        try:
+            Category.rebuild_paths()
+        except ValidationError as e:
+            raise CatalogImportError(e.messages[0]) from None
+
+    def import_allergen_chunk(self, rows):
+        new = []
+        changed = []
+        for row in rows:
+            record = row["record"]
+            allergen = self.allergens.get(row["name"])
+            if allergen is None:
+                if not self.free_bits:
+                    raise CatalogImportError(
+                        f"At most {Allergen.MAX_ALLERGENS} allergens are supported"
+                    )
+                allergen = Allergen(name=row["name"], bit=self.free_bits.pop(0))
+                self.allergens[row["name"]] = allergen
+                new.append(allergen)
+            elif allergen.pk is not None and allergen not in changed:
+                changed.append(allergen)
+            allergen.symbol = _required(record, "symbol")
+            allergen.description = record.get("description", "")
+
+        Allergen.objects.bulk_create(new, batch_size=self.chunk_size)
+        Allergen.objects.bulk_update(changed, ["symbol", "description"], batch_size=self.chunk_size)
+
+    def import_ingredient_chunk(self, rows):
+        objects = []
+        for row in rows:
+            record = row["record"]
+            objects.append((row["name"], {
+                "slug": record.get("slug"),
+                "cost_per_unit": _decimal(record, "cost_per_unit"),
+                "price_per_extra": _decimal(record, "price_per_extra", 0),
+                "stock_quantity": _int(record, "stock_quantity", 0),
+                "minimum_stock": _int(record, "minimum_stock", 50),
+                "is_active": _bool(record, "is_active", True),
+            }))
+
+        ingredients = self._upsert(
+            Ingredient, objects, self.ingredients,
+            ["cost_per_unit", "price_per_extra", "stock_quantity", "minimum_stock", "is_active"],
+        )
+
+        # Only records that list `allergens` replace the links: a missing
+        # key (or an empty CSV cell) keeps them, an explicit [] clears them
+        allergen_names = {
+            self.ingredients[row["name"]].pk: row["record"]["allergens"]
+            for row in rows
+            if "allergens" in row["record"]
+        }
+        through = Ingredient.allergens.through
+        links = []
+        for ingredient_id, names in allergen_names.items():
+            for name in names:
+                allergen = self.allergens.get(name)
+                if allergen is None:
+                    raise CatalogImportError(f"Unknown allergen {name!r}")
+                links.append(through(ingredient_id=ingredient_id, allergen_id=allergen.pk))
+
+        through.objects.filter(ingredient_id__in=list(allergen_names)).delete()
+        through.objects.bulk_create(links, batch_size=self.chunk_size)
+        self.touched["ingredient"].update(i.pk for i in ingredients)
+
+    def import_size_chunk(self, rows):
+        objects = []
+        for row in rows:
+            record = row["record"]
+            objects.append((row["name"], {
+                "diameter_cm": _int(record, "diameter_cm"),
+                "price_multiplier": _decimal(record, "price_multiplier", 1),
+                "is_active": _bool(record, "is_active", True),
+            }))
+
+        sizes = self._upsert(
+            PizzaSize, objects, self.sizes,
+            ["diameter_cm", "price_multiplier", "is_active"],
+            slug_field=False,
+        )
+        self.touched["size"].update(s.pk for s in sizes)
+
+    def import_pizza_chunk(self, rows):
+        objects = []
+        for row in rows:
+            record = row["record"]
+            category_name = _required(record, "category")
+            category = self.categories.get(category_name)
+            if category is None:
+                raise CatalogImportError(f"Unknown category {category_name!r}")
+            objects.append((row["name"], {
+                "slug": record.get("slug"),
+                "category": category,
+                "description": _required(record, "description"),
+                "short_description": record.get("short_description", ""),
+                "base_price": _decimal(record, "base_price"),
+                "is_active": _bool(record, "is_active", True),
+                "is_featured": _bool(record, "is_featured", False),
+            }))
+
+        pizzas = self._upsert(
+            Pizza, objects, self.pizzas,
+            ["category", "description", "short_description", "base_price",
+             "is_active", "is_featured"],
+        )
+
+        pizza_ids = [p.pk for p in pizzas]
+        recipe = []
+        for row in rows:
+            pizza = self.pizzas[row["name"]]
+            for item in row["record"].get("ingredients", []):
+                ingredient = self.ingredients.get(item["name"])
+                if ingredient is None:
+                    raise CatalogImportError(f"Unknown ingredient {item['name']!r}")
+                recipe.append(PizzaIngredient(
+                    pizza_id=pizza.pk,
+                    ingredient_id=ingredient.pk,
+                    quantity=_decimal(item, "quantity"),
+                    is_removable=_bool(item, "is_removable", True),
+                ))
+
+        PizzaIngredient.objects.filter(pizza_id__in=pizza_ids).delete()
+        PizzaIngredient.objects.bulk_create(recipe, batch_size=self.chunk_size)
+        self.touched["pizza"].update(pizza_ids)
+
+    def refresh_derived_data(self):
+        touched = self.touched
+
+        if touched["category"]:
+            self.link_category_parents()
+
+        affected_pizzas = set(touched["pizza"])
+        affected_pizzas.update(
+            Pizza.objects
+            .filter(category_id__in=touched["category"])
+            .values_list("pk", flat=True)
+        )
+        affected_pizzas.update(
+            PizzaIngredient.objects
+            .filter(ingredient_id__in=touched["ingredient"])
+            .values_list("pizza_id", flat=True)
+        )
+
+        refresh_ingredient_masks(touched["ingredient"])
+        refresh_pizza_masks(touched["pizza"])
+        refresh_ingredient_availability(touched["ingredient"])
+        refresh_pizza_availability(touched["pizza"])
+
+        if touched["size"]:
+            rebuild_price_matrix(size_ids=touched["size"])
+        if touched["pizza"]:
+            rebuild_price_matrix(pizza_ids=touched["pizza"])
+
+        affected_pizzas = sorted(affected_pizzas)
+        for start in range(0, len(affected_pizzas), self.chunk_size):
+            index_pizzas(affected_pizzas[start:start + self.chunk_size])
+
+        menu_cache.invalidate_catalog()
+
+
+# -------------------------------------------------------------------
+# Export
+# -------------------------------------------------------------------
+
+def export_records(chunk_size=500):
+    for category in (
+        Category.objects.select_related("parent").order_by("path").iterator(chunk_size)
+    ):
+        yield {
+            "type": "category",
+            "name": category.name,
+            "slug": category.slug,
+            "parent": category.parent.name if category.parent else "",
+            "description": category.description,
+            "is_active": category.is_active,
+            "sort_order": category.sort_order,
+        }
+
+    for allergen in Allergen.objects.order_by("name").iterator(chunk_size):
+        yield {
+            "type": "allergen",
+            "name": allergen.name,
+            "symbol": allergen.symbol,
+            "description": allergen.description,
+        }
+
+    for ingredient in (
+        Ingredient.objects.prefetch_related("allergens").order_by("name").iterator(chunk_size)
+    ):
+        yield {
+            "type": "ingredient",
+            "name": ingredient.name,
+            "slug": ingredient.slug,
+            "cost_per_unit": str(ingredient.cost_per_unit),
+            "price_per_extra": str(ingredient.price_per_extra),
+            "stock_quantity": ingredient.stock_quantity,
+            "minimum_stock": ingredient.minimum_stock,
+            "is_active": ingredient.is_active,
+            "allergens": [a.name for a in ingredient.allergens.all()],
+        }
+
+    for size in PizzaSize.objects.order_by("diameter_cm").iterator(chunk_size):
+        yield {
+            "type": "size",
+            "name": size.name,
+            "diameter_cm": size.diameter_cm,
+            "price_multiplier": str(size.price_multiplier),
+            "is_active": size.is_active,
+        }
+
+    for pizza in (
+        Pizza.objects
+        .select_related("category")
+        .prefetch_related("pizzaingredient_set__ingredient")
+        .order_by("name")
+        .iterator(chunk_size)
+    ):
+        yield {
+            "type": "pizza",
+            "name": pizza.name,
+            "slug": pizza.slug,
+            "category": pizza.category.name,
+            "description": pizza.description,
+            "short_description": pizza.short_description,
+            "base_price": str(pizza.base_price),
+            "is_active": pizza.is_active,
+            "is_featured": pizza.is_featured,
+            "ingredients": [
+                {
+                    "name": item.ingredient.name,
+                    "quantity": str(item.quantity),
+                    "is_removable": item.is_removable,
+                }
+                for item in pizza.pizzaingredient_set.all()
+            ],
+        }
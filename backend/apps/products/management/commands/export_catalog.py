@@ -0,0 +1,41 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from apps.products.catalog_io import RecordWriter, export_records
+
+
+class Command(BaseCommand):
+    help = "Export the catalog as CSV or JSON Lines ('-' writes to stdout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+
+        started = time.perf_counter()
+        rows = 0
+
+        stream = sys.stdout if path == "-" else Path(path).open(
+            "w", newline="", encoding="utf-8"
+        )
+        try:
+            writer = RecordWriter(stream, fmt)
+            for record in export_records(chunk_size=options["chunk_size"]):
+                writer.write(record)
+                rows += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f"Exported {rows} rows in {elapsed:.2f}s "
+            f"({rows / elapsed if elapsed else 0:.0f} rows/sec)."
+        )
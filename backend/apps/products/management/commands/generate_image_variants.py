@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.images import build_variants, needs_variants
+from apps.products import cache as menu_cache
+
+
+# (model label, image field, variants field)
+IMAGE_FIELDS = [
+    ("products.Pizza", "image", "image_variants"),
+    ("products.Category", "image", "image_variants"),
+    ("accounts.Profile", "avatar", "avatar_variants"),
+]
+
+
+def _init_worker():
+    if not apps.ready:
+        django.setup()
+
+
+class Command(BaseCommand):
+    help = "Backfill responsive image variants for existing uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants even when they are up to date.",
+        )
+
+    def handle(self, *args, **options):
+        jobs = []
+        for label, image_field, variants_field in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            rows = (
+                model.objects
+                .exclude(**{image_field: ""})
+                .exclude(**{f"{image_field}__isnull": True})
+                .only("pk", image_field, variants_field)
+            )
+            for instance in rows.iterator():
+                field_file = getattr(instance, image_field)
+                if options["force"] or needs_variants(
+                    field_file, getattr(instance, variants_field)
+                ):
+                    jobs.append((model, instance.pk, variants_field, field_file.name))
+
+        if not jobs:
+            self.stdout.write("All image variants are up to date.")
+            return
+
+        started = time.perf_counter()
+        done = failed = 0
+
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=_init_worker
+        ) as pool:
+            futures = {
+                pool.submit(build_variants, name): (model, pk, variants_field)
+                for model, pk, variants_field, name in jobs
+            }
+            for future in as_completed(futures):
+                model, pk, variants_field = futures[future]
+                try:
+                    variants = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {pk}: {e}")
+                    continue
+
+                model.objects.filter(pk=pk).update(
+                    **{variants_field: variants, "update_at": timezone.now()}
+                )
+                done += 1
+
+        menu_cache.invalidate_catalog()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {done} images in {elapsed:.1f}s ({failed} failed)."
+        ))
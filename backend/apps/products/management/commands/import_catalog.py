@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.catalog_io import CatalogImporter, CatalogImportError, read_records
+
+
+class Command(BaseCommand):
+    help = "Import a catalog from a CSV or JSON Lines file (upsert by name)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or ("csv" if path.suffix == ".csv" else "jsonl")
+
+        try:
+            with path.open(newline="", encoding="utf-8") as stream:
+                importer = CatalogImporter(chunk_size=options["chunk_size"])
+                stats = importer.run(read_records(stream, fmt))
+        except OSError as e:
+            raise CommandError(str(e))
+        except CatalogImportError as e:
+            raise CommandError(f"Import aborted, nothing was written. {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} rows in {stats['seconds']:.2f}s "
+            f"({stats['rows_per_second']:.0f} rows/sec)."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.pricing import rebuild_price_matrix
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized pizza x size price matrix."
+
+    def handle(self, *args, **options):
+        rows = rebuild_price_matrix()
+        self.stdout.write(self.style.SUCCESS(f"Price matrix rebuilt: {rows} rows."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for the pizza catalog."
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt: {count} pizzas."))
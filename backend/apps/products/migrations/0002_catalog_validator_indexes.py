@@ -0,0 +1,21 @@
+# Generated by Django 5.2.11 on 2026-10-17 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['is_active', 'update_at'], name='category_active_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pizza',
+            index=models.Index(fields=['is_active', 'update_at'], name='pizza_active_updated_idx'),
+        ),
+    ]
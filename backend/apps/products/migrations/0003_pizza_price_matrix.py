@@ -0,0 +1,54 @@
+# Generated by Django 5.2.11 on 2026-10-17 22:48
+
+import django.db.models.deletion
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import migrations, models
+
+
+def populate_price_matrix(apps, schema_editor):
+    Pizza = apps.get_model("products", "Pizza")
+    PizzaSize = apps.get_model("products", "PizzaSize")
+    PizzaPrice = apps.get_model("products", "PizzaPrice")
+
+    sizes = list(PizzaSize.objects.filter(is_active=True))
+    PizzaPrice.objects.bulk_create(
+        [
+            PizzaPrice(
+                pizza=pizza,
+                size=size,
+                price=(pizza.base_price * size.price_multiplier).quantize(
+                    Decimal("0.01"), rounding=ROUND_HALF_UP
+                ),
+            )
+            for pizza in Pizza.objects.filter(is_active=True)
+            for size in sizes
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_catalog_validator_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PizzaPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e ora di creazione del record.')),
+                ('update_at', models.DateTimeField(auto_now=True, help_text="Data e l'ora di l'ultima modifica.")),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('pizza', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='products.pizza')),
+                ('size', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='products.pizzasize')),
+            ],
+            options={
+                'db_table': 'products_pizza_price',
+                'ordering': ['pizza', 'size__diameter_cm'],
+                'constraints': [models.UniqueConstraint(fields=('pizza', 'size'), name='unique_pizza_size_price')],
+            },
+        ),
+        migrations.RunPython(populate_price_matrix, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE products_pizza_search USING fts5(
+        name, short_description, description, category, ingredients,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO products_pizza_search
+        (rowid, name, short_description, description, category, ingredients)
+    SELECT
+        p.id, p.name, p.short_description, p.description, c.name,
+        COALESCE((
+            SELECT group_concat(i.name, ' ')
+            FROM products_pizza_ingredient pi
+            JOIN products_ingredient i ON i.id = pi.ingredient_id
+            WHERE pi.pizza_id = p.id
+        ), '')
+    FROM products_pizza p
+    JOIN products_category c ON c.id = p.category_id
+    """,
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE products_pizza_search (
+        pizza_id bigint PRIMARY KEY
+            REFERENCES products_pizza (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX products_pizza_search_document_gin
+        ON products_pizza_search USING GIN (document)
+    """,
+    """
+    INSERT INTO products_pizza_search (pizza_id, document)
+    SELECT
+        p.id,
+        setweight(to_tsvector('simple', p.name), 'A')
+        || setweight(to_tsvector('simple', p.short_description), 'C')
+        || setweight(to_tsvector('simple', p.description), 'D')
+        || setweight(to_tsvector('simple', c.name), 'B')
+        || setweight(to_tsvector('simple', COALESCE((
+            SELECT string_agg(i.name, ' ')
+            FROM products_pizza_ingredient pi
+            JOIN products_ingredient i ON i.id = pi.ingredient_id
+            WHERE pi.pizza_id = p.id
+        ), '')), 'B')
+    FROM products_pizza p
+    JOIN products_category c ON c.id = p.category_id
+    """,
+]
+
+FORWARD = {
+    "sqlite": SQLITE_FORWARD,
+    "postgresql": POSTGRES_FORWARD,
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in FORWARD.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in FORWARD:
+        schema_editor.execute("DROP TABLE products_pizza_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_pizza_price_matrix'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,59 @@
+from functools import reduce
+from operator import or_
+
+from django.db import migrations, models
+
+
+def populate_allergen_masks(apps, schema_editor):
+    Allergen = apps.get_model("products", "Allergen")
+    Ingredient = apps.get_model("products", "Ingredient")
+    Pizza = apps.get_model("products", "Pizza")
+
+    for bit, allergen in enumerate(Allergen.objects.order_by("pk")):
+        allergen.bit = bit
+        allergen.save(update_fields=["bit"])
+
+    ingredient_masks = {}
+    for ingredient in Ingredient.objects.prefetch_related("allergens"):
+        ingredient.allergen_mask = reduce(
+            or_, (1 << a.bit for a in ingredient.allergens.all()), 0
+        )
+        ingredient.save(update_fields=["allergen_mask"])
+        ingredient_masks[ingredient.pk] = ingredient.allergen_mask
+
+    for pizza in Pizza.objects.prefetch_related("ingredients"):
+        pizza.allergen_mask = reduce(
+            or_, (ingredient_masks[i.pk] for i in pizza.ingredients.all()), 0
+        )
+        pizza.save(update_fields=["allergen_mask"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_pizza_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='allergen',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='allergen_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pizza',
+            name='allergen_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_allergen_masks, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='allergen',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.11 on 2026-10-17 22:52
+
+from django.db import migrations, models
+
+
+def populate_category_paths(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+
+    categories = {c.pk: c for c in Category.objects.all()}
+
+    def build_path(category, seen=()):
+        if category.pk in seen:
+            raise ValueError(f"Category cycle detected at id {category.pk}")
+        parent = categories.get(category.parent_id)
+        prefix = build_path(parent, seen + (category.pk,)) if parent else ""
+        return f"{prefix}{category.pk:08d}/"
+
+    for category in categories.values():
+        category.path = build_path(category)
+        category.depth = category.path.count("/") - 1
+
+    Category.objects.bulk_update(categories.values(), ["path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_allergen_bitmask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-17 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pizza',
+            index=models.Index(fields=['is_active', '-is_featured', 'name', 'id'], name='pizza_catalog_order_idx'),
+        ),
+    ]
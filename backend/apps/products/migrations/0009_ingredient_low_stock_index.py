@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-17 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(('stock_quantity__lte', models.F('minimum_stock'))), fields=['name'], name='ingredient_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-17 23:02
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+
+
+def populate_pizza_availability(apps, schema_editor):
+    Pizza = apps.get_model("products", "Pizza")
+    PizzaIngredient = apps.get_model("products", "PizzaIngredient")
+
+    missing = PizzaIngredient.objects.filter(pizza=OuterRef("pk")).filter(
+        Q(ingredient__stock_quantity=0) | Q(ingredient__is_active=False)
+    )
+    Pizza.objects.filter(Exists(missing)).update(is_available=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_ingredient_low_stock_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pizza',
+            name='pizza_catalog_order_idx',
+        ),
+        migrations.AddField(
+            model_name='pizza',
+            name='is_available',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(populate_pizza_availability, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pizza',
+            index=models.Index(fields=['is_active', 'is_available', '-is_featured', 'name', 'id'], name='pizza_menu_order_idx'),
+        ),
+    ]
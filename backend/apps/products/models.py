@@ -1,12 +1,20 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import models
-from django.utils.text import slugify
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.core.exceptions import ValidationError
 
 from apps.core.models import TimeStampedModel
+from apps.core.slugs import unique_slug
 
 
 # CATEGORY
 class Category(TimeStampedModel):
+    # Materialized path: one fixed-width segment per ancestor, root first
+    PATH_SEGMENT_WIDTH = 8
+    PATH_SEPARATOR = "/"
+
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(unique=True, blank=True)
 
@@ -20,46 +28,156 @@ class Category(TimeStampedModel):
 
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to="categories/", blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     is_active = models.BooleanField(default=True)
     sort_order = models.PositiveIntegerField(default=0)
 
+    path = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
     class Meta:
         db_table = "products_category"
         ordering = ["sort_order", "name"]
+        indexes = [
+            models.Index(
+                fields=["is_active", "update_at"],
+                name="category_active_updated_idx",
+            ),
+        ]
 
     def clean(self):
-        if self.parent and self.parent == self:
+        self.validate_parent()
+
+    def validate_parent(self):
+        if not self.parent_id:
+            return
+
+        if self.parent_id == self.pk:
             raise ValidationError("A category cannot be its own parent.")
 
+        if self.pk and self.path:
+            parent_path = self._get_parent_path()
+            if parent_path.startswith(self.path):
+                raise ValidationError(
+                    "A category cannot be moved under one of its descendants."
+                )
+
+    def _get_parent_path(self):
+        if not self.parent_id:
+            return ""
+        return (
+            Category.objects
+            .filter(pk=self.parent_id)
+            .values_list("path", flat=True)
+            .get()
+        )
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            while Category.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            self.slug = unique_slug(self, self.name)
+
+        self.validate_parent()
         super().save(*args, **kwargs)
+        self._update_path()
+
+    def _update_path(self):
+        segment = f"{self.pk:0{self.PATH_SEGMENT_WIDTH}d}{self.PATH_SEPARATOR}"
+        new_path = self._get_parent_path() + segment
+        if new_path == self.path:
+            return
+
+        old_path, old_depth = self.path, self.depth
+        new_depth = new_path.count(self.PATH_SEPARATOR) - 1
+
+        Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+
+        if old_path:
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1)),
+                depth=F("depth") + (new_depth - old_depth),
+            )
+
+        self.path, self.depth = new_path, new_depth
+
+    def get_descendants(self, include_self=False):
+        descendants = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            descendants = descendants.exclude(pk=self.pk)
+        return descendants
+
+    @classmethod
+    def rebuild_paths(cls):
+        """Recompute every path and depth from the parent links (bulk imports)."""
+        categories = {c.pk: c for c in cls.objects.only("pk", "parent_id", "path", "depth")}
+        paths = {}
+
+        def build(category, seen=()):
+            if category.pk in paths:
+                return paths[category.pk]
+            if category.pk in seen:
+                raise ValidationError(f"Category cycle detected at id {category.pk}.")
+            parent = categories.get(category.parent_id)
+            prefix = build(parent, seen + (category.pk,)) if parent else ""
+            paths[category.pk] = (
+                f"{prefix}{category.pk:0{cls.PATH_SEGMENT_WIDTH}d}{cls.PATH_SEPARATOR}"
+            )
+            return paths[category.pk]
+
+        changed = []
+        for category in categories.values():
+            path = build(category)
+            if path != category.path:
+                category.path = path
+                category.depth = path.count(cls.PATH_SEPARATOR) - 1
+                changed.append(category)
+
+        cls.objects.bulk_update(changed, ["path", "depth"], batch_size=500)
+        return len(changed)
 
     def __str__(self):
         return self.name
 
 # ALLERGEN
 class Allergen(TimeStampedModel):
+    # Bits available in a signed 64-bit allergen mask
+    MAX_ALLERGENS = 63
+
     name = models.CharField(max_length=50, unique=True)
     symbol = models.CharField(max_length=10)
     description = models.TextField(blank=True)
 
+    bit = models.PositiveSmallIntegerField(unique=True, editable=False)
+
     class Meta:
         db_table = "products_allergen"
         ordering = ["name"]
 
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used = set(Allergen.objects.values_list("bit", flat=True))
+            free = [bit for bit in range(self.MAX_ALLERGENS) if bit not in used]
+            if not free:
+                raise ValidationError(
+                    f"At most {self.MAX_ALLERGENS} allergens are supported."
+                )
+            self.bit = free[0]
+        super().save(*args, **kwargs)
+
+    @property
+    def mask(self):
+        return 1 << self.bit
+
     def __str__(self):
         return self.name
 
 # INGREDIENT
+class IngredientQuerySet(models.QuerySet):
+
+    def low_stock(self):
+        return self.filter(stock_quantity__lte=F("minimum_stock"))
+
+
 class Ingredient(TimeStampedModel):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(unique=True, blank=True)
@@ -71,28 +189,45 @@ class Ingredient(TimeStampedModel):
     minimum_stock = models.PositiveIntegerField(default=50)
 
     allergens = models.ManyToManyField(Allergen, blank=True)
+    allergen_mask = models.BigIntegerField(default=0, editable=False)
 
     is_active = models.BooleanField(default=True)
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
         db_table = "products_ingredient"
         ordering = ["name"]
+        indexes = [
+            # Partial index: only the (few) rows below their minimum stock
+            models.Index(
+                fields=["name"],
+                condition=models.Q(stock_quantity__lte=F("minimum_stock")),
+                name="ingredient_low_stock_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            while Ingredient.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            self.slug = unique_slug(self, self.name)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded state so saves can tell when pizza availability flips
+        if "stock_quantity" in field_names and "is_active" in field_names:
+            instance._loaded_is_usable = instance.is_usable
+        return instance
+
     @property
     def is_low_stock(self):
         return self.stock_quantity <= self.minimum_stock
 
+    @property
+    def is_usable(self):
+        return self.is_active and self.stock_quantity > 0
+
     def __str__(self):
         return self.name
 
@@ -135,27 +270,40 @@ class Pizza(TimeStampedModel):
     )
 
     image = models.ImageField(upload_to="pizzas/", blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    # OR of the ingredient masks, maintained by apps.products.allergens
+    allergen_mask = models.BigIntegerField(default=0, editable=False)
 
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
 
+    # Denormalized: false while a recipe ingredient is inactive or out of stock
+    is_available = models.BooleanField(default=True, editable=False)
+
     class Meta:
         db_table = "products_pizza"
         ordering = ["-is_featured", "name"]
+        indexes = [
+            models.Index(
+                fields=["is_active", "update_at"],
+                name="pizza_active_updated_idx",
+            ),
+            # Seek index for the keyset-paginated menu ordering
+            models.Index(
+                fields=["is_active", "is_available", "-is_featured", "name", "id"],
+                name="pizza_menu_order_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            while Pizza.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            self.slug = unique_slug(self, self.name)
         super().save(*args, **kwargs)
 
     def get_price_for_size(self, size):
-        return self.base_price * size.price_multiplier
+        price = self.base_price * size.price_multiplier
+        return price.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
     def __str__(self):
         return self.name
@@ -179,3 +327,31 @@ class PizzaIngredient(TimeStampedModel):
 
     def __str__(self):
         return f"{self.pizza} - {self.ingredient}"
+
+# PIZZA PRICE (DENORMALIZED PRICE MATRIX)
+class PizzaPrice(TimeStampedModel):
+    pizza = models.ForeignKey(
+        Pizza,
+        on_delete=models.CASCADE,
+        related_name="prices",
+    )
+    size = models.ForeignKey(
+        PizzaSize,
+        on_delete=models.CASCADE,
+        related_name="prices",
+    )
+
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    class Meta:
+        db_table = "products_pizza_price"
+        ordering = ["pizza", "size__diameter_cm"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pizza", "size"],
+                name="unique_pizza_size_price",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.pizza} - {self.size}: {self.price}"
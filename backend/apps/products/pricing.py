@@ -0,0 +1,146 @@
+"""
+Denormalized pizza x size price matrix.
+
+`PizzaPrice` holds the final price of every active pizza/size pair and is
+rebuilt incrementally for the rows touched by a `base_price` or
+`price_multiplier` change. `get_price_matrix()` keeps an in-process copy,
+reloaded only when the catalog version moves, so pricing a cart line is
+a single dictionary lookup.
+"""
+
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.products import cache as menu_cache
+from apps.products.models import Ingredient, Pizza, PizzaIngredient, PizzaSize, PizzaPrice
+
+
+def rebuild_price_matrix(pizza_ids=None, size_ids=None):
+    """
+    Recompute the matrix rows for the given pizzas and/or sizes.
+
+    With no arguments the whole matrix is rebuilt.
+    """
+    pizzas = Pizza.objects.filter(is_active=True).only("pk", "base_price")
+    sizes = PizzaSize.objects.filter(is_active=True).only("pk", "price_multiplier")
+    stale = PizzaPrice.objects.all()
+
+    if pizza_ids is not None:
+        pizzas = pizzas.filter(pk__in=pizza_ids)
+        stale = stale.filter(pizza_id__in=pizza_ids)
+
+    if size_ids is not None:
+        sizes = sizes.filter(pk__in=size_ids)
+        stale = stale.filter(size_id__in=size_ids)
+
+    sizes = list(sizes)
+    rows = [
+        PizzaPrice(pizza=pizza, size=size, price=pizza.get_price_for_size(size))
+        for pizza in pizzas
+        for size in sizes
+    ]
+
+    with transaction.atomic():
+        stale.filter(
+            Q(pizza__is_active=False) | Q(size__is_active=False)
+        ).delete()
+
+        PizzaPrice.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["pizza", "size"],
+            update_fields=["price", "update_at"],
+        )
+
+    return len(rows)
+
+
+class PriceMatrix:
+    """
+    Read-only mapping of (pizza_id, size_id) to the final unit price, plus
+    the extra price of every active ingredient and the ingredients each
+    pizza's recipe lets customers remove.
+    """
+
+    def __init__(self, prices, extras=None, removable=None):
+        self._prices = prices
+        self._extras = extras or {}
+        self._removable = removable or {}
+
+    def __len__(self):
+        return len(self._prices)
+
+    def __contains__(self, pair):
+        return pair in self._prices
+
+    def price_for(self, pizza_id, size_id):
+        try:
+            return self._prices[(pizza_id, size_id)]
+        except KeyError:
+            raise LookupError(
+                f"No active price for pizza {pizza_id} in size {size_id}"
+            ) from None
+
+    def extra_price(self, ingredient_id):
+        try:
+            return self._extras[ingredient_id]
+        except KeyError:
+            raise LookupError(f"Ingredient {ingredient_id} is not available") from None
+
+    def check_removable(self, pizza_id, ingredient_id):
+        if ingredient_id not in self._removable.get(pizza_id, ()):
+            raise LookupError(
+                f"Ingredient {ingredient_id} can't be removed from pizza {pizza_id}"
+            )
+
+    def total(self, lines):
+        """Price an iterable of (pizza_id, size_id, quantity) lines."""
+        prices = self._prices
+        return sum(
+            (prices[(pizza_id, size_id)] * quantity
+             for pizza_id, size_id, quantity in lines),
+            Decimal("0.00"),
+        )
+
+    @classmethod
+    def load(cls):
+        prices = {
+            (pizza_id, size_id): price
+            for pizza_id, size_id, price in PizzaPrice.objects.values_list(
+                "pizza_id", "size_id", "price"
+            )
+        }
+        extras = dict(
+            Ingredient.objects.filter(is_active=True).values_list("pk", "price_per_extra")
+        )
+        removable = defaultdict(set)
+        for pizza_id, ingredient_id in PizzaIngredient.objects.filter(
+            is_removable=True
+        ).values_list("pizza_id", "ingredient_id"):
+            removable[pizza_id].add(ingredient_id)
+        return cls(prices, extras, removable)
+
+
+_matrix = None
+_matrix_version = None
+_matrix_lock = threading.Lock()
+
+
+def get_price_matrix():
+    global _matrix, _matrix_version
+
+    version = menu_cache.get_catalog_version()
+    if _matrix is not None and _matrix_version == version:
+        return _matrix
+
+    with _matrix_lock:
+        if _matrix is None or _matrix_version != version:
+            _matrix = PriceMatrix.load()
+            _matrix_version = version
+
+    return _matrix
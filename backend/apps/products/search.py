@@ -0,0 +1,221 @@
+"""
+Indexed full-text search over the pizza catalog.
+
+The index lives in a side table, `products_pizza_search`, created by
+migration 0004 with vendor specific DDL:
+
+* SQLite: an FTS5 virtual table (rowid = pizza id), ranked with bm25
+* PostgreSQL: a weighted `tsvector` column with a GIN index, ranked
+  with ts_rank
+
+Each document covers the pizza name, short description, description,
+category name and ingredient names. Other database vendors fall back to
+unindexed `icontains` lookups through the ORM.
+
+Searches can be restricted to a queryset of candidate pizzas, which is
+applied inside the search query, before ranking is cut to the limit.
+
+The raw SQL in this module is limited to the search table, which the ORM
+cannot express.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from apps.products.models import Pizza, PizzaIngredient
+
+
+TABLE = "products_pizza_search"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(term):
+    return TOKEN_RE.findall(term.lower())
+
+
+def build_documents(pizza_ids):
+    """Return {pizza_id: (name, short, description, category, ingredients)}."""
+    pizzas = (
+        Pizza.objects
+        .filter(pk__in=pizza_ids)
+        .values_list("pk", "name", "short_description", "description", "category__name")
+    )
+
+    ingredients = {}
+    for pizza_id, name in (
+        PizzaIngredient.objects
+        .filter(pizza_id__in=pizza_ids)
+        .order_by("pk")
+        .values_list("pizza_id", "ingredient__name")
+    ):
+        ingredients.setdefault(pizza_id, []).append(name)
+
+    return {
+        pk: (name, short, description, category, " ".join(ingredients.get(pk, [])))
+        for pk, name, short, description, category in pizzas
+    }
+
+
+# -------------------------------------------------------------------
+# Backends
+# -------------------------------------------------------------------
+
+class SQLiteSearchBackend:
+    def index(self, documents):
+        with connection.cursor() as cursor:
+            self._delete(cursor, list(documents))
+            cursor.executemany(
+                f"INSERT INTO {TABLE} "
+                "(rowid, name, short_description, description, category, ingredients) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [(pk, *fields) for pk, fields in documents.items()],
+            )
+
+    def remove(self, pizza_ids):
+        with connection.cursor() as cursor:
+            self._delete(cursor, pizza_ids)
+
+    def _delete(self, cursor, pizza_ids):
+        if pizza_ids:
+            placeholders = ", ".join(["%s"] * len(pizza_ids))
+            cursor.execute(
+                f"DELETE FROM {TABLE} WHERE rowid IN ({placeholders})",
+                list(pizza_ids),
+            )
+
+    def search(self, tokens, limit, within=None):
+        match = " ".join(f'"{token}"*' for token in tokens)
+        candidates, params = candidates_sql("rowid", within)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s{candidates} "
+                f"ORDER BY bm25({TABLE}, 10.0, 3.0, 1.0, 4.0, 5.0) LIMIT %s",
+                [match, *params, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'C') || "
+        "setweight(to_tsvector('simple', %s), 'D') || "
+        "setweight(to_tsvector('simple', %s), 'B') || "
+        "setweight(to_tsvector('simple', %s), 'B')"
+    )
+
+    def index(self, documents):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (pizza_id, document) "
+                f"VALUES (%s, {self.DOCUMENT_SQL}) "
+                "ON CONFLICT (pizza_id) DO UPDATE SET document = EXCLUDED.document",
+                [(pk, *fields) for pk, fields in documents.items()],
+            )
+
+    def remove(self, pizza_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {TABLE} WHERE pizza_id = ANY(%s)",
+                [list(pizza_ids)],
+            )
+
+    def search(self, tokens, limit, within=None):
+        query = " & ".join(f"{token}:*" for token in tokens)
+        candidates, params = candidates_sql("pizza_id", within)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT pizza_id FROM {TABLE} "
+                f"WHERE document @@ to_tsquery('simple', %s){candidates} "
+                "ORDER BY ts_rank(document, to_tsquery('simple', %s)) DESC "
+                "LIMIT %s",
+                [query, *params, query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class FallbackSearchBackend:
+    def index(self, documents):
+        pass
+
+    def remove(self, pizza_ids):
+        pass
+
+    def search(self, tokens, limit, within=None):
+        condition = Q()
+        for token in tokens:
+            condition &= (
+                Q(name__icontains=token)
+                | Q(short_description__icontains=token)
+                | Q(description__icontains=token)
+                | Q(category__name__icontains=token)
+                | Q(ingredients__name__icontains=token)
+            )
+        if within is not None:
+            condition &= Q(pk__in=within.order_by().values("pk"))
+        return list(
+            Pizza.objects
+            .filter(condition)
+            .order_by("name")
+            .values_list("pk", flat=True)
+            .distinct()[:limit]
+        )
+
+
+def candidates_sql(column, within):
+    """An `AND column IN (...)` clause restricting a search to `within`."""
+    if within is None:
+        return "", ()
+    sql, params = within.order_by().values("pk").query.sql_with_params()
+    return f" AND {column} IN ({sql})", params
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_backend():
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)()
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+def index_pizzas(pizza_ids):
+    pizza_ids = list(pizza_ids)
+    if pizza_ids:
+        get_backend().index(build_documents(pizza_ids))
+
+
+def remove_pizzas(pizza_ids):
+    pizza_ids = list(pizza_ids)
+    if pizza_ids:
+        get_backend().remove(pizza_ids)
+
+
+def rebuild_search_index(batch_size=1000):
+    pizza_ids = list(Pizza.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(pizza_ids), batch_size):
+        index_pizzas(pizza_ids[start:start + batch_size])
+    return len(pizza_ids)
+
+
+def search_pizza_ids(term, limit=None, within=None):
+    """
+    Return pizza ids matching `term`, best match first. With `within`, a
+    Pizza queryset, only its pizzas are candidates for the limit.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return []
+
+    return get_backend().search(
+        tokens, limit or settings.PRODUCT_SEARCH_LIMIT, within
+    )
@@ -0,0 +1,212 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.images import schedule_variants
+from . import cache as menu_cache
+from .allergens import refresh_ingredient_masks, refresh_pizza_masks
+from .availability import refresh_ingredient_availability, refresh_pizza_availability
+from .models import (
+    Category,
+    Allergen,
+    Ingredient,
+    PizzaSize,
+    Pizza,
+    PizzaIngredient,
+)
+from .pricing import rebuild_price_matrix
+from .search import index_pizzas, remove_pizzas
+
+
+CATALOG_MODELS = (Category, Ingredient, PizzaSize, Pizza, PizzaIngredient)
+
+PRICE_FIELDS = {
+    Pizza: {"base_price", "is_active"},
+    PizzaSize: {"price_multiplier", "is_active"},
+}
+
+SEARCH_FIELDS = {
+    Pizza: {"name", "short_description", "description", "category"},
+    Category: {"name"},
+    Ingredient: {"name"},
+}
+
+AVAILABILITY_FIELDS = {"stock_quantity", "is_active"}
+
+
+# -------------------------------------------------------------------
+# Menu cache invalidation
+# -------------------------------------------------------------------
+
+def invalidate_menu_cache(sender, **kwargs):
+    menu_cache.invalidate_catalog()
+
+
+def invalidate_menu_cache_m2m(sender, action, **kwargs):
+    if action.startswith("post_"):
+        menu_cache.invalidate_catalog()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(
+        invalidate_menu_cache,
+        sender=model,
+        dispatch_uid=f"menu_cache_save_{model.__name__}",
+    )
+    post_delete.connect(
+        invalidate_menu_cache,
+        sender=model,
+        dispatch_uid=f"menu_cache_delete_{model.__name__}",
+    )
+
+for through in (Pizza.ingredients.through, Ingredient.allergens.through):
+    m2m_changed.connect(
+        invalidate_menu_cache_m2m,
+        sender=through,
+        dispatch_uid=f"menu_cache_m2m_{through.__name__}",
+    )
+
+
+# -------------------------------------------------------------------
+# Price matrix
+# -------------------------------------------------------------------
+
+def _touches(fields, update_fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(post_save, sender=Pizza)
+def refresh_pizza_prices(sender, instance, update_fields=None, **kwargs):
+    if _touches(PRICE_FIELDS[sender], update_fields):
+        rebuild_price_matrix(pizza_ids=[instance.pk])
+
+
+@receiver(post_save, sender=PizzaSize)
+def refresh_size_prices(sender, instance, update_fields=None, **kwargs):
+    if _touches(PRICE_FIELDS[sender], update_fields):
+        rebuild_price_matrix(size_ids=[instance.pk])
+
+        # Size prices are part of every pizza representation:
+        # move the pizza validators so clients revalidate.
+        Pizza.objects.filter(is_active=True).update(update_at=timezone.now())
+
+
+# -------------------------------------------------------------------
+# Search index
+# -------------------------------------------------------------------
+
+@receiver(post_save, sender=Pizza)
+def index_saved_pizza(sender, instance, update_fields=None, **kwargs):
+    if _touches(SEARCH_FIELDS[Pizza], update_fields):
+        index_pizzas([instance.pk])
+
+
+@receiver(post_delete, sender=Pizza)
+def unindex_deleted_pizza(sender, instance, **kwargs):
+    remove_pizzas([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_pizzas(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _touches(SEARCH_FIELDS[Category], update_fields):
+        index_pizzas(instance.pizzas.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_pizzas(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _touches(SEARCH_FIELDS[Ingredient], update_fields):
+        index_pizzas(instance.pizza_set.values_list("pk", flat=True))
+
+
+# -------------------------------------------------------------------
+# Recipe changes (search index, allergen masks and availability)
+# -------------------------------------------------------------------
+
+def recipe_changed(pizza_ids):
+    pizza_ids = list(pizza_ids)
+    index_pizzas(pizza_ids)
+    refresh_pizza_masks(pizza_ids)
+    refresh_pizza_availability(pizza_ids)
+
+
+@receiver(post_save, sender=PizzaIngredient)
+@receiver(post_delete, sender=PizzaIngredient)
+def refresh_recipe_pizza(sender, instance, **kwargs):
+    recipe_changed([instance.pizza_id])
+
+
+@receiver(m2m_changed, sender=Pizza.ingredients.through)
+def refresh_pizza_ingredients(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            recipe_changed([instance.pk])
+        return
+
+    # Reverse side: `instance` is an ingredient and pk_set holds pizzas
+    if action == "pre_clear":
+        instance._cleared_pizza_ids = list(
+            instance.pizza_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        recipe_changed(getattr(instance, "_cleared_pizza_ids", []))
+    elif action in ("post_add", "post_remove") and pk_set:
+        recipe_changed(pk_set)
+
+
+# -------------------------------------------------------------------
+# Pizza availability
+# -------------------------------------------------------------------
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_pizzas_availability(sender, instance, created, update_fields=None, **kwargs):
+    if created or not _touches(AVAILABILITY_FIELDS, update_fields):
+        return
+
+    # Only a flip of "usable" (active and in stock) can change availability
+    if getattr(instance, "_loaded_is_usable", None) != instance.is_usable:
+        refresh_ingredient_availability([instance.pk])
+    instance._loaded_is_usable = instance.is_usable
+
+
+# -------------------------------------------------------------------
+# Ingredient allergens
+# -------------------------------------------------------------------
+
+@receiver(m2m_changed, sender=Ingredient.allergens.through)
+def refresh_allergen_masks(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_ingredient_masks([instance.pk])
+        return
+
+    # Reverse side: `instance` is an allergen and pk_set holds ingredients
+    if action == "pre_clear":
+        instance._cleared_ingredient_ids = list(
+            instance.ingredient_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        refresh_ingredient_masks(getattr(instance, "_cleared_ingredient_ids", []))
+    elif action in ("post_add", "post_remove") and pk_set:
+        refresh_ingredient_masks(pk_set)
+
+
+@receiver(pre_delete, sender=Allergen)
+def remember_allergen_ingredients(sender, instance, **kwargs):
+    instance._deleted_ingredient_ids = list(
+        instance.ingredient_set.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Allergen)
+def refresh_deleted_allergen_masks(sender, instance, **kwargs):
+    refresh_ingredient_masks(getattr(instance, "_deleted_ingredient_ids", []))
+
+
+# -------------------------------------------------------------------
+# Image variants
+# -------------------------------------------------------------------
+
+@receiver(post_save, sender=Pizza)
+@receiver(post_save, sender=Category)
+def generate_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance, "image", "image_variants")
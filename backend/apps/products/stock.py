@@ -0,0 +1,127 @@
+"""
+Ingredient stock reservation.
+
+Confirming an order consumes the ingredients of every line: the base
+recipe (`PizzaIngredient.quantity` scaled by the size multiplier), plus
+one portion per extra, minus removed ingredients. Stock is decremented
+with conditional `UPDATE ... WHERE stock_quantity >= n` statements, so
+two concurrent confirmations can never both take the last units: the
+loser's UPDATE matches no row and the whole reservation rolls back.
+Ingredients that run out (or come back) refresh pizza availability.
+"""
+
+from collections import defaultdict
+from decimal import ROUND_CEILING, Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.products.availability import refresh_ingredient_availability
+from apps.products.models import Ingredient, PizzaIngredient
+
+
+# Units consumed by one extra portion of an ingredient, before size scaling
+EXTRA_PORTION = Decimal("1")
+
+
+class InsufficientStock(ValueError):
+    def __init__(self, ingredient_id, required):
+        self.ingredient_id = ingredient_id
+        self.required = required
+        super().__init__(
+            f"Insufficient stock for ingredient {ingredient_id} "
+            f"({required} units required)"
+        )
+
+
+def _snapshot_ids(snapshot):
+    """Ingredient ids from an order item snapshot (`[{"id": ..., ...}]`)."""
+    return {
+        entry["id"] if isinstance(entry, dict) else entry
+        for entry in snapshot or []
+    }
+
+
+def requirements_for_items(items):
+    """
+    Map ingredient id -> whole units needed by `items`.
+
+    `items` are order (or cart) lines exposing `pizza_id`, `size`,
+    `quantity` and the extra/removed ingredient snapshots. Recipes for all
+    lines are read with a single query.
+    """
+    items = list(items)
+    if not items:
+        return {}
+
+    recipes = defaultdict(list)
+    for pizza_id, ingredient_id, quantity in (
+        PizzaIngredient.objects
+        .filter(pizza_id__in={item.pizza_id for item in items})
+        .values_list("pizza_id", "ingredient_id", "quantity")
+    ):
+        recipes[pizza_id].append((ingredient_id, quantity))
+
+    totals = defaultdict(Decimal)
+    for item in items:
+        scale = item.size.price_multiplier * item.quantity
+        removed = _snapshot_ids(item.removed_ingredients_snapshot)
+
+        for ingredient_id, quantity in recipes[item.pizza_id]:
+            if ingredient_id not in removed:
+                totals[ingredient_id] += quantity * scale
+
+        for ingredient_id in _snapshot_ids(item.extra_ingredients_snapshot):
+            totals[ingredient_id] += EXTRA_PORTION * scale
+
+    # Stock is counted in whole units: round partial portions up
+    return {
+        ingredient_id: int(amount.to_integral_value(rounding=ROUND_CEILING))
+        for ingredient_id, amount in totals.items()
+        if amount > 0
+    }
+
+
+def reserve(requirements):
+    """
+    Decrement stock for `requirements` or raise `InsufficientStock`.
+
+    Rows are updated in ingredient id order so concurrent reservations
+    lock them in the same sequence and cannot deadlock.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for ingredient_id in sorted(requirements):
+            required = requirements[ingredient_id]
+            updated = (
+                Ingredient.objects
+                .filter(pk=ingredient_id, stock_quantity__gte=required)
+                .update(stock_quantity=F("stock_quantity") - required, update_at=now)
+            )
+            if not updated:
+                raise InsufficientStock(ingredient_id, required)
+
+        refresh_ingredient_availability(
+            Ingredient.objects
+            .filter(pk__in=requirements, stock_quantity=0)
+            .values_list("pk", flat=True)
+        )
+
+
+def release(requirements):
+    """Give back stock taken by `reserve` (e.g. when an order is cancelled)."""
+    now = timezone.now()
+    with transaction.atomic():
+        restocked = list(
+            Ingredient.objects
+            .filter(pk__in=requirements, stock_quantity=0)
+            .values_list("pk", flat=True)
+        )
+        for ingredient_id in sorted(requirements):
+            Ingredient.objects.filter(pk=ingredient_id).update(
+                stock_quantity=F("stock_quantity") + requirements[ingredient_id],
+                update_at=now,
+            )
+
+        refresh_ingredient_availability(restocked)
@@ -0,0 +1,70 @@
+import factory
+from decimal import Decimal
+
+from apps.products.models import (
+    Category,
+    Allergen,
+    Ingredient,
+    PizzaSize,
+    Pizza,
+    PizzaIngredient,
+)
+
+
+class CategoryFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Category
+
+    name = factory.Sequence(lambda n: f"Category {n}")
+
+
+class AllergenFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Allergen
+
+    name = factory.Sequence(lambda n: f"allergen{n}")
+    symbol = factory.Sequence(lambda n: f"A{n}")
+
+
+class IngredientFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Ingredient
+
+    name = factory.Sequence(lambda n: f"Ingredient {n}")
+    cost_per_unit = Decimal("0.50")
+    price_per_extra = Decimal("1.00")
+    stock_quantity = 100
+
+
+class PizzaSizeFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = PizzaSize
+
+    name = factory.Sequence(lambda n: f"Size {n}")
+    diameter_cm = factory.Sequence(lambda n: 20 + n)
+    price_multiplier = Decimal("1.00")
+
+
+class PizzaFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Pizza
+
+    name = factory.Sequence(lambda n: f"Pizza {n}")
+    category = factory.SubFactory(CategoryFactory)
+    description = "Tomato, mozzarella and basil."
+    base_price = Decimal("8.00")
+
+
+class PizzaIngredientFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = PizzaIngredient
+
+    pizza = factory.SubFactory(PizzaFactory)
+    ingredient = factory.SubFactory(IngredientFactory)
+    quantity = Decimal("1.00")
@@ -0,0 +1,78 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.products.tests.factories import (
+    AllergenFactory,
+    IngredientFactory,
+    PizzaFactory,
+)
+
+
+@pytest.mark.django_db
+def test_masks_follow_allergen_and_recipe_changes():
+    gluten = AllergenFactory(name="Gluten")
+    lactose = AllergenFactory(name="Lactose")
+    mozzarella = IngredientFactory()
+    pizza = PizzaFactory()
+
+    pizza.ingredients.add(mozzarella, through_defaults={"quantity": Decimal("1")})
+    mozzarella.allergens.add(lactose)
+    pizza.refresh_from_db()
+
+    assert pizza.allergen_mask == lactose.mask
+
+    gluten.ingredient_set.add(mozzarella)
+    pizza.refresh_from_db()
+
+    assert pizza.allergen_mask == gluten.mask | lactose.mask
+
+    pizza.ingredients.remove(mozzarella)
+    pizza.refresh_from_db()
+
+    assert pizza.allergen_mask == 0
+
+
+@pytest.mark.django_db
+def test_exclude_allergens_filter_is_join_free():
+    gluten = AllergenFactory(name="Gluten")
+    lactose = AllergenFactory(name="Lactose")
+    cheese = IngredientFactory()
+    cheese.allergens.add(lactose)
+    flour = IngredientFactory()
+    flour.allergens.add(gluten)
+
+    margherita = PizzaFactory(name="Margherita")
+    margherita.ingredients.add(cheese, flour, through_defaults={"quantity": Decimal("1")})
+    marinara = PizzaFactory(name="Marinara")
+    marinara.ingredients.add(flour, through_defaults={"quantity": Decimal("1")})
+    PizzaFactory(name="Senza Glutine")
+
+    client = APIClient()
+
+    response = client.get("/api/v1/products/pizzas/", {"exclude_allergens": "lactose"})
+    assert {p["name"] for p in response.data["results"]} == {"Marinara", "Senza Glutine"}
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            "/api/v1/products/pizzas/", {"exclude_allergens": "gluten,LACTOSE"}
+        )
+
+    pizza_queries = [q["sql"] for q in queries if 'FROM "products_pizza"' in q["sql"]]
+    assert pizza_queries
+    assert not any("products_pizza_ingredient" in sql for sql in pizza_queries)
+    assert [p["name"] for p in response.data["results"]] == ["Senza Glutine"]
+
+
+@pytest.mark.django_db
+def test_exclude_allergens_rejects_unknown_names():
+    AllergenFactory(name="Gluten")
+    PizzaFactory(name="Margherita")
+
+    response = APIClient().get(
+        "/api/v1/products/pizzas/", {"exclude_allergens": "gluten,glutin,lattosio"}
+    )
+
+    assert response.status_code == 400
+    assert "glutin, lattosio" in response.data["exclude_allergens"][0]
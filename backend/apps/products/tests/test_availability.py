@@ -0,0 +1,76 @@
+import pytest
+from rest_framework.test import APIClient
+from apps.products.models import Ingredient, Pizza
+from apps.products.stock import release, reserve
+from apps.products.tests.factories import (
+    IngredientFactory,
+    PizzaFactory,
+    PizzaIngredientFactory,
+)
+
+
+@pytest.mark.django_db
+def test_out_of_stock_ingredient_hides_only_pizzas_using_it():
+    mozzarella = IngredientFactory(stock_quantity=5)
+    margherita = PizzaIngredientFactory(ingredient=mozzarella).pizza
+    marinara = PizzaIngredientFactory().pizza
+    marinara_updated = Pizza.objects.get(pk=marinara.pk).update_at
+
+    mozzarella.stock_quantity = 0
+    mozzarella.save()
+
+    assert not Pizza.objects.get(pk=margherita.pk).is_available
+    assert Pizza.objects.get(pk=marinara.pk).update_at == marinara_updated
+
+    names = [row["name"] for row in APIClient().get("/api/v1/products/pizzas/").data["results"]]
+    assert names == [marinara.name]
+
+
+@pytest.mark.django_db
+def test_restock_and_reactivation_restore_availability():
+    basil = IngredientFactory(stock_quantity=0)
+    pizza = PizzaIngredientFactory(ingredient=basil).pizza
+    assert not Pizza.objects.get(pk=pizza.pk).is_available
+
+    basil = Ingredient.objects.get(pk=basil.pk)
+    basil.stock_quantity = 10
+    basil.is_active = False
+    basil.save()
+    assert not Pizza.objects.get(pk=pizza.pk).is_available
+
+    basil.is_active = True
+    basil.save(update_fields=["is_active"])
+    assert Pizza.objects.get(pk=pizza.pk).is_available
+
+
+@pytest.mark.django_db
+def test_stock_change_without_crossing_zero_skips_recompute(django_assert_num_queries):
+    ingredient = IngredientFactory(stock_quantity=10)
+    PizzaIngredientFactory(ingredient=ingredient)
+    ingredient = Ingredient.objects.get(pk=ingredient.pk)
+
+    ingredient.stock_quantity = 4
+    with django_assert_num_queries(1):
+        ingredient.save(update_fields=["stock_quantity"])
+
+
+@pytest.mark.django_db
+def test_reservation_depleting_stock_flips_availability():
+    ingredient = IngredientFactory(stock_quantity=3)
+    pizza = PizzaIngredientFactory(ingredient=ingredient).pizza
+
+    reserve({ingredient.pk: 3})
+    assert not Pizza.objects.get(pk=pizza.pk).is_available
+
+    release({ingredient.pk: 1})
+    assert Pizza.objects.get(pk=pizza.pk).is_available
+
+
+@pytest.mark.django_db
+def test_adding_missing_ingredient_to_recipe_marks_pizza_unavailable():
+    pizza = PizzaFactory()
+    assert Pizza.objects.get(pk=pizza.pk).is_available
+
+    PizzaIngredientFactory(pizza=pizza, ingredient__stock_quantity=0)
+
+    assert not Pizza.objects.get(pk=pizza.pk).is_available
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from apps.products.models import Category, Ingredient, Pizza, PizzaPrice
+from apps.products.search import search_pizza_ids
+from apps.products.tests.factories import PizzaSizeFactory
+
+
+CATALOG = """\
+type,name,slug,parent,category,symbol,description,short_description,cost_per_unit,price_per_extra,stock_quantity,minimum_stock,diameter_cm,price_multiplier,base_price,sort_order,is_active,is_featured,allergens,ingredients
+category,Bianche,,Classiche,,,,,,,,,,,,,,,,
+category,Classiche,,,,,,,,,,,,,,,,,,
+allergen,Lattosio,,,,L,,,,,,,,,,,,,,
+ingredient,Mozzarella di bufala,,,,,,,1.20,2.00,500,50,,,,,,,Lattosio,
+pizza,Bufalina,,,Bianche,,Bufala e basilico.,,,,,,,,9.50,,1,1,,Mozzarella di bufala:1.50:0
+pizza,Bufalina,,,Bianche,,Bufala e pomodorini.,,,,,,,,10.00,,1,0,,Mozzarella di bufala:1.50:1
+"""
+
+
+@pytest.mark.django_db
+def test_import_resolves_references_and_refreshes_derived_data(tmp_path):
+    PizzaSizeFactory(price_multiplier=Decimal("1.00"))
+    Pizza.objects.create(
+        name="Other",
+        slug="bufalina",
+        category=Category.objects.create(name="Existing"),
+        description="-",
+        base_price=5,
+    )
+    path = tmp_path / "catalog.csv"
+    path.write_text(CATALOG)
+
+    call_command("import_catalog", str(path), chunk_size=2)
+
+    pizza = Pizza.objects.get(name="Bufalina")
+    assert pizza.slug == "bufalina-1"
+    assert pizza.base_price == Decimal("10.00")
+    assert pizza.category.parent.name == "Classiche"
+    assert pizza.category.path.startswith(pizza.category.parent.path)
+    assert pizza.pizzaingredient_set.get().is_removable is True
+    assert pizza.allergen_mask != 0
+    assert PizzaPrice.objects.get(pizza=pizza).price == Decimal("10.00")
+    assert search_pizza_ids("bufala") == [pizza.pk]
+
+
+@pytest.mark.django_db
+def test_export_import_round_trip(tmp_path):
+    call_command("import_catalog", str(_write(tmp_path, "a.csv", CATALOG)))
+    export = tmp_path / "catalog.jsonl"
+
+    call_command("export_catalog", str(export))
+    Pizza.objects.all().update(base_price=1)
+    call_command("import_catalog", str(export))
+
+    assert Pizza.objects.get(name="Bufalina").base_price == Decimal("10.00")
+
+
+@pytest.mark.django_db
+def test_ingredient_allergens_change_only_when_listed(tmp_path):
+    call_command("import_catalog", str(_write(tmp_path, "a.csv", CATALOG)))
+    record = {"type": "ingredient", "name": "Mozzarella di bufala", "cost_per_unit": "1.30"}
+
+    call_command("import_catalog", str(_write(tmp_path, "b.jsonl", json.dumps(record))))
+    ingredient = Ingredient.objects.get(name="Mozzarella di bufala")
+    assert ingredient.cost_per_unit == Decimal("1.30")
+    assert [a.name for a in ingredient.allergens.all()] == ["Lattosio"]
+
+    record["allergens"] = []
+    call_command("import_catalog", str(_write(tmp_path, "c.jsonl", json.dumps(record))))
+    assert not ingredient.allergens.exists()
+
+
+@pytest.mark.django_db
+def test_invalid_reference_rolls_back(tmp_path):
+    bad = CATALOG.replace("pizza,Bufalina,,,Bianche", "pizza,Bufalina,,,Rosse")
+
+    with pytest.raises(CommandError):
+        call_command("import_catalog", str(_write(tmp_path, "bad.csv", bad)))
+
+    assert not Category.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name, content, message", [
+    ("bad.jsonl", '{"type": "category", "name": "Rosse"}\n\n{"type": ', "Line 3: invalid JSON"),
+    ("bad.csv", CATALOG.replace(":1.50:0", ":1.50"), "Line 6: ingredients"),
+])
+def test_malformed_lines_are_reported_with_their_number(tmp_path, name, content, message):
+    with pytest.raises(CommandError, match=message):
+        call_command("import_catalog", str(_write(tmp_path, name, content)))
+
+    assert not Category.objects.exists()
+
+
+def _write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    return path
@@ -0,0 +1,61 @@
+import pytest
+from django.core.exceptions import ValidationError
+from rest_framework.test import APIClient
+from apps.products.models import Category
+from apps.products.tests.factories import CategoryFactory, PizzaFactory
+
+
+@pytest.mark.django_db
+def test_moving_a_category_rewrites_descendant_paths():
+    specials = CategoryFactory(name="Specials")
+    gourmet = CategoryFactory(name="Gourmet", parent=specials)
+    truffle = CategoryFactory(name="Truffle", parent=gourmet)
+    classics = CategoryFactory(name="Classics")
+
+    assert truffle.path.startswith(specials.path)
+    assert truffle.depth == 2
+
+    gourmet.parent = classics
+    gourmet.save()
+    truffle.refresh_from_db()
+
+    assert truffle.path == gourmet.path + f"{truffle.pk:08d}/"
+    assert set(classics.get_descendants()) == {gourmet, truffle}
+
+
+@pytest.mark.django_db
+def test_cycles_are_rejected():
+    root = CategoryFactory()
+    child = CategoryFactory(parent=root)
+    grandchild = CategoryFactory(parent=child)
+
+    root.parent = grandchild
+    with pytest.raises(ValidationError):
+        root.save()
+
+    root.parent = root
+    with pytest.raises(ValidationError):
+        root.full_clean()
+
+
+@pytest.mark.django_db
+def test_category_tree_filter_and_endpoint(django_assert_num_queries):
+    specials = CategoryFactory(name="Specials", sort_order=1)
+    gourmet = CategoryFactory(name="Gourmet", parent=specials)
+    classics = CategoryFactory(name="Classics", sort_order=0)
+    PizzaFactory(name="Tartufo", category=gourmet)
+    PizzaFactory(name="Special", category=specials)
+    PizzaFactory(name="Margherita", category=classics)
+
+    client = APIClient()
+
+    response = client.get("/api/v1/products/pizzas/", {"category_tree": "specials"})
+    assert {p["name"] for p in response.data["results"]} == {"Tartufo", "Special"}
+
+    # Validator aggregate + the tree itself
+    with django_assert_num_queries(2):
+        response = client.get("/api/v1/products/categories/tree/")
+
+    assert [node["name"] for node in response.data] == ["Classics", "Specials"]
+    assert response.data[1]["children"][0]["slug"] == "gourmet"
+    assert Category.objects.get(slug="gourmet").depth == 1
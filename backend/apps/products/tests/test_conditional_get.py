@@ -0,0 +1,41 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from apps.products.tests.factories import PizzaFactory
+
+
+@pytest.mark.django_db
+def test_matching_etag_returns_not_modified(django_assert_num_queries):
+    PizzaFactory.create_batch(2)
+    client = APIClient()
+
+    response = client.get("/api/v1/products/pizzas/")
+    etag = response["ETag"]
+
+    assert response.status_code == 200
+    assert "Last-Modified" in response
+
+    # Cold cache: one aggregate query, nothing serialized
+    cache.clear()
+    with django_assert_num_queries(1):
+        response = client.get("/api/v1/products/pizzas/", HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_etag_changes_when_pizza_is_updated():
+    pizza = PizzaFactory()
+    client = APIClient()
+
+    etag = client.get(f"/api/v1/products/pizzas/{pizza.pk}/")["ETag"]
+
+    pizza.base_price = 9
+    pizza.save()
+
+    response = client.get(
+        f"/api/v1/products/pizzas/{pizza.pk}/", HTTP_IF_NONE_MATCH=etag
+    )
+
+    assert response.status_code == 200
+    assert response["ETag"] != etag
@@ -0,0 +1,64 @@
+import pytest
+from io import BytesIO
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework.test import APIClient
+from apps.products.tests.factories import PizzaFactory
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_VARIANTS_ASYNC = False
+    settings.IMAGE_VARIANT_WIDTHS = (320, 640, 2048)
+    return tmp_path
+
+
+def _upload(name="margherita.png", size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@pytest.mark.django_db
+def test_upload_generates_hashed_variants(media_root, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        pizza = PizzaFactory(image=_upload())
+
+    pizza.refresh_from_db()
+    variants = pizza.image_variants
+
+    assert variants["source"] == pizza.image.name
+    assert set(variants["formats"]) == {"webp", "jpeg"}
+    # 2048 would upscale the 1200px original, so it is skipped
+    assert set(variants["formats"]["webp"]) == {"320", "640"}
+
+    name = variants["formats"]["webp"]["320"]
+    assert variants["hash"] in name
+    with default_storage.open(name) as stored:
+        assert Image.open(stored).size == (320, 213)
+
+
+@pytest.mark.django_db
+def test_serializer_exposes_srcset(media_root, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        pizza = PizzaFactory(image=_upload())
+
+    response = APIClient().get(f"/api/v1/products/pizzas/{pizza.pk}/")
+    srcset = response.data["image_variants"]["srcset"]["webp"]
+
+    assert srcset.endswith("640w")
+    assert ".320w.webp 320w, " in srcset
+
+
+@pytest.mark.django_db
+def test_backfill_command_processes_existing_images(media_root):
+    pizza = PizzaFactory(image=_upload())
+    assert pizza.image_variants == {}
+
+    call_command("generate_image_variants", workers=2)
+
+    pizza.refresh_from_db()
+    assert pizza.image_variants["source"] == pizza.image.name
@@ -0,0 +1,41 @@
+import pytest
+from rest_framework.test import APIClient
+from apps.products import cache as menu_cache
+from apps.products.tests.factories import PizzaFactory
+
+
+@pytest.mark.django_db
+def test_pizza_list_is_served_from_cache(django_assert_num_queries):
+    PizzaFactory.create_batch(3)
+    client = APIClient()
+
+    first = client.get("/api/v1/products/pizzas/")
+    assert first["X-Menu-Cache"] == "MISS"
+
+    with django_assert_num_queries(0):
+        second = client.get("/api/v1/products/pizzas/")
+
+    assert second["X-Menu-Cache"] == "HIT"
+    assert second.data == first.data
+
+    stats = menu_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+@pytest.mark.django_db
+def test_catalog_write_invalidates_cached_pages():
+    pizza = PizzaFactory(name="Margherita")
+    client = APIClient()
+
+    client.get("/api/v1/products/pizzas/")
+    version = menu_cache.get_catalog_version()
+
+    pizza.name = "Marinara"
+    pizza.save()
+
+    response = client.get("/api/v1/products/pizzas/")
+
+    assert menu_cache.get_catalog_version() > version
+    assert response["X-Menu-Cache"] == "MISS"
+    assert response.data["results"][0]["name"] == "Marinara"
@@ -0,0 +1,37 @@
+import pytest
+from rest_framework.test import APIClient
+from apps.products.tests.factories import PizzaFactory
+
+
+@pytest.mark.django_db
+def test_pizza_list_follows_catalog_ordering_across_pages():
+    PizzaFactory(name="Diavola")
+    PizzaFactory(name="Bianca", is_featured=True)
+    PizzaFactory(name="Capricciosa")
+    PizzaFactory(name="Marinara", is_featured=True)
+    PizzaFactory(name="Ortolana")
+    client = APIClient()
+
+    names = []
+    url = "/api/v1/products/pizzas/?page_size=2"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        names.extend(row["name"] for row in response.data["results"])
+        url = response.data["next"]
+
+    assert names == ["Bianca", "Marinara", "Capricciosa", "Diavola", "Ortolana"]
+
+
+@pytest.mark.django_db
+def test_pizza_list_cursor_respects_ordering_param():
+    for price in ("9.00", "6.50", "8.00", "7.00"):
+        PizzaFactory(base_price=price)
+    client = APIClient()
+
+    first = client.get("/api/v1/products/pizzas/?ordering=-base_price&page_size=2").data
+    second = client.get(first["next"]).data
+
+    prices = [row["base_price"] for row in first["results"] + second["results"]]
+    assert prices == ["9.00", "8.00", "7.00", "6.50"]
+    assert second["next"] is None
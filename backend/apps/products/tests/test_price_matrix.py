@@ -0,0 +1,57 @@
+import pytest
+from decimal import Decimal
+from rest_framework.test import APIClient
+from apps.products.models import PizzaPrice
+from apps.products.pricing import get_price_matrix
+from apps.products.tests.factories import PizzaFactory, PizzaSizeFactory
+
+
+@pytest.mark.django_db
+def test_matrix_follows_price_changes():
+    small = PizzaSizeFactory(price_multiplier=Decimal("1.00"))
+    large = PizzaSizeFactory(price_multiplier=Decimal("1.50"))
+    pizza = PizzaFactory(base_price=Decimal("8.00"))
+
+    assert PizzaPrice.objects.get(pizza=pizza, size=large).price == Decimal("12.00")
+
+    pizza.base_price = Decimal("10.00")
+    pizza.save()
+    large.price_multiplier = Decimal("1.25")
+    large.save()
+
+    assert PizzaPrice.objects.get(pizza=pizza, size=small).price == Decimal("10.00")
+    assert PizzaPrice.objects.get(pizza=pizza, size=large).price == Decimal("12.50")
+
+    large.is_active = False
+    large.save()
+
+    assert not PizzaPrice.objects.filter(size=large).exists()
+
+
+@pytest.mark.django_db
+def test_cart_pricing_is_a_lookup_per_line(django_assert_num_queries):
+    sizes = PizzaSizeFactory.create_batch(2, price_multiplier=Decimal("1.20"))
+    pizzas = PizzaFactory.create_batch(5, base_price=Decimal("7.50"))
+    lines = [(pizzas[i % 5].pk, sizes[i % 2].pk, 2) for i in range(50)]
+
+    matrix = get_price_matrix()
+
+    with django_assert_num_queries(0):
+        total = get_price_matrix().total(lines)
+
+    assert total == Decimal("9.00") * 2 * 50
+    assert matrix.price_for(pizzas[0].pk, sizes[0].pk) == Decimal("9.00")
+
+
+@pytest.mark.django_db
+def test_pizza_api_exposes_size_prices():
+    PizzaSizeFactory(name="Media", price_multiplier=Decimal("1.00"))
+    PizzaSizeFactory(name="Maxi", price_multiplier=Decimal("1.80"))
+    pizza = PizzaFactory(base_price=Decimal("6.00"))
+
+    response = APIClient().get(f"/api/v1/products/pizzas/{pizza.pk}/")
+
+    assert [(p["size_name"], p["price"]) for p in response.data["prices"]] == [
+        ("Media", "6.00"),
+        ("Maxi", "10.80"),
+    ]
@@ -0,0 +1,60 @@
+import pytest
+from decimal import Decimal
+from rest_framework.test import APIClient
+from apps.products.search import search_pizza_ids
+from apps.products.tests.factories import (
+    CategoryFactory,
+    IngredientFactory,
+    PizzaFactory,
+)
+
+
+@pytest.mark.django_db
+def test_search_covers_descriptions_categories_and_ingredients():
+    bufala = IngredientFactory(name="Mozzarella di bufala")
+    by_ingredient = PizzaFactory(name="Regina")
+    by_ingredient.ingredients.add(bufala, through_defaults={"quantity": Decimal("1")})
+    by_name = PizzaFactory(name="Margherita Bufala", description="Pomodoro e basilico.")
+    by_category = PizzaFactory(category=CategoryFactory(name="Bufala Specials"))
+    PizzaFactory(name="Diavola", description="Salame piccante.")
+
+    ids = search_pizza_ids("bufala")
+
+    assert set(ids) == {by_ingredient.pk, by_name.pk, by_category.pk}
+    assert ids[0] == by_name.pk
+
+
+@pytest.mark.django_db
+def test_index_follows_renames():
+    pizza = PizzaFactory(name="Capricciosa")
+    ingredient = IngredientFactory(name="Carciofi")
+    pizza.ingredients.add(ingredient, through_defaults={"quantity": Decimal("1")})
+
+    ingredient.name = "Funghi porcini"
+    ingredient.save()
+
+    assert search_pizza_ids("porcini") == [pizza.pk]
+    assert search_pizza_ids("carciofi") == []
+
+
+@pytest.mark.django_db
+def test_pizza_endpoint_uses_ranked_search():
+    PizzaFactory(name="Marinara", description="Pomodoro, aglio, origano.")
+    PizzaFactory(name="Ortolana", description="Verdure grigliate.")
+
+    response = APIClient().get("/api/v1/products/pizzas/", {"search": "origano"})
+
+    assert [p["name"] for p in response.data["results"]] == ["Marinara"]
+
+
+@pytest.mark.django_db
+def test_search_limit_counts_only_visible_pizzas(settings):
+    settings.PRODUCT_SEARCH_LIMIT = 2
+    # Better ranked by name, but off the menu
+    PizzaFactory(name="Bufala", is_available=False)
+    PizzaFactory(name="Bufala Nera", is_active=False)
+    visible = PizzaFactory(name="Regina", description="Con bufala.")
+
+    response = APIClient().get("/api/v1/products/pizzas/", {"search": "bufala"})
+
+    assert [p["id"] for p in response.data["results"]] == [visible.pk]
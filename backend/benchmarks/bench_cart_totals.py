@@ -0,0 +1,90 @@
+"""
+Cart totals: Python loops over `items.all()` versus one aggregate, and
+`with_totals()` over many carts. Query counts must not grow with items.
+"""
+
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database, timed
+
+
+ITEM_COUNTS = (5, 50, 500)
+CARTS = 200
+
+
+def main():
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from apps.accounts.models import User
+    from apps.orders.models import Cart, CartItem
+    from apps.products.models import Category, Pizza, PizzaSize
+
+    def count_queries(func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return len(queries)
+
+    with test_database():
+        pizza = Pizza.objects.create(
+            name="Margherita",
+            category=Category.objects.create(name="Classiche"),
+            description="-",
+            base_price=Decimal("7.00"),
+        )
+        size = PizzaSize.objects.create(name="Normale", diameter_cm=30)
+
+        def build_cart(username, item_count):
+            cart = Cart.objects.create(
+                user=User.objects.create_user(username=username, email=f"{username}@example.com")
+            )
+            CartItem.objects.bulk_create(
+                CartItem(
+                    cart=cart,
+                    pizza=pizza,
+                    size=size,
+                    quantity=1 + i % 3,
+                    unit_price=Decimal("7.00"),
+                    extra_cost=Decimal("0.50") * (i % 2),
+                )
+                for i in range(item_count)
+            )
+            return cart
+
+        print("Single cart totals (total_items + total_price)")
+        for item_count in ITEM_COUNTS:
+            cart = build_cart(f"single{item_count}", item_count)
+
+            def python_loop():
+                items = list(cart.items.all())
+                count = sum(item.quantity for item in items)
+                total = sum(item.subtotal for item in cart.items.all())
+                return count, total
+
+            def aggregate():
+                return cart.get_totals()
+
+            assert python_loop() == aggregate()
+            timed(f"python loop, {item_count} items ({count_queries(python_loop)} queries)",
+                  python_loop, number=20)
+            timed(f"aggregate, {item_count} items ({count_queries(aggregate)} queries)",
+                  aggregate, number=20)
+
+        for i in range(CARTS):
+            build_cart(f"many{i}", 10)
+
+        def per_cart_loops():
+            return [(c.pk, c.total_items, c.total_price) for c in Cart.objects.all()]
+
+        def annotated():
+            return [(c.pk, c.total_items, c.total_price) for c in Cart.objects.with_totals()]
+
+        assert sorted(per_cart_loops()) == sorted(annotated())
+        print(f"\nTotals for {Cart.objects.count()} carts")
+        timed(f"per-cart aggregates ({count_queries(per_cart_loops)} queries)", per_cart_loops)
+        timed(f"with_totals() ({count_queries(annotated)} queries)", annotated)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Delivery pricing: a vectorized batch of addresses versus a per-address
+Python loop, the checkout-path quote with and without its memo, and a
+staff batch request over HTTP.
+"""
+
+import json
+import math
+import random
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database, timed
+
+
+POINTS = 10_000
+ADDRESSES = 5_000
+
+
+def python_quote(pricing, latitude, longitude):
+    """The same computation, one point at a time with `math`."""
+    best = None
+    for store, (store_lat, store_lon) in enumerate(
+        zip(pricing.store_latitudes.tolist(), pricing.store_longitudes.tolist())
+    ):
+        lat1, lon1, lat2, lon2 = map(math.radians, (latitude, longitude, store_lat, store_lon))
+        a = (
+            math.sin((lat2 - lat1) / 2) ** 2
+            + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        )
+        km = round(2 * 6371.0088 * math.asin(math.sqrt(min(a, 1.0))), 3)
+        if best is None or km < best[1]:
+            best = (store, km)
+    zone = next(
+        (index for index, radius in enumerate(pricing.radii.tolist()) if best[1] <= radius),
+        len(pricing.fees),
+    )
+    return pricing._quote(best[0], best[1], zone)
+
+
+def main():
+    setup_django()
+
+    from django.conf import settings
+    from django.test import Client
+
+    settings.DELIVERY_STORES = [
+        {"name": f"Store {i}", "latitude": 45.40 + i * 0.03, "longitude": 9.10 + i * 0.04}
+        for i in range(4)
+    ]
+
+    from apps.accounts.api.serializers import LoginSerializer
+    from apps.accounts.models import Address, User
+    from apps.orders import delivery
+
+    pricing = delivery.get_pricing()
+    rng = random.Random(1)
+    latitudes = [45.30 + rng.random() * 0.35 for _ in range(POINTS)]
+    longitudes = [9.00 + rng.random() * 0.40 for _ in range(POINTS)]
+
+    print(f"{len(settings.DELIVERY_STORES)} stores, {len(pricing.fees)} zones")
+    vectorized = timed(
+        f"quote_many(): {POINTS:,} points",
+        lambda: pricing.quote_many(latitudes, longitudes),
+    )
+    loop = timed(
+        f"Python loop: {POINTS:,} points",
+        lambda: [python_quote(pricing, *point) for point in zip(latitudes, longitudes)],
+    )
+    assert pricing.quote_many(latitudes, longitudes) == [
+        python_quote(pricing, *point) for point in zip(latitudes, longitudes)
+    ]
+    print(f"{'':<48} vectorized batch is {loop / vectorized:.0f}x faster")
+
+    located = timed(
+        f"locate() arrays only: {POINTS:,} points",
+        lambda: pricing.locate(latitudes, longitudes),
+    )
+    print(f"{'':<48} {POINTS / located:>12,.0f} points/s")
+
+    address = Address(latitude=Decimal("45.470000"), longitude=Decimal("9.200000"))
+    counter = iter(range(10**9))
+
+    def fresh_address():
+        # A new location every call, so the memo never hits
+        address.latitude = Decimal("45.45") + Decimal(next(counter)) / 10**7
+        delivery.quote_address(address)
+
+    timed("quote_address(): cache miss", fresh_address, repeat=5, number=1000)
+    address.latitude = Decimal("45.470000")
+    timed("quote_address(): cache hit", lambda: delivery.quote_address(address),
+          repeat=5, number=10_000)
+
+    with test_database():
+        owner = User.objects.create_user(username="bench", email="bench@example.com")
+        staff = User.objects.create_user(
+            username="staff", email="staff@example.com", is_staff=True
+        )
+        Address.objects.bulk_create([
+            Address(
+                user=owner, label=f"Address {i}", street_address="Via Roma 1",
+                city="Milano", postal_code="20100", province="MI",
+                latitude=Decimal(f"{latitudes[i]:.6f}"),
+                longitude=Decimal(f"{longitudes[i]:.6f}"),
+            )
+            for i in range(ADDRESSES)
+        ])
+        ids = list(Address.objects.values_list("pk", flat=True))
+
+        timed(f"quote_addresses(): {ADDRESSES:,} addresses", lambda: delivery.quote_addresses(ids))
+
+        client = Client()
+        token = LoginSerializer.get_token(staff).access_token
+        body = json.dumps({"addresses": ids})
+
+        def post_batch():
+            response = client.post(
+                "/api/v1/orders/delivery/quotes/", body,
+                content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}",
+            )
+            assert response.status_code == 200, response.content
+
+        timed(f"POST /orders/delivery/quotes/: {ADDRESSES:,}", post_batch)
+
+
+if __name__ == "__main__":
+    main()
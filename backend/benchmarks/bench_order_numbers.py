@@ -0,0 +1,107 @@
+"""
+Allocate order numbers from several worker processes at once and check
+that no number is handed out twice.
+
+Compares the block-leased allocator with the previous scheme (random hex
+suffix plus an `exists()` pre-check per order). Workers are forked, so
+the database must be file-backed; IMMEDIATE transactions make SQLite
+writers wait for each other instead of failing.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+
+from benchmarks.utils import setup_django, test_database
+
+
+PROCESSES = 8
+PER_PROCESS = 2000
+
+
+def leased_worker(queue):
+    from django.db import connections
+
+    from apps.orders.numbering import OrderNumberAllocator
+
+    allocator = OrderNumberAllocator()
+    start = time.perf_counter()
+    numbers = [allocator.next_number() for _ in range(PER_PROCESS)]
+    queue.put((time.perf_counter() - start, numbers))
+    connections.close_all()
+
+
+def random_worker(queue):
+    from django.db import connections
+
+    from apps.orders.models import Order
+
+    start = time.perf_counter()
+    numbers = []
+    for _ in range(PER_PROCESS):
+        while True:
+            number = f"PME-{uuid.uuid4().hex[:8].upper()}"
+            if not Order.objects.filter(order_number=number).exists():
+                break
+        numbers.append(number)
+    queue.put((time.perf_counter() - start, numbers))
+    connections.close_all()
+
+
+def run(label, worker):
+    from django.db import connections
+
+    # Forked children must open their own connections
+    connections.close_all()
+
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(queue,))
+        for _ in range(PROCESSES)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    numbers = [number for _, batch in results for number in batch]
+    duplicates = len(numbers) - len(set(numbers))
+    slowest = max(seconds for seconds, _ in results)
+
+    print(f"{label:<32} {len(numbers)} numbers  wall {elapsed:.2f}s  "
+          f"slowest worker {slowest:.2f}s  "
+          f"{slowest / PER_PROCESS * 1e6:.1f} us/number  duplicates {duplicates}")
+    return duplicates
+
+
+def main():
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connection
+
+    if connection.vendor == "sqlite":
+        directory = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(directory, "bench.sqlite3")
+        connection.settings_dict["OPTIONS"].update(
+            {"transaction_mode": "IMMEDIATE", "timeout": 30}
+        )
+
+    multiprocessing.set_start_method("fork")
+
+    with test_database():
+        print(f"{PROCESSES} processes x {PER_PROCESS} numbers, "
+              f"block size {settings.ORDER_NUMBER_BLOCK_SIZE}")
+        duplicates = run("leased blocks", leased_worker)
+        run("random hex + exists()", random_worker)
+
+        assert duplicates == 0, f"{duplicates} duplicate order numbers"
+
+
+if __name__ == "__main__":
+    main()
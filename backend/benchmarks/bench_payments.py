@@ -0,0 +1,92 @@
+"""
+Throughput of the payment outbox workers against the stub gateway.
+
+Every charge sleeps like a real gateway round trip and a share of them
+fail transiently and are retried, so throughput is bound by how many
+charges are in flight at once. Runs the same backlog with 1 and with 16
+worker threads. Workers write from several threads at once, so the
+database is file-backed with IMMEDIATE transactions.
+"""
+
+import os
+import tempfile
+import time
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database
+
+
+PAYMENTS = 400
+LATENCY = 0.05
+FAILURE_RATE = 0.1
+DECLINE_RATE = 0.02
+
+
+def main():
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connection
+
+    if connection.vendor == "sqlite":
+        directory = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(directory, "bench.sqlite3")
+        connection.settings_dict["OPTIONS"].update(
+            {"transaction_mode": "IMMEDIATE", "timeout": 30}
+        )
+
+    settings.PAYMENT_GATEWAY = {
+        "BACKEND": "apps.orders.payments.StubGateway",
+        "OPTIONS": {
+            "latency": LATENCY,
+            "jitter": LATENCY / 5,
+            "failure_rate": FAILURE_RATE,
+            "decline_rate": DECLINE_RATE,
+            "seed": 42,
+        },
+    }
+    settings.PAYMENT_RETRY_BACKOFF = 0.01
+
+    from apps.accounts.models import User
+    from apps.orders import payments
+    from apps.orders.models import Order, Payment, PaymentOutbox
+
+    with test_database():
+        user = User.objects.create_user(username="bench", email="bench@example.com")
+
+        print(f"{PAYMENTS} payments, gateway latency {LATENCY * 1000:.0f} ms, "
+              f"{FAILURE_RATE:.0%} transient failures, {DECLINE_RATE:.0%} declines")
+
+        for workers in (1, 16):
+            PaymentOutbox.objects.all().delete()
+            Payment.objects.all().delete()
+            Order.objects.all().delete()
+            payments._gateway = None
+
+            orders = [
+                Order.objects.create(
+                    user=user, order_type="pickup",
+                    subtotal=Decimal("10.00"), total_amount=Decimal("10.00"),
+                )
+                for _ in range(PAYMENTS)
+            ]
+            for order in orders:
+                payments.start_payment(order, "card")
+
+            start = time.perf_counter()
+            totals = payments.run_worker(workers=workers, poll_interval=0.01, once=True)
+            elapsed = time.perf_counter() - start
+
+            confirmed = Order.objects.filter(status="confirmed").count()
+            completed = Payment.objects.filter(status="completed").count()
+            print(f"{workers:>2} workers: {PAYMENTS / elapsed:8.1f} payments/s  "
+                  f"({elapsed:.2f}s)  {dict(totals)}")
+
+            assert completed == confirmed, "paid orders must be confirmed"
+            assert not PaymentOutbox.objects.filter(
+                status__in=["pending", "processing"]
+            ).exists()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Price a 50-line cart with per-line Decimal multiplication versus the
+precomputed price matrix.
+"""
+
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database, timed
+
+
+CART_LINES = 50
+
+
+def main():
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from apps.products.models import Category, Pizza, PizzaSize
+    from apps.products.pricing import get_price_matrix
+
+    with test_database():
+        category = Category.objects.create(name="Classiche")
+        sizes = [
+            PizzaSize.objects.create(
+                name=name, diameter_cm=diameter, price_multiplier=multiplier
+            )
+            for name, diameter, multiplier in [
+                ("Baby", 22, Decimal("0.80")),
+                ("Normale", 30, Decimal("1.00")),
+                ("Maxi", 40, Decimal("1.60")),
+            ]
+        ]
+        pizzas = [
+            Pizza.objects.create(
+                name=f"Pizza {i}",
+                category=category,
+                description="-",
+                base_price=Decimal("6.50") + i,
+            )
+            for i in range(20)
+        ]
+
+        lines = [
+            (pizzas[i % len(pizzas)].pk, sizes[i % len(sizes)].pk, 1 + i % 3)
+            for i in range(CART_LINES)
+        ]
+
+        def per_line_queries():
+            total = Decimal("0.00")
+            for pizza_id, size_id, quantity in lines:
+                pizza = Pizza.objects.only("base_price").get(pk=pizza_id)
+                size = PizzaSize.objects.only("price_multiplier").get(pk=size_id)
+                total += pizza.get_price_for_size(size) * quantity
+            return total
+
+        pizza_map = {p.pk: p for p in pizzas}
+        size_map = {s.pk: s for s in sizes}
+
+        def per_line_multiplication():
+            total = Decimal("0.00")
+            for pizza_id, size_id, quantity in lines:
+                price = pizza_map[pizza_id].get_price_for_size(size_map[size_id])
+                total += price * quantity
+            return total
+
+        def matrix_lookup():
+            return get_price_matrix().total(lines)
+
+        assert per_line_queries() == per_line_multiplication() == matrix_lookup()
+
+        print(f"Pricing a {CART_LINES}-line cart")
+        timed("get_price_for_size with per-line fetch", per_line_queries)
+        timed("get_price_for_size on loaded objects", per_line_multiplication, number=100)
+        timed("price matrix lookup", matrix_lookup, number=100)
+
+        with CaptureQueriesContext(connection) as queries:
+            matrix_lookup()
+        print(f"queries per warm matrix pricing: {len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Stress the stock engine: hundreds of concurrent order confirmations
+racing for an ingredient that can only cover half of them.
+
+The default SQLite test database is an in-memory shared cache, which
+fails concurrent writers with "table is locked" instead of waiting, so
+this script uses a file-backed database with IMMEDIATE transactions.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database
+
+
+ORDERS = 400
+THREADS = 16
+STOCK = ORDERS // 2
+
+
+def main():
+    setup_django()
+
+    from django.db import OperationalError, close_old_connections, connection
+
+    if connection.vendor == "sqlite":
+        directory = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(directory, "bench.sqlite3")
+        connection.settings_dict["OPTIONS"].update(
+            {"transaction_mode": "IMMEDIATE", "timeout": 30}
+        )
+
+    from apps.accounts.models import User
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Category, Ingredient, Pizza, PizzaIngredient, PizzaSize
+    from apps.products.stock import InsufficientStock
+
+    with test_database():
+        user = User.objects.create_user(username="bench", email="bench@example.com")
+        pizza = Pizza.objects.create(
+            name="Margherita",
+            category=Category.objects.create(name="Classiche"),
+            description="-",
+            base_price=Decimal("7.00"),
+        )
+        size = PizzaSize.objects.create(name="Normale", diameter_cm=30)
+        ingredient = Ingredient.objects.create(
+            name="Mozzarella", cost_per_unit=Decimal("0.50"), stock_quantity=STOCK
+        )
+        PizzaIngredient.objects.create(pizza=pizza, ingredient=ingredient, quantity=1)
+
+        orders = []
+        for _ in range(ORDERS):
+            order = Order.objects.create(
+                user=user, order_type="pickup", subtotal=10, total_amount=10
+            )
+            OrderItem.objects.create(
+                order=order, pizza=pizza, size=size, quantity=1, unit_price=10
+            )
+            orders.append(order)
+
+        outcomes = {"confirmed": 0, "rejected": 0, "retries": 0}
+        lock = threading.Lock()
+
+        def confirm(batch):
+            try:
+                for order in batch:
+                    while True:
+                        try:
+                            order.change_status("confirmed")
+                            outcome = "confirmed"
+                        except InsufficientStock:
+                            outcome = "rejected"
+                        except OperationalError:
+                            order.status = "pending"
+                            with lock:
+                                outcomes["retries"] += 1
+                            continue
+                        break
+                    with lock:
+                        outcomes[outcome] += 1
+            finally:
+                close_old_connections()
+
+        threads = [
+            threading.Thread(target=confirm, args=(orders[i::THREADS],))
+            for i in range(THREADS)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        remaining = Ingredient.objects.get(pk=ingredient.pk).stock_quantity
+        confirmed_rows = Order.objects.filter(status="confirmed").count()
+
+        print(f"{ORDERS} confirmations on {THREADS} threads, stock for {STOCK}")
+        print(f"confirmed: {outcomes['confirmed']}  rejected: {outcomes['rejected']}  "
+              f"retries: {outcomes['retries']}  elapsed: {elapsed:.2f}s")
+        print(f"remaining stock: {remaining}  confirmed orders: {confirmed_rows}")
+
+        oversold = confirmed_rows - STOCK
+        assert remaining >= 0 and oversold <= 0, f"oversold by {oversold}"
+        assert outcomes["confirmed"] == confirmed_rows == STOCK - remaining
+        print("oversell: 0")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Driver GPS ingestion: pings per second through the ring buffer and
+through the HTTP endpoint, and the cost of persisting positions with one
+coalesced multi-row UPDATE versus one single-row UPDATE per delivery.
+"""
+
+import json
+import random
+import time
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database, timed
+
+
+DELIVERIES = 200
+BATCH = 500
+TARGET = 10_000
+
+
+def main():
+    setup_django()
+
+    from django.conf import settings
+    from django.test import Client
+
+    # Flush by hand below instead of from the background thread
+    settings.TRACKING_FLUSH_INTERVAL = 3600
+
+    from apps.accounts.api.serializers import LoginSerializer
+    from apps.accounts.models import User
+    from apps.orders import tracking
+    from apps.orders.models import DeliveryInfo, Order
+
+    with test_database():
+        customer = User.objects.create_user(username="bench", email="bench@example.com")
+        driver = User.objects.create_user(
+            username="driver", email="driver@example.com", is_staff=True
+        )
+        deliveries = []
+        for _ in range(DELIVERIES):
+            order = Order.objects.create(
+                user=customer, order_type="delivery",
+                subtotal=Decimal("10.00"), total_amount=Decimal("10.00"),
+            )
+            deliveries.append(DeliveryInfo.objects.create(order=order, status="in_transit"))
+
+        rng = random.Random(1)
+        clock = [time.time()]
+
+        def batch():
+            clock[0] += 1
+            return [
+                (rng.choice(deliveries).pk, 45 + rng.random(), 9 + rng.random(), clock[0])
+                for _ in range(BATCH)
+            ]
+
+        buffer = tracking.LocationBuffer()
+        buffer.active_deliveries()
+
+        print(f"{DELIVERIES} active deliveries, batches of {BATCH} pings")
+        per_batch = timed("buffer.add()", lambda: buffer.add(batch()), repeat=5, number=20)
+        print(f"{'':<48} {BATCH / per_batch:>12,.0f} pings/s")
+
+        def add_and_flush():
+            buffer.add(batch())
+            buffer.flush()
+
+        # Every round dirties all deliveries again; subtract the add() cost
+        per_flush = timed("add() + flush(): one multi-row UPDATE", add_and_flush) - per_batch
+        print(f"{'flush() alone':<48} {per_flush * 1e6:>12.1f} us/call")
+
+        def save_each():
+            for delivery_id, latitude, longitude, _ in batch()[:DELIVERIES]:
+                DeliveryInfo.objects.filter(pk=delivery_id).update(
+                    current_latitude=Decimal(latitude).quantize(Decimal("0.000001")),
+                    current_longitude=Decimal(longitude).quantize(Decimal("0.000001")),
+                )
+
+        per_saves = timed(f"{DELIVERIES} single-row UPDATEs", save_each, repeat=5, number=1)
+        print(f"{'':<48} coalesced flush is {per_saves / per_flush:.0f}x cheaper")
+
+        tracking.buffer = tracking.LocationBuffer()
+        client = Client()
+        token = LoginSerializer.get_token(driver).access_token
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+        def post_batch():
+            body = json.dumps({"pings": [
+                {"delivery": d, "lat": lat, "lon": lon, "at": at}
+                for d, lat, lon, at in batch()
+            ]})
+            response = client.post(
+                "/api/v1/orders/tracking/pings/", body,
+                content_type="application/json", **headers,
+            )
+            assert response.status_code == 202, response.content
+
+        per_request = timed("POST /orders/tracking/pings/", post_batch, repeat=5, number=10)
+        rate = BATCH / per_request
+        print(f"{'':<48} {rate:>12,.0f} pings/s (one process)")
+
+        status = "meets" if rate >= TARGET else "misses"
+        print(f"HTTP ingestion {status} the {TARGET:,} pings/s target")
+
+
+if __name__ == "__main__":
+    main()
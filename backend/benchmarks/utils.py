@@ -0,0 +1,51 @@
+"""
+Shared helpers for the standalone benchmark scripts.
+
+Run a benchmark from `backend/` as a module, e.g.:
+
+    python -m benchmarks.bench_price_matrix
+
+Each script builds a throwaway test database (the same way the test
+runner does), seeds it, and prints its timings.
+"""
+
+import contextlib
+import os
+import time
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+    import django
+
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(label, func, repeat=5, number=1):
+    """Run `func` `number` times per round and report the best round."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+
+    per_call = best / number
+    print(f"{label:<48} {per_call * 1e6:>12.1f} us/call")
+    return per_call
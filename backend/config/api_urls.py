@@ -11,10 +11,8 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 from drf_spectacular.utils import extend_schema
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
+from apps.accounts.api.views import LoginView
 
 
 # -------------------------------------------------------------------
@@ -39,7 +37,7 @@ urlpatterns = [
     path("docs/", SpectacularSwaggerView.as_view(url_name="schema")),
 
     # Authentication (JWT - JSON Web Token)
-    path("auth/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("auth/login/", LoginView.as_view(), name="token_obtain_pair"),
     path("auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 
     # Domain APIs
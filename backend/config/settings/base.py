@@ -6,6 +6,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 
@@ -129,6 +130,33 @@ DATABASES = {
 }
 
 
+# -------------------------------------------------------------------
+# Cache (local memory fallback, Redis ready)
+# -------------------------------------------------------------------
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "pizzamama",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# Catalog snapshot cache used by the public products endpoints
+MENU_CACHE_ALIAS = "default"
+MENU_CACHE_TIMEOUT = 60 * 60
+
+
 # -------------------------------------------------------------------
 # Internationalization
 # -------------------------------------------------------------------
@@ -154,6 +182,13 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Responsive variants generated for uploaded catalog and avatar images
+IMAGE_VARIANT_WIDTHS = (320, 640, 1024)
+IMAGE_VARIANT_FORMATS = ("webp", "jpeg")
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+IMAGE_VARIANTS_ASYNC = True
+
 
 # -------------------------------------------------------------------
 # Default Primary Key Field
@@ -193,6 +228,131 @@ REST_FRAMEWORK = {
 }
 
 
+# -------------------------------------------------------------------
+# Cart
+# -------------------------------------------------------------------
+
+# Anonymous carts live in the cache, addressed by the X-Cart-Token header
+CART_CACHE_ALIAS = "default"
+ANONYMOUS_CART_TTL = 60 * 60 * 24 * 7
+
+CORS_ALLOW_HEADERS = (*default_headers, "x-cart-token", "idempotency-key")
+CORS_EXPOSE_HEADERS = ["X-Cart-Token", "Idempotent-Replayed"]
+
+
+# -------------------------------------------------------------------
+# Idempotency Keys
+# -------------------------------------------------------------------
+
+# Responses to requests carrying an Idempotency-Key are replayed on retry
+IDEMPOTENCY_CACHE_ALIAS = "default"
+IDEMPOTENCY_TTL = 60 * 60 * 24
+# Seconds the first request holds its key, and duplicates wait for it
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_WAIT = 10
+
+
+# -------------------------------------------------------------------
+# Order Numbers
+# -------------------------------------------------------------------
+
+# Numbers each worker process leases at once from the daily counter
+ORDER_NUMBER_BLOCK_SIZE = 50
+
+
+# -------------------------------------------------------------------
+# Order Archive
+# -------------------------------------------------------------------
+
+# Delivered/cancelled orders older than this move to the archive table
+ORDER_ARCHIVE_AFTER_DAYS = 180
+ORDER_ARCHIVE_CHUNK_SIZE = 500
+
+
+# -------------------------------------------------------------------
+# Order History
+# -------------------------------------------------------------------
+
+# Seconds between background writes of the order event log (0: write at commit)
+ORDER_HISTORY_FLUSH_INTERVAL = 1.0
+ORDER_HISTORY_BATCH_SIZE = 500
+
+
+# -------------------------------------------------------------------
+# Payments
+# -------------------------------------------------------------------
+
+# Charges run in `manage.py process_payments` workers, never in requests
+PAYMENT_GATEWAY = {
+    "BACKEND": "apps.orders.payments.StubGateway",
+    "OPTIONS": {"latency": 0.2, "failure_rate": 0.05, "decline_rate": 0.02},
+}
+PAYMENT_MAX_ATTEMPTS = 5
+# Seconds before the first retry; doubled per attempt up to the max
+PAYMENT_RETRY_BACKOFF = 2
+PAYMENT_RETRY_BACKOFF_MAX = 300
+# Seconds a worker owns a claimed charge before others may take it over
+PAYMENT_CLAIM_TIMEOUT = 60
+
+
+# -------------------------------------------------------------------
+# Driver Tracking
+# -------------------------------------------------------------------
+
+# Live positions are served from this cache, never from SQL
+TRACKING_CACHE_ALIAS = "default"
+TRACKING_CACHE_TTL = 60 * 10
+TRACKING_TRAIL_LENGTH = 20
+TRACKING_MAX_BATCH = 1000
+# Seconds between coalesced writes of the latest positions (0: every batch)
+TRACKING_FLUSH_INTERVAL = 5.0
+TRACKING_FLUSH_BATCH_SIZE = 500
+# Seconds between reloads of the active delivery list
+TRACKING_ACTIVE_REFRESH = 10
+
+
+# -------------------------------------------------------------------
+# Delivery Pricing
+# -------------------------------------------------------------------
+
+# Every address is served by its nearest store
+DELIVERY_STORES = [
+    {"name": "Milano Centro", "latitude": 45.464211, "longitude": 9.191383},
+]
+# Rings around the store, by straight-line distance in km. Addresses
+# beyond the widest ring are outside the delivery area.
+DELIVERY_ZONES = [
+    {"name": "A", "radius_km": 2, "fee": "0.00"},
+    {"name": "B", "radius_km": 4, "fee": "1.50"},
+    {"name": "C", "radius_km": 7, "fee": "2.50"},
+    {"name": "D", "radius_km": 10, "fee": "3.90"},
+]
+# Memoized quotes per address location, per process
+DELIVERY_QUOTE_CACHE_SIZE = 10000
+DELIVERY_QUOTE_MAX_BATCH = 20000
+
+
+# -------------------------------------------------------------------
+# Order Events
+# -------------------------------------------------------------------
+
+# Streamed to kitchen displays over SSE (requires an ASGI server).
+# With Redis available, events fan out to every worker process.
+ORDER_EVENTS_BACKEND = (
+    "apps.orders.events.RedisBackend" if REDIS_URL
+    else "apps.orders.events.LocalBackend"
+)
+ORDER_EVENTS_KEEPALIVE = 15
+
+
+# -------------------------------------------------------------------
+# Catalog Search
+# -------------------------------------------------------------------
+
+# Maximum number of ranked matches returned by the pizza search backend
+PRODUCT_SEARCH_LIMIT = 200
+
+
 # -------------------------------------------------------------------
 # OpenAPI / Schema
 # -------------------------------------------------------------------
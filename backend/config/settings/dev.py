@@ -13,4 +13,8 @@ CORS_ALLOWED_ORIGINS = [
 # In development allow session authentication (useful for browsable API)
 REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"] += [
     "rest_framework.authentication.SessionAuthentication",
-]
\ No newline at end of file
+]
+
+# Write order history and driver positions straight away while developing
+ORDER_HISTORY_FLUSH_INTERVAL = 0
+TRACKING_FLUSH_INTERVAL = 0
@@ -34,4 +34,20 @@ CSRF_COOKIE_SECURE = True
 SECURE_SSL_REDIRECT = True
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
-SECURE_REFERRER_POLICY = "strict-origin-when-cross-origin"
\ No newline at end of file
+SECURE_REFERRER_POLICY = "strict-origin-when-cross-origin"
+
+
+# -------------------------------------------------------------------
+# Shared Cache
+# -------------------------------------------------------------------
+
+# Idempotency locks (and anonymous carts, live positions) must be seen by
+# every worker process; a per-process cache would silently let
+# duplicate requests through on different workers
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+if CACHES[IDEMPOTENCY_CACHE_ALIAS]["BACKEND"] in PROCESS_LOCAL_CACHES:
+    raise Exception("A shared cache (REDIS_URL) is required in production.")